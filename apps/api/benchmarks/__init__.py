@@ -0,0 +1,7 @@
+"""Offline benchmarks for the Unconditional API.
+
+Run from apps/api with src on the path, e.g.:
+
+    PYTHONPATH=src uv run python -m benchmarks.safety
+    PYTHONPATH=src uv run python -m benchmarks.safety_scanner
+"""
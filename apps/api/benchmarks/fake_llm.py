@@ -0,0 +1,110 @@
+"""Deterministic fake LLM for offline load testing.
+
+Builds a pydantic-ai `FunctionModel` with configurable latency, error rate
+and reply text. Patched in for `services.llm.factory.get_llm_model`, it runs
+the real generation path (registry, limiter, agent, guardrails) without a
+provider or network access.
+"""
+
+import asyncio
+import random
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+DEFAULT_REPLY = (
+    "I hear how heavy today has been. I'm here with you. What feels hardest right now?"
+)
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "lognormal")
+
+
+class FakeLLMError(RuntimeError):
+    """Injected provider failure."""
+
+
+@dataclass
+class FakeLLMConfig:
+    """
+    Behaviour of the fake model.
+
+    Attributes:
+        latency_ms: Mean completion latency
+        distribution: "constant", "uniform" (0 to 2x mean) or "lognormal"
+            (mean latency_ms, long right tail like real providers)
+        error_rate: Fraction of calls that raise FakeLLMError
+        stall_rate: Fraction of calls that stall, taking 10x their latency
+            (a stuck connection or overloaded replica)
+        reply: Completion text
+        chunks: Number of pieces the reply is streamed in
+        seed: RNG seed, so runs are reproducible
+    """
+
+    latency_ms: float = 800.0
+    distribution: str = "lognormal"
+    error_rate: float = 0.0
+    stall_rate: float = 0.0
+    reply: str = DEFAULT_REPLY
+    chunks: int = 8
+    seed: int = 0
+
+
+class FakeLLM:
+    """
+    Seeded source of fake completions.
+
+    Args:
+        config: Latency, error and output settings
+    """
+
+    def __init__(self, config: FakeLLMConfig):
+        if config.distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {config.distribution}")
+        self.config = config
+        self.calls = 0
+        self._rng = random.Random(config.seed)
+
+    def latency(self) -> float:
+        """Draw one completion latency, in seconds."""
+        mean = self.config.latency_ms / 1000
+        if self.config.stall_rate and self._rng.random() < self.config.stall_rate:
+            mean *= 10
+        match self.config.distribution:
+            case "constant":
+                return mean
+            case "uniform":
+                return self._rng.uniform(0, 2 * mean)
+            case _:
+                # sigma 0.6: p99 is about 3.2x the median
+                sigma = 0.6
+                return self._rng.lognormvariate(0, sigma) * mean / 1.197
+
+    def _start_call(self) -> float:
+        self.calls += 1
+        if self._rng.random() < self.config.error_rate:
+            raise FakeLLMError("injected provider error")
+        return self.latency()
+
+    async def respond(
+        self, messages: list[ModelMessage], info: AgentInfo
+    ) -> ModelResponse:
+        """FunctionModel callback for a complete response."""
+        await asyncio.sleep(self._start_call())
+        return ModelResponse(parts=[TextPart(content=self.config.reply)])
+
+    async def stream(
+        self, messages: list[ModelMessage], info: AgentInfo
+    ) -> AsyncIterator[str]:
+        """FunctionModel callback streaming the reply in even pieces."""
+        delay = self._start_call() / self.config.chunks
+        reply = self.config.reply
+        size = -(-len(reply) // self.config.chunks)
+        for start in range(0, len(reply), size):
+            await asyncio.sleep(delay)
+            yield reply[start : start + size]
+
+    def model(self) -> FunctionModel:
+        """pydantic-ai model serving both /message and /message/stream."""
+        return FunctionModel(self.respond, stream_function=self.stream)
@@ -0,0 +1,283 @@
+"""Safety-layer microbenchmarks with a regression gate.
+
+Times `detect_crisis`, `contains_banned_content`, `apply_guardrails` and
+`check_length` over seeded synthetic corpora: clean chat, adversarial near
+misses (words that almost match a pattern) and a crisis/non-crisis mix, at
+sizes from a short chat line up to the 10,000 character message limit.
+
+Reports ops/sec and per-call latency percentiles. Results are compared with a
+stored baseline, and the run fails (exit status 1) when any case's mean
+latency regresses by more than the threshold. Runs offline, stdlib only.
+
+Usage:
+    PYTHONPATH=src uv run python -m benchmarks.safety
+    PYTHONPATH=src uv run python -m benchmarks.safety --save-baseline
+    PYTHONPATH=src uv run python -m benchmarks.safety --threshold 0.5
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from safety.banned_patterns import contains_banned_content
+from safety.crisis_detection import detect_crisis
+from safety.guardrails import apply_guardrails, check_length
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "safety.json"
+
+# Allowed slowdown of mean latency before a case counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+# Slowdowns smaller than this are timer noise, not regressions
+MIN_REGRESSION_US = 1.0
+
+# Distinct messages per corpus, cycled through while timing
+CORPUS_VARIANTS = 32
+
+SIZES = {"short": 80, "medium": 500, "long": 2000, "max": 10000}
+
+FUNCTIONS: dict[str, Callable[[str], object]] = {
+    "detect_crisis": detect_crisis,
+    "contains_banned_content": contains_banned_content,
+    "apply_guardrails": apply_guardrails,
+    "check_length": check_length,
+}
+
+FILLER = [
+    "i", "feel", "so", "tired", "of", "everything", "and", "nobody", "seems",
+    "to", "listen", "when", "talk", "about", "how", "heavy", "this", "week",
+    "has", "been", "at", "work", "home", "my", "sister", "keeps", "calling",
+    "but", "do", "not", "know", "what", "say", "anymore", "it's", "late",
+]  # fmt: skip
+
+NEAR_MISSES = [
+    "skill myself", "killing myself", "suicides", "murderer", "tonights",
+    "plant to", "roleplaying", "clinician", "shoulder", "mustard", "overdosed",
+    "hangman", "endless life", "better off deadline", "you shoulder",
+    "diagnoses", "friendship", "promised", "strongest", "end mylife",
+    "want todie", "act asif you", "stupidbot", "goings to", "ending it",
+]  # fmt: skip
+
+CRISIS_PHRASES = [
+    "i want to end my life", "i want to die", "i'm going to hurt myself",
+    "i have a plan to overdose tonight", "i'm better off dead",
+    "i can't go on", "i want to kill him",
+]  # fmt: skip
+
+# Share of crisis-mix messages that contain a crisis phrase
+CRISIS_SHARE = 0.3
+
+
+def make_text(rng: random.Random, length: int, words: list[str]) -> str:
+    """Build text of exactly `length` characters from random words."""
+    text = ""
+    while len(text) < length:
+        text += rng.choice(words) + " "
+    return text[:length]
+
+
+def make_corpus(kind: str, length: int, seed: int = 0) -> list[str]:
+    """
+    Build a seeded corpus of messages of one kind and length.
+
+    Args:
+        kind: "clean", "near_miss" or "crisis_mix"
+        length: Characters per message
+        seed: RNG seed, so every run times the same inputs
+
+    Returns:
+        CORPUS_VARIANTS messages
+    """
+    rng = random.Random(f"{kind}-{length}-{seed}")
+    corpus = []
+    for _ in range(CORPUS_VARIANTS):
+        if kind == "near_miss":
+            message = make_text(rng, length, FILLER * 2 + NEAR_MISSES)
+        else:
+            message = make_text(rng, length, FILLER)
+        if kind == "crisis_mix" and rng.random() < CRISIS_SHARE:
+            phrase = rng.choice(CRISIS_PHRASES)
+            at = rng.randint(0, max(length - len(phrase), 0))
+            message = (message[:at] + phrase + message[at + len(phrase) :])[:length]
+        corpus.append(message)
+    return corpus
+
+
+def time_round(
+    func: Callable[[str], object], corpus: list[str], calls: int
+) -> list[int]:
+    """Time `calls` calls of `func`, cycling through `corpus`; nanoseconds."""
+    timer = time.perf_counter_ns
+    samples = []
+    for i in range(calls):
+        message = corpus[i % len(corpus)]
+        start = timer()
+        func(message)
+        samples.append(timer() - start)
+    return samples
+
+
+def summarize(rounds: list[list[int]]) -> dict:
+    """
+    Summarize the rounds of one case.
+
+    Returns:
+        ops_per_sec and mean latency from the fastest round (the least
+        disturbed by other processes), percentiles over every call, in
+        microseconds
+    """
+    samples = [sample for round_samples in rounds for sample in round_samples]
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    best_mean = min(map(statistics.fmean, rounds))
+    return {
+        "ops_per_sec": round(1e9 / best_mean, 1),
+        "mean_us": round(best_mean / 1e3, 3),
+        "p50_us": round(cuts[49] / 1e3, 3),
+        "p95_us": round(cuts[94] / 1e3, 3),
+        "p99_us": round(cuts[98] / 1e3, 3),
+    }
+
+
+def run(calls: int, rounds: int) -> dict[str, dict]:
+    """
+    Run every function over every corpus; keys are function/kind/size.
+
+    Rounds are interleaved across cases, so slow drift of the machine (CPU
+    frequency, noisy neighbours) affects every case alike.
+    """
+    cases = {}
+    for kind in ("clean", "near_miss", "crisis_mix"):
+        for size_name, length in SIZES.items():
+            corpus = make_corpus(kind, length)
+            for func_name, func in FUNCTIONS.items():
+                cases[f"{func_name}/{kind}/{size_name}"] = (func, corpus)
+
+    samples: dict[str, list[list[int]]] = {key: [] for key in cases}
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    # Guardrail hits log to stdout; keep that I/O out of the output
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            for func, corpus in cases.values():
+                for message in corpus:
+                    func(message)
+            for _ in range(rounds):
+                for key, (func, corpus) in cases.items():
+                    samples[key].append(time_round(func, corpus, calls))
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    return {key: summarize(case_rounds) for key, case_rounds in samples.items()}
+
+
+def find_regressions(
+    results: dict[str, dict], baseline: dict[str, dict], threshold: float
+) -> list[str]:
+    """
+    Compare mean latencies against a baseline.
+
+    The mean, not the median, is gated: mixed corpora (crisis and non-crisis
+    messages) have bimodal latencies whose median jumps between the modes.
+
+    Args:
+        results: Current run, as returned by `run`
+        baseline: Stored run
+        threshold: Allowed fractional slowdown (0.25 = 25%)
+
+    Returns:
+        One description per regressed case (empty if none)
+    """
+    regressions = []
+    for key, current in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        limit = before["mean_us"] * (1 + threshold)
+        slowdown = current["mean_us"] - before["mean_us"]
+        if current["mean_us"] > limit and slowdown > MIN_REGRESSION_US:
+            regressions.append(
+                f"{key}: mean {before['mean_us']:.2f}us -> "
+                f"{current['mean_us']:.2f}us (+{slowdown / before['mean_us']:.0%})"
+            )
+    return regressions
+
+
+def print_table(results: dict[str, dict], baseline: dict[str, dict]) -> None:
+    print(
+        f"{'case':<42}{'ops/sec':>12}{'mean us':>10}{'p50 us':>10}{'p95 us':>10}"
+        f"{'p99 us':>10}{'vs base':>10}"
+    )
+    for key, stats in results.items():
+        before = baseline.get(key)
+        change = f"{stats['mean_us'] / before['mean_us'] - 1:+.0%}" if before else "-"
+        print(
+            f"{key:<42}{stats['ops_per_sec']:>12.0f}{stats['mean_us']:>10.2f}"
+            f"{stats['p50_us']:>10.2f}{stats['p95_us']:>10.2f}"
+            f"{stats['p99_us']:>10.2f}{change:>10}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200, help="calls per round")
+    parser.add_argument("--rounds", type=int, default=7, help="rounds per case")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="allowed mean slowdown before failing (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store this run as the new baseline instead of comparing",
+    )
+    args = parser.parse_args()
+
+    results = run(args.calls, args.rounds)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        document = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "calls": args.calls,
+            "rounds": args.rounds,
+            "results": results,
+        }
+        args.baseline.write_text(json.dumps(document, indent=2) + "\n")
+        print_table(results, {})
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())["results"]
+    print_table(results, baseline)
+
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline")
+        return
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Microbenchmark: single-pass scanner vs per-pattern re.search loops.
+
+Compares the safety functions against the original loop implementations on
+10,000 character inputs (the `UserMessage.content` maximum).
+
+Usage:
+    PYTHONPATH=src uv run python -m benchmarks.safety_scanner [--repeat N]
+"""
+
+import argparse
+import random
+import re
+import timeit
+from collections.abc import Callable
+
+from safety.banned_patterns import contains_banned_content
+from safety.crisis_detection import detect_crisis
+from safety.pattern_packs import pattern_packs
+
+PACK = pattern_packs.active
+SELF_HARM_PATTERNS = PACK.patterns["self_harm"]
+HARM_TO_OTHERS_PATTERNS = PACK.patterns["harm_to_others"]
+IMMEDIATE_DANGER_PATTERNS = PACK.patterns["immediate_danger"]
+BANNED_INPUT_PATTERNS = PACK.patterns["banned_input"]
+BANNED_PHRASES = PACK.patterns["banned_phrases"]
+BANNED_PHRASES_SCANNER = PACK.banned_phrases
+
+MESSAGE_LENGTH = 10000
+
+WORDS = [
+    "i", "feel", "so", "tired", "of", "everything", "and", "nobody", "seems",
+    "to", "listen", "when", "talk", "about", "how", "heavy", "this", "week",
+    "has", "been", "at", "work", "home", "my", "sister", "keeps", "calling",
+    "but", "do", "not", "know", "what", "say", "anymore",
+]  # fmt: skip
+
+
+def loop_banned(message: str) -> bool:
+    message_lower = message.lower()
+    return any(re.search(p, message_lower) for p in BANNED_INPUT_PATTERNS)
+
+
+def loop_crisis(message: str) -> list[str]:
+    message_lower = message.lower()
+    matched = [
+        p
+        for p in SELF_HARM_PATTERNS + HARM_TO_OTHERS_PATTERNS
+        if re.search(p, message_lower)
+    ]
+    if matched:
+        for p in IMMEDIATE_DANGER_PATTERNS:
+            if re.search(p, message_lower):
+                matched.append(p)
+                break
+    return matched
+
+
+def loop_guardrails(text: str) -> str | None:
+    text_lower = text.lower()
+    return next((p for p in BANNED_PHRASES if re.search(p, text_lower)), None)
+
+
+def make_message(rng: random.Random, tail: str = "") -> str:
+    """Build a MESSAGE_LENGTH message of filler text ending in `tail`."""
+    body = " ".join(rng.choice(WORDS) for _ in range(MESSAGE_LENGTH // 3))
+    return body[: MESSAGE_LENGTH - len(tail)] + tail
+
+
+def per_call_us(func: Callable[[str], object], message: str, repeat: int) -> float:
+    return min(timeit.repeat(lambda: func(message), number=repeat, repeat=5)) / (
+        repeat / 1e6
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    inputs = {
+        "clean": make_message(rng),
+        "crisis at end": make_message(rng, " i want to end my life tonight"),
+        "guardrail at end": make_message(rng, " you should rest"),
+    }
+
+    cases = [
+        ("banned input", loop_banned, contains_banned_content),
+        ("crisis detection", loop_crisis, detect_crisis),
+        (
+            "guardrails",
+            loop_guardrails,
+            lambda text: BANNED_PHRASES_SCANNER.first_match(text.lower()),
+        ),
+    ]
+
+    print(f"{MESSAGE_LENGTH}-char inputs, best of 5 x {args.repeat} calls\n")
+    print(f"{'check':<18}{'input':<18}{'loop (us)':>12}{'scanner (us)':>14}{'x':>8}")
+    for name, loop, scanner in cases:
+        for label, message in inputs.items():
+            before = per_call_us(loop, message, args.repeat)
+            after = per_call_us(scanner, message, args.repeat)
+            print(
+                f"{name:<18}{label:<18}{before:>12.1f}{after:>14.1f}"
+                f"{before / after:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark: request parsing and response serialization with large histories.
+
+Compares FastAPI's default path (json.loads, validation of the Python
+objects, jsonable_encoder and json.dumps on the way out) with the router's
+path (TypeAdapter.validate_json straight from bytes, pydantic's Rust
+serializer to bytes), then times /message end to end over the ASGI app. The
+end-to-end request is a crisis message: it never reaches the LLM, so its
+latency is dominated by reading and validating the history.
+
+Usage:
+    LOG_LEVEL=error PYTHONPATH=src uv run python -m benchmarks.serialization
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import timeit
+from unittest.mock import patch
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+
+from api.v1.endpoints.conversation import MESSAGE_REQUEST_ADAPTER
+from core.rate_limit import rate_limiter
+from main import app
+from models.message import MessageRequest
+from models.response import ConversationResponse
+
+HISTORY_TURNS = (0, 50, 200, 1000)
+
+TURN_TEXT = (
+    "It's been one of those weeks where everything piles up at once and I "
+    "can't find a moment to breathe, let alone think about what I need."
+)
+
+
+def make_body(turns: int, content: str = "I still can't sleep") -> bytes:
+    """JSON request body with `turns` prior turns."""
+    messages = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": TURN_TEXT}
+        for i in range(turns)
+    ]
+    return json.dumps({"content": content, "history": {"messages": messages}}).encode()
+
+
+def default_parse(body: bytes) -> MessageRequest:
+    return MessageRequest.model_validate(json.loads(body))
+
+
+def default_render(response: ConversationResponse) -> bytes:
+    return json.dumps(jsonable_encoder(response)).encode()
+
+
+def per_call_us(func, repeat: int) -> float:
+    return min(timeit.repeat(func, number=repeat, repeat=5)) / repeat * 1e6
+
+
+async def end_to_end_us(body: bytes, repeat: int) -> float:
+    """Median /message latency for one body, sequential requests."""
+    transport = httpx.ASGITransport(app=app)
+    headers = {"content-type": "application/json"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = await c.post("/api/v1/message", content=body, headers=headers)
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+    return statistics.median(samples) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    response = ConversationResponse(
+        content="I hear you. What feels heaviest tonight?",
+        timestamp="2025-01-01T00:00:00+00:00",
+    )
+    print("response serialization (us)")
+    print(f"  default   {per_call_us(lambda: default_render(response), 10000):8.2f}")
+    print(
+        f"  pydantic  "
+        f"{per_call_us(lambda: response.__pydantic_serializer__.to_json(response), 10000):8.2f}"
+    )
+
+    print(f"\n{'history turns':<16}{'body KB':>9}{'default us':>12}"
+          f"{'adapter us':>12}{'x':>6}{'crisis /message us':>20}")  # fmt: skip
+    for turns in HISTORY_TURNS:
+        body = make_body(turns)
+        before = per_call_us(lambda body=body: default_parse(body), args.repeat)
+        after = per_call_us(
+            lambda body=body: MESSAGE_REQUEST_ADAPTER.validate_json(body),
+            args.repeat,
+        )
+        crisis_body = make_body(turns, "I want to kill myself tonight")
+        with patch.object(rate_limiter, "enabled", False):
+            request_us = asyncio.run(end_to_end_us(crisis_body, args.repeat))
+        print(
+            f"{turns:<16}{len(body) / 1024:>9.1f}{before:>12.1f}{after:>12.1f}"
+            f"{before / after:>6.1f}{request_us:>20.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Benchmark: cold start, from process launch to the first /health response.
+
+A free-tier instance that slept has to import the app before it can answer
+anyone. This prints where import time goes (`python -X importtime`, by
+module and by top-level package), then launches uvicorn in a fresh process
+and times how long until /api/v1/health first answers.
+
+Usage:
+    PYTHONPATH=src uv run python -m benchmarks.startup
+    PYTHONPATH=src uv run python -m benchmarks.startup --runs 5 --top 30
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+HEALTH_PATH = "/api/v1/health"
+
+
+def _env() -> dict[str, str]:
+    return os.environ | {"PYTHONPATH": str(SRC), "LOG_LEVEL": "error"}
+
+
+def import_times() -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) for `import main` in a fresh process."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, module = line.removeprefix("import time:").split("|")
+        times.append((module.strip(), int(own), int(cumulative)))
+    return times
+
+
+def free_port() -> int:
+    """A local TCP port nothing is listening on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_health(timeout: float = 30.0) -> float:
+    """
+    Seconds from launching uvicorn to the first 200 from /api/v1/health.
+
+    Raises:
+        TimeoutError: If the server does not answer within `timeout`
+    """
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{HEALTH_PATH}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        env=_env(),
+        cwd=SRC,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                pass
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode}")
+            time.sleep(0.01)
+        raise TimeoutError(f"No response from {HEALTH_PATH} in {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    times = import_times()
+    total = max(cumulative for _, _, cumulative in times)
+    print(f"import main: {total / 1000:.0f} ms")
+
+    packages: Counter[str] = Counter()
+    for module, own, _ in times:
+        packages[module.split(".")[0]] += own
+    print(f"\n{'package':<32} {'self ms':>9}")
+    for package, own in packages.most_common(args.top):
+        print(f"{package:<32} {own / 1000:>9.1f}")
+
+    print(f"\n{'module':<48} {'self ms':>9} {'cumul ms':>9}")
+    for module, own, cumulative in sorted(times, key=lambda t: t[1], reverse=True)[
+        : args.top
+    ]:
+        print(f"{module:<48} {own / 1000:>9.1f} {cumulative / 1000:>9.1f}")
+
+    loaded = [name for name, _, _ in times if name.split(".")[0] == "pydantic_ai"]
+    print(f"\npydantic_ai modules imported at startup: {len(loaded)}")
+
+    samples = [time_to_first_health() for _ in range(args.runs)]
+    print(
+        f"time to first {HEALTH_PATH}: median {statistics.median(samples) * 1000:.0f} ms"
+        f", max {max(samples) * 1000:.0f} ms over {args.runs} runs"
+    )
+
+
+if __name__ == "__main__":
+    main()
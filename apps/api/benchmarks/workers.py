@@ -0,0 +1,127 @@
+"""Benchmark: throughput of the production server by worker count.
+
+Starts `python -m server` once per worker count and drives it over real
+sockets with crisis messages. The crisis path runs the full request pipeline
+(parsing, rate limiting, safety checks, serialization) without the LLM, so
+it is CPU-bound and shows how throughput scales with workers. Load comes
+from several client processes, so the load generator is not the bottleneck.
+Scaling stops at the number of CPUs the client and server share.
+
+Usage:
+    PYTHONPATH=src uv run python -m benchmarks.workers
+    PYTHONPATH=src uv run python -m benchmarks.workers --workers 1 2 4 8 \\
+        --clients 4 --concurrency 32 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+from benchmarks.startup import SRC, free_port
+
+BODY = json.dumps({"content": "I want to kill myself tonight"}).encode()
+
+
+async def _drive(base: str, concurrency: int, duration: float) -> int:
+    """Send requests from `concurrency` connections; returns requests completed."""
+    deadline = time.perf_counter() + duration
+    done = 0
+
+    async def connection(client: httpx.AsyncClient) -> None:
+        nonlocal done
+        while time.perf_counter() < deadline:
+            response = await client.post(
+                "/api/v1/message",
+                content=BODY,
+                headers={"content-type": "application/json"},
+            )
+            assert response.status_code == 200, response.text
+            done += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits) as client:
+        await asyncio.gather(*(connection(client) for _ in range(concurrency)))
+    return done
+
+
+def _client(base: str, concurrency: int, duration: float) -> int:
+    return asyncio.run(_drive(base, concurrency, duration))
+
+
+def _wait_ready(base: str, timeout: float = 30.0) -> None:
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        try:
+            if httpx.get(f"{base}/api/v1/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise TimeoutError("Server did not start")
+
+
+def throughput(workers: int, clients: int, concurrency: int, duration: float) -> float:
+    """Requests per second sustained by a server with `workers` workers."""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = os.environ | {
+        "PYTHONPATH": str(SRC),
+        "PORT": str(port),
+        "API_HOST": "127.0.0.1",
+        "WEB_CONCURRENCY": str(workers),
+        "LOG_LEVEL": "error",
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "server"],
+        env=env,
+        cwd=SRC,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_ready(base)
+        # Let every worker finish its lifespan startup before measuring
+        _client(base, concurrency, 1.0)
+        with ProcessPoolExecutor(clients) as pool:
+            start = time.perf_counter()
+            done = sum(
+                pool.map(
+                    _client,
+                    [base] * clients,
+                    [concurrency] * clients,
+                    [duration] * clients,
+                )
+            )
+            elapsed = time.perf_counter() - start
+        return done / elapsed
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}, client processes: {args.clients}")
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        rate = throughput(workers, args.clients, args.concurrency, args.duration)
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>10.0f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""JSON responses for Unconditional API.
+
+Response models are serialized straight to bytes by pydantic's Rust
+serializer, bypassing FastAPI's re-validation and `jsonable_encoder` pass.
+
+Static payloads (opening message, crisis response, health check) are
+validated and serialized once at startup. Serving one is a byte splice of
+the current timestamp, with no model construction, validation or JSON
+encoding per request.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+# Stand-in timestamp, replaced by the current time on each render
+_TIMESTAMP_PLACEHOLDER = "__prerendered_timestamp__"
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+class PydanticJSONResponse(Response):
+    """
+    JSON response serializing pydantic models directly to bytes.
+
+    Return an instance from an endpoint (with `response_model` set on the
+    route for the schema) and FastAPI sends it as is: the model, already
+    validated when it was built, is not validated or encoded again.
+    Anything other than a model is encoded like FastAPI's JSONResponse.
+    """
+
+    media_type = JSON_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode()
+
+
+class PrerenderedJSON:
+    """
+    A model's JSON, serialized once, with a fresh timestamp per render.
+
+    Args:
+        model: Fully built response model
+        timestamp_field: Field holding an ISO 8601 timestamp, or None if
+            the payload is entirely static
+
+    Safety reasoning:
+        - The model is validated once when built, so a bad constant fails
+          at startup rather than in front of a user in crisis
+        - Rendering cannot fail: it only joins bytes
+    """
+
+    def __init__(self, model: BaseModel, timestamp_field: str | None = "timestamp"):
+        if timestamp_field is None:
+            self._prefix, self._suffix = model.model_dump_json().encode(), b""
+        else:
+            template = model.model_copy(
+                update={timestamp_field: _TIMESTAMP_PLACEHOLDER}
+            ).model_dump_json()
+            parts = template.encode().split(f'"{_TIMESTAMP_PLACEHOLDER}"'.encode())
+            if len(parts) != 2:
+                raise ValueError(f"Cannot splice {timestamp_field!r} into {template}")
+            self._prefix, self._suffix = parts
+        self.timestamped = timestamp_field is not None
+        static = self._prefix + self._suffix
+        self.etag = '"' + hashlib.sha256(static).hexdigest()[:32] + '"'
+        if self.timestamped:
+            # Not byte-identical across renders: only a weak validator fits
+            self.etag = "W/" + self.etag
+
+    def render(self) -> bytes:
+        """JSON bytes stamped with the current time."""
+        if not self.timestamped:
+            return self._prefix
+        timestamp = datetime.now(timezone.utc).isoformat().encode()
+        return b"".join((self._prefix, b'"', timestamp, b'"', self._suffix))
+
+    def text(self) -> str:
+        """JSON text stamped with the current time (for SSE and WebSocket)."""
+        return self.render().decode()
+
+    def response(self) -> Response:
+        """Plain JSON response."""
+        return Response(self.render(), media_type=JSON_MEDIA_TYPE)
+
+    def cacheable_response(self, request: Request) -> Response:
+        """
+        JSON response with ETag revalidation.
+
+        The ETag covers everything but the timestamp, so it only changes
+        when the content does; with a timestamp the bytes differ on every
+        render, so it is weak. A matching If-None-Match gets a bodyless 304.
+        """
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(self.render(), media_type=JSON_MEDIA_TYPE, headers=headers)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison).
+
+    Args:
+        if_none_match: Header value, e.g. '"abc", W/"def"' or '*'
+        etag: Current ETag, quoted, weak (W/) or strong
+
+    Returns:
+        True if the client's cached copy is current
+    """
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
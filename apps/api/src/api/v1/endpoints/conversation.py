@@ -11,26 +11,88 @@ This is the core orchestrator. Every message flows through the same pipeline:
 Safety is not a feature. It is the foundation.
 """
 
+import json
+import logging
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from contextlib import AsyncExitStack
 from datetime import datetime, timezone
-
-from fastapi import APIRouter, HTTPException
-from pydantic_ai import Agent
-
-from models.message import ConversationHistory, UserMessage
+from time import perf_counter
+from typing import TYPE_CHECKING, Annotated
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+
+from api.request_body import json_body_openapi, parse_json_body
+from api.responses import PrerenderedJSON, PydanticJSONResponse
+from core.config import settings
+from core.deadline import Deadline, DeadlineExceededError
+from core.idempotency import (
+    IDEMPOTENCY_KEY_HEADER,
+    IDEMPOTENT_REPLAYED_HEADER,
+    IdempotencyConflictError,
+    IdempotencyKeyError,
+    IdempotencyStore,
+    Outcome,
+    fingerprint,
+    store_key,
+)
+from core.metrics import LLM_FALLBACKS, RATE_LIMITED, STAGE_SECONDS
+from core.rate_limit import connection_client, rate_limiter, retry_after_header
+from models.message import MessageRequest, UserMessage
 from models.response import (
     ConversationResponse,
     CrisisResource,
     CrisisResponse,
+    HealthStatus,
     ResponseType,
 )
+from prompts.history import build_message_history, max_history_turns
 from prompts.opening import get_opening_message
 from prompts.system import get_system_prompt
 from safety.banned_patterns import contains_banned_content
 from safety.crisis_detection import detect_crisis
-from safety.guardrails import apply_guardrails, check_length
-from services.llm.factory import get_llm_model
+from safety.guardrails import (
+    GUARDRAIL_REPLACEMENT,
+    MAX_RESPONSE_LENGTH,
+    StreamingGuardrail,
+    apply_guardrails,
+    check_length,
+    last_sentence_end,
+)
+from services.llm import factory
+from services.llm.concurrency import LLMOverloadedError
+from services.llm.generation import (
+    generate_response,
+    llm_hedger,
+    llm_limiter,
+    stream_response,
+)
+from services.llm.loader import ensure_llm_stack
+from services.llm.routing import LLMUnavailableError
+from services.llm.usage import (
+    TokenBudgetExhaustedError,
+    history_token_budget,
+    track_usage,
+)
+
+if TYPE_CHECKING:
+    from pydantic_ai.messages import ModelMessage
+
+# Models returned as PydanticJSONResponse are serialized once, in Rust
+router = APIRouter(default_response_class=PydanticJSONResponse)
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 # Global crisis resources
@@ -56,6 +118,166 @@ CRISIS_RESOURCES = [
     ),
 ]
 
+# Per-stage latency series, bound once so recording is a single call
+BANNED_CHECK_SECONDS = STAGE_SECONDS.labels("banned_check")
+CRISIS_DETECTION_SECONDS = STAGE_SECONDS.labels("crisis_detection")
+PROMPT_ASSEMBLY_SECONDS = STAGE_SECONDS.labels("prompt_assembly")
+LLM_CALL_SECONDS = STAGE_SECONDS.labels("llm_call")
+GUARDRAILS_SECONDS = STAGE_SECONDS.labels("guardrails")
+LENGTH_CHECK_SECONDS = STAGE_SECONDS.labels("length_check")
+
+# Safe reply when the LLM cannot produce a response
+LLM_FALLBACK_RESPONSE = (
+    "I'm having trouble processing that right now. Could you try sharing that again?"
+)
+
+
+# Retry-After when every LLM slot and queue place on this worker is taken
+LLM_SATURATED_RETRY_AFTER = 5.0
+
+
+# Replies to /message requests with an Idempotency-Key, in flight and done
+idempotency_store: IdempotencyStore[ConversationResponse] = IdempotencyStore(
+    ttl=settings.idempotency_ttl, max_keys=settings.idempotency_max_keys
+)
+
+
+# Message bodies are validated from raw JSON bytes in a single pass
+MESSAGE_REQUEST_ADAPTER = TypeAdapter(MessageRequest)
+MESSAGE_REQUEST_OPENAPI = json_body_openapi(MESSAGE_REQUEST_ADAPTER)
+
+
+async def message_request(request: Request) -> MessageRequest:
+    """Parse a conversation request body (dependency)."""
+    return await parse_json_body(request, MESSAGE_REQUEST_ADAPTER)
+
+
+def is_banned(message_text: str) -> bool:
+    """Timed banned input check (pipeline step 1)."""
+    start = perf_counter()
+    banned = contains_banned_content(message_text)
+    BANNED_CHECK_SECONDS.observe(perf_counter() - start)
+    return banned
+
+
+def is_crisis(message_text: str) -> bool:
+    """Timed crisis detection (pipeline step 2)."""
+    start = perf_counter()
+    result = detect_crisis(message_text)
+    CRISIS_DETECTION_SECONDS.observe(perf_counter() - start)
+    if result.is_crisis:
+        logger.warning(
+            "crisis_detected",
+            extra={"stage": "crisis_detection", "severity": result.severity},
+        )
+    return result.is_crisis
+
+
+def message_retry_after(client: str | None) -> float:
+    """
+    Charge the base cost of a message that is not a crisis.
+
+    Args:
+        client: Client key from `connection_client`
+
+    Returns:
+        0.0 if admitted, otherwise seconds for Retry-After
+
+    Safety reasoning:
+        - Called only for messages crisis detection has cleared (or that
+          were rejected as banned), so a crisis response is never charged
+          and never refused
+    """
+    retry_after = rate_limiter.charge(client, settings.rate_limit_base_cost)
+    if retry_after:
+        RATE_LIMITED.inc("client")
+    return retry_after
+
+
+def llm_retry_after(client: str | None) -> float:
+    """
+    Admit a checked message to the LLM stage.
+
+    Charges the client's LLM cost, unless the worker's LLM queue is already
+    full, in which case nothing is charged.
+
+    Args:
+        client: Client key from `connection_client`
+
+    Returns:
+        0.0 if admitted, otherwise seconds for Retry-After
+
+    Safety reasoning:
+        - Runs after the banned and crisis checks, so a crisis response
+          never waits on, or pays for, LLM capacity
+    """
+    if llm_limiter.saturated:
+        RATE_LIMITED.inc("global")
+        return LLM_SATURATED_RETRY_AFTER
+    retry_after = rate_limiter.charge(client, settings.rate_limit_llm_cost)
+    if retry_after:
+        RATE_LIMITED.inc("llm")
+    return retry_after
+
+
+def too_many_requests(retry_after: float) -> HTTPException:
+    """429 with Retry-After."""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests",
+        headers={"Retry-After": retry_after_header(retry_after)},
+    )
+
+
+def banned_message(client: str | None) -> HTTPException:
+    """
+    Error for a message with banned content, charged the base cost.
+
+    Returns:
+        400, or 429 with Retry-After if the client is over its limit
+    """
+    if retry_after := message_retry_after(client):
+        return too_many_requests(retry_after)
+    return HTTPException(
+        status_code=400,
+        detail="Message contains inappropriate content",
+    )
+
+
+def record_llm_fallback(error: Exception) -> None:
+    """
+    Log and count an LLM call answered with the safe fallback.
+
+    Every failure ends in the fallback, so none is swallowed silently:
+    unexpected ones are logged with their traceback. Only the error type
+    and the frames are logged (see core.logging): provider error messages
+    can echo the prompt, and message content never goes to the logs.
+    Failures of each model are logged by the router.
+    """
+    if isinstance(error, LLMOverloadedError):
+        reason = "overloaded"
+    elif isinstance(error, DeadlineExceededError):
+        reason = "deadline"
+    elif isinstance(error, LLMUnavailableError):
+        reason = "unavailable"
+    elif isinstance(error, TokenBudgetExhaustedError):
+        reason = "budget"
+    else:
+        reason = "error"
+    LLM_FALLBACKS.inc(reason)
+    logger.log(
+        logging.WARNING
+        if reason in ("overloaded", "deadline", "budget")
+        else logging.ERROR,
+        "llm_fallback",
+        extra={
+            "stage": "llm_call",
+            "reason": reason,
+            "error": type(error).__name__,
+        },
+        exc_info=error if reason == "error" else None,
+    )
+
 
 def build_crisis_response() -> CrisisResponse:
     """
@@ -86,49 +308,69 @@ def build_crisis_response() -> CrisisResponse:
     )
 
 
-@router.get("/opening")
-async def get_opening() -> ConversationResponse:
+# Static payloads, validated and serialized once; only the timestamp varies
+CRISIS_RESPONSE = PrerenderedJSON(build_crisis_response())
+OPENING_RESPONSE = PrerenderedJSON(
+    ConversationResponse(
+        type=ResponseType.NORMAL,
+        content=get_opening_message(),
+        timestamp=datetime.now(timezone.utc).isoformat(),
+    )
+)
+HEALTH_RESPONSE = PrerenderedJSON(HealthStatus(), timestamp_field=None)
+
+
+@router.get("/opening", response_model=ConversationResponse)
+async def get_opening(request: Request) -> Response:
     """
     Get the opening message.
 
     Returns:
-        ConversationResponse with opening message
+        ConversationResponse with opening message, with an ETag so clients
+        revalidate (304) rather than refetch
 
     Safety reasoning:
         - Sets expectations before any user input
         - Establishes tone and boundaries
         - User sees this first, every time
     """
-    return ConversationResponse(
-        type=ResponseType.NORMAL,
-        content=get_opening_message(),
-        timestamp=datetime.now(timezone.utc).isoformat(),
-    )
+    return OPENING_RESPONSE.cacheable_response(request)
 
 
-@router.post("/message")
+@router.post(
+    "/message",
+    response_model=ConversationResponse | CrisisResponse,
+    openapi_extra=MESSAGE_REQUEST_OPENAPI,
+)
 async def process_message(
-    user_message: UserMessage,
-    history: ConversationHistory = ConversationHistory(),
-) -> ConversationResponse | CrisisResponse:
+    request: Request,
+    payload: Annotated[MessageRequest, Depends(message_request)],
+) -> Response:
     """
     Process user message through full safety and generation pipeline.
 
     Args:
-        user_message: User's message
-        history: Conversation history (optional, for context)
+        request: Incoming request (carries the rate limit client)
+        payload: User's message and conversation history (optional, for
+            context)
 
     Returns:
-        ConversationResponse or CrisisResponse
+        ConversationResponse or CrisisResponse. With LLM_USAGE_HEADERS on,
+        LLM replies carry Server-Timing and X-LLM-Usage headers. Repeats
+        of an Idempotency-Key get the first request's reply, marked with
+        Idempotent-Replayed.
 
     Raises:
-        HTTPException: If banned content detected or processing fails
+        HTTPException: If banned content detected or processing fails, 429
+            if the client or the worker is over its LLM limit, 400 for a
+            malformed Idempotency-Key, or 422 for a key reused with a
+            different message
 
     Pipeline:
         1. Check for banned input patterns
         2. Detect crisis language
         3. If crisis → return crisis response immediately
-        4. If safe → generate LLM response
+        4. If safe → generate LLM response (once per Idempotency-Key)
         5. Apply guardrails to LLM output
         6. Return formatted response
 
@@ -136,68 +378,466 @@ async def process_message(
         - Every message goes through the same checks
         - Crisis detection happens before LLM interaction
         - Guardrails applied to all LLM outputs
-        - No message bypasses safety systems
+        - No message bypasses safety systems, repeats included
+        - A hard deadline caps the wait: a hung provider gets the fallback
     """
-    message_text = user_message.content
+    deadline = Deadline.after(settings.request_deadline)
+    message_text = payload.content
+    client = connection_client(request)
 
     # Step 1: Check for banned input patterns
-    if contains_banned_content(message_text):
-        raise HTTPException(
-            status_code=400,
-            detail="Message contains inappropriate content",
+    if is_banned(message_text):
+        raise banned_message(client)
+
+    # Step 2: Crisis detection (pre-rendered: no work beyond detection)
+    if is_crisis(message_text):
+        return CRISIS_RESPONSE.response()
+
+    # Every other message pays the base cost
+    if retry_after := message_retry_after(client):
+        raise too_many_requests(retry_after)
+
+    async def reply() -> ConversationResponse:
+        # Only messages that reach the LLM pay for it
+        if retry_after := llm_retry_after(client):
+            raise too_many_requests(retry_after)
+
+        # Step 3: Prepare context for LLM
+        system_prompt, message_history = await assemble_prompt(
+            payload.history.messages, message_text
         )
 
-    # Step 2: Crisis detection
-    crisis_result = detect_crisis(message_text)
-    if crisis_result.is_crisis:
-        return build_crisis_response()
+        # Steps 4-5: Generate a guarded LLM response within the deadline
+        safe_response = await generate_safe_reply(
+            message_text, system_prompt, message_history, deadline
+        )
+        return normal_response(safe_response)
+
+    with track_usage() as usage:
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        outcome: Outcome = "generated"
+        if key is None:
+            content = await reply()
+        else:
+            content, outcome = await idempotent_reply(client, key, payload, reply)
+
+    # Step 6: Return formatted response (built once, so not re-validated)
+    response = PydanticJSONResponse(content)
+    if outcome != "generated":
+        response.headers[IDEMPOTENT_REPLAYED_HEADER] = "true"
+    elif settings.llm_usage_headers:
+        response.headers["Server-Timing"] = usage.server_timing()
+        response.headers["X-LLM-Usage"] = usage.header()
+    return response
+
+
+async def idempotent_reply(
+    client: str | None,
+    key: str,
+    payload: MessageRequest,
+    reply: Callable[[], Awaitable[ConversationResponse]],
+) -> tuple[ConversationResponse, Outcome]:
+    """
+    Reply once per client and Idempotency-Key.
 
-    # Step 3: Prepare context for LLM
-    system_prompt = get_system_prompt()
+    Args:
+        client: Rate limit client the key is scoped to
+        key: Idempotency-Key header value
+        payload: Request, fingerprinted to detect a reused key
+        reply: Generates the reply for the first request with the key
+
+    Returns:
+        The reply, and whether it was generated, coalesced or replayed
 
-    # Add current message to history
-    history.add_user_message(message_text)
+    Raises:
+        HTTPException: 400 for a malformed key, 422 for a key reused with a
+            different message
 
-    # Step 4: Generate LLM response using pydantic-ai
+    Safety reasoning:
+        - Fallback replies are not stored, so a retry after a provider
+          failure gets a fresh attempt
+    """
     try:
-        # Create agent with system prompt as instructions
-        agent = Agent(
-            get_llm_model(),
-            instructions=system_prompt,
+        scoped_key = store_key(client, key)
+    except IdempotencyKeyError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from None
+    try:
+        return await idempotency_store.run(
+            scoped_key,
+            fingerprint(payload.model_dump_json()),
+            reply,
+            keep=lambda response: response.content != LLM_FALLBACK_RESPONSE,
         )
+    except IdempotencyConflictError:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used for a different message",
+        ) from None
 
-        # For now, just use the current message
-        # TODO: Implement proper conversation history with pydantic-ai message format
-        result = agent.run_sync(
-            message_text,
-            model_settings={
-                "temperature": 0.7,
-                "max_tokens": 500,
-            },
-        )
 
-        response_text = result.output
-    except Exception as e:
-        # Log error, return safe fallback
-        print(f"[LLM ERROR] {e}")
-        response_text = (
-            "I'm having trouble processing that right now. "
-            "Could you try sharing that again?"
+async def assemble_prompt(
+    turns: Sequence[dict[str, str]], message_text: str
+) -> "tuple[str, list[ModelMessage]]":
+    """
+    Timed prompt assembly (pipeline step 3).
+
+    Args:
+        turns: Prior conversation turns, oldest first
+        message_text: Current user message (sent separately)
+
+    Returns:
+        System prompt and prior turns fitted to the token budget (halved
+        while the daily LLM token budget runs low)
+    """
+    # After a cold start, wait for the LLM stack off the event loop
+    await ensure_llm_stack()
+    start = perf_counter()
+    system_prompt = get_system_prompt()
+    message_history = build_message_history(turns, message_text, history_token_budget())
+    PROMPT_ASSEMBLY_SECONDS.observe(perf_counter() - start)
+    return system_prompt, message_history
+
+
+async def generate_safe_reply(
+    message_text: str,
+    system_prompt: str,
+    message_history: "list[ModelMessage]",
+    deadline: Deadline,
+) -> str:
+    """
+    Generate an LLM reply to a checked message and apply guardrails.
+
+    With hedging enabled, a slow call is hedged with a second one, and the
+    first reply that passes the guardrails wins.
+
+    Args:
+        message_text: User message that passed banned and crisis checks
+        system_prompt: System instructions
+        message_history: Prior turns, already fitted to the token budget
+        deadline: Request deadline; the LLM gets what is left of it, less
+            the post-processing reserve
+
+    Returns:
+        Guarded response text (a safe fallback if generation fails or runs
+        past the deadline)
+
+    Safety reasoning:
+        - Shared by every transport, so no path skips the guardrails
+        - Every candidate reply, hedged or not, is guarded before it can win
+        - Provider errors never reach the user, only the fallback does
+        - At the deadline the provider call is cancelled, not left running
+    """
+
+    async def guarded(model: str | None) -> str:
+        # Step 4: Generate LLM response using pydantic-ai
+        response_text = await generate_response(
+            message_text, system_prompt, message_history, model=model
         )
+        # Step 5: Apply post-processing guardrails
+        start = perf_counter()
+        safe_text = apply_guardrails(response_text)
+        GUARDRAILS_SECONDS.observe(perf_counter() - start)
+        return safe_text
+
+    # llm_call covers the whole generation as the user waits for it
+    start = perf_counter()
+    try:
+        async with deadline.enforce(reserve=settings.post_llm_reserve):
+            if settings.llm_hedge_enabled:
+                safe_response = await llm_hedger.run(
+                    lambda: guarded(None),
+                    lambda: guarded(factory.get_hedge_model()),
+                    accept=lambda text: text != GUARDRAIL_REPLACEMENT,
+                )
+            else:
+                safe_response = await guarded(None)
+    except Exception as e:
+        # Provider error, deadline passed, or too many conversations in
+        # flight on this worker: log it and return the safe fallback
+        record_llm_fallback(e)
+        safe_response = LLM_FALLBACK_RESPONSE
+    LLM_CALL_SECONDS.observe(perf_counter() - start)
 
-    # Step 5: Apply post-processing guardrails
-    safe_response = apply_guardrails(response_text)
+    start = perf_counter()
     safe_response = check_length(safe_response)
+    LENGTH_CHECK_SECONDS.observe(perf_counter() - start)
+    return safe_response
 
-    # Step 6: Return formatted response
+
+def sse_event(event: str, data: str) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def normal_response(content: str) -> ConversationResponse:
+    """Build a normal conversation response stamped with the current time."""
     return ConversationResponse(
         type=ResponseType.NORMAL,
-        content=safe_response,
+        content=content,
         timestamp=datetime.now(timezone.utc).isoformat(),
     )
 
 
-@router.get("/health")
-async def health_check() -> dict[str, str]:
+async def stream_events(
+    message_text: str,
+    system_prompt: str,
+    message_history: "list[ModelMessage]",
+    deadline: Deadline,
+) -> AsyncIterator[str]:
+    """
+    Stream guarded LLM output as Server-Sent Events.
+
+    Events:
+        token: {"content": str} - next piece of the response to append
+        replace: ConversationResponse - discard everything shown, show this
+        done: ConversationResponse - final response, authoritative content;
+            the tokens sent before it add up to the same text
+
+    Metrics:
+        llm_call covers the whole stream; guardrails is the total time spent
+        in incremental matching
+
+    Safety reasoning:
+        - Every token passes the incremental guardrail before it is sent
+        - On a violation the provider stream is closed (generation cancelled)
+          and the client is told to replace what it has shown
+        - Provider errors end in the same safe fallback as /message
+        - Every wait on the provider is bounded by what is left of the
+          deadline; past it the stream is cancelled and replaced by the
+          fallback
+        - Past half the length limit, where a reply cut at the limit may
+          end, only whole sentences are sent, so nothing shown is taken
+          back; in the rare case it must be, the reply is replaced
+    """
+    guardrail = StreamingGuardrail()
+    guardrail_seconds = 0.0
+    sent = ""
+    unsent = ""
+    at_limit = False
+    reserve = settings.post_llm_reserve
+    start = perf_counter()
+    try:
+        async with AsyncExitStack() as stack:
+            stream = await deadline.wait(
+                stack.enter_async_context(
+                    stream_response(message_text, system_prompt, message_history)
+                ),
+                reserve,
+            )
+            deltas = aiter(stream)
+            while (
+                delta := await deadline.wait(anext(deltas, None), reserve)
+            ) is not None:
+                feed_start = perf_counter()
+                released = guardrail.feed(delta)
+                guardrail_seconds += perf_counter() - feed_start
+                if guardrail.blocked:
+                    stream.cancel()
+                    break
+                if len(guardrail.text) >= MAX_RESPONSE_LENGTH:
+                    # Nothing more would be shown: stop generating. The
+                    # rest is sent below, cut to a sentence
+                    at_limit = True
+                    stream.cancel()
+                    break
+                unsent += released
+                if len(guardrail.text) > MAX_RESPONSE_LENGTH // 2:
+                    # The reply may now be cut at any sentence end
+                    ready = last_sentence_end(unsent)
+                else:
+                    ready = len(unsent)
+                if ready:
+                    sent += unsent[:ready]
+                    yield sse_event("token", json.dumps({"content": unsent[:ready]}))
+                    unsent = unsent[ready:]
+    except Exception as e:
+        record_llm_fallback(e)
+        yield sse_event(
+            "replace", normal_response(LLM_FALLBACK_RESPONSE).model_dump_json()
+        )
+        return
+    finally:
+        LLM_CALL_SECONDS.observe(perf_counter() - start)
+
+    feed_start = perf_counter()
+    guardrail.finish()
+    GUARDRAILS_SECONDS.observe(guardrail_seconds + perf_counter() - feed_start)
+    if guardrail.blocked:
+        yield sse_event(
+            "replace", normal_response(GUARDRAIL_REPLACEMENT).model_dump_json()
+        )
+        return
+
+    start = perf_counter()
+    final_text = check_length(guardrail.text, truncated=at_limit or stream.truncated)
+    LENGTH_CHECK_SECONDS.observe(perf_counter() - start)
+
+    if not final_text.startswith(sent):
+        # Cut back to before what is already on screen
+        yield sse_event("replace", normal_response(final_text).model_dump_json())
+        return
+    if rest := final_text[len(sent) :]:
+        yield sse_event("token", json.dumps({"content": rest}))
+    yield sse_event("done", normal_response(final_text).model_dump_json())
+
+
+@router.post("/message/stream", openapi_extra=MESSAGE_REQUEST_OPENAPI)
+async def stream_message(
+    request: Request,
+    payload: Annotated[MessageRequest, Depends(message_request)],
+) -> Response:
+    """
+    Process user message and stream the response as Server-Sent Events.
+
+    Args:
+        request: Incoming request (carries the rate limit client)
+        payload: User's message and conversation history (optional, for
+            context)
+
+    Returns:
+        text/event-stream of token, replace, done or crisis events
+
+    Raises:
+        HTTPException: If banned content detected, or 429 if the client or
+            the worker is over its LLM limit
+
+    Safety reasoning:
+        - Same banned and crisis checks as /message, before any generation
+        - A crisis is a single crisis event carrying the CrisisResponse
+        - Guardrails run incrementally over the growing output
+        - The same deadline as /message bounds the whole stream
+    """
+    deadline = Deadline.after(settings.request_deadline)
+    message_text = payload.content
+    client = connection_client(request)
+
+    # Step 1: Check for banned input patterns
+    if is_banned(message_text):
+        raise banned_message(client)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    # Step 2: Crisis detection
+    if is_crisis(message_text):
+        return Response(
+            sse_event("crisis", CRISIS_RESPONSE.text()),
+            media_type="text/event-stream",
+            headers=headers,
+        )
+
+    # Every other message pays the base cost, and the LLM cost on top
+    if retry_after := message_retry_after(client) or llm_retry_after(client):
+        raise too_many_requests(retry_after)
+
+    # Step 3: Prepare context for LLM
+    system_prompt, message_history = await assemble_prompt(
+        payload.history.messages, message_text
+    )
+
+    # Steps 4-6: Stream guarded generation
+    return StreamingResponse(
+        stream_events(message_text, system_prompt, message_history, deadline),
+        media_type="text/event-stream",
+        headers=headers,
+    )
+
+
+def ws_error(detail: str) -> str:
+    """Format a WebSocket error frame (the connection stays open)."""
+    return json.dumps({"type": "error", "detail": detail})
+
+
+def ws_rate_limited(retry_after: float) -> str:
+    """Format a WebSocket error frame for a rate-limited message."""
+    seconds = retry_after_header(retry_after)
+    return ws_error(f"Too many messages. Try again in {seconds} seconds.")
+
+
+def ws_rejected(client: str | None, detail: str) -> str:
+    """Error frame for a rejected message, charged the base cost."""
+    if retry_after := message_retry_after(client):
+        return ws_rate_limited(retry_after)
+    return ws_error(detail)
+
+
+@router.websocket("/ws")
+async def conversation_socket(websocket: WebSocket) -> None:
+    """
+    Hold a conversation over a WebSocket, one message per frame.
+
+    Protocol:
+        client → server: {"content": str} (a UserMessage), new message only
+        server → client: ConversationResponse for each reply
+        server → client: {"type": "error", "detail": str} for rejected input
+        server → client: CrisisResponse, then the socket is closed
+
+    Safety reasoning:
+        - Every message runs the same banned, crisis, LLM and guardrail
+          pipeline as /message
+        - The conversation lives in memory for this connection only and is
+          never persisted: closing the socket forgets it
+        - Held turns are capped at what the token budget could ever use, so
+          per-message cost does not grow with conversation length
+        - Fallback replies are not held, so later replies are not
+          conditioned on a canned error message
+        - A crisis locks the session by closing the connection
+        - Each message gets its own deadline, as on /message
+        - Each message is rate limited like an HTTP message, once crisis
+          detection has cleared it: a crisis is never refused
+    """
+    client = connection_client(websocket)
+    await websocket.accept()
+    turns: deque[dict[str, str]] = deque(
+        maxlen=max_history_turns(settings.history_token_budget)
+    )
+
+    try:
+        while True:
+            frame = await websocket.receive_text()
+            deadline = Deadline.after(settings.request_deadline)
+            try:
+                message_text = UserMessage.model_validate_json(frame).content
+            except ValidationError:
+                await websocket.send_text(ws_rejected(client, "Invalid message"))
+                continue
+
+            # Step 1: Check for banned input patterns
+            if is_banned(message_text):
+                await websocket.send_text(
+                    ws_rejected(client, "Message contains inappropriate content")
+                )
+                continue
+
+            # Step 2: Crisis detection
+            if is_crisis(message_text):
+                await websocket.send_text(CRISIS_RESPONSE.text())
+                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+                return
+
+            # Every other message pays the base cost, and the LLM cost on top
+            if retry_after := message_retry_after(client) or llm_retry_after(client):
+                await websocket.send_text(ws_rate_limited(retry_after))
+                continue
+
+            # Steps 3-5: Generate a guarded LLM response
+            system_prompt, message_history = await assemble_prompt(turns, message_text)
+            safe_response = await generate_safe_reply(
+                message_text, system_prompt, message_history, deadline
+            )
+
+            # Held for this connection only, bounded by the deque. A fallback
+            # asks the user to send the message again: neither is held
+            if safe_response != LLM_FALLBACK_RESPONSE:
+                turns.append({"role": "user", "content": message_text})
+                turns.append({"role": "assistant", "content": safe_response})
+
+            # Step 6: Return formatted response
+            await websocket.send_text(normal_response(safe_response).model_dump_json())
+    except WebSocketDisconnect:
+        return
+
+
+@router.get("/health", response_model=HealthStatus)
+async def health_check() -> Response:
     """Health check endpoint for deployment monitoring."""
-    return {"status": "ok", "service": "unconditional-api"}
+    return HEALTH_RESPONSE.response()
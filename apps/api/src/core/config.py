@@ -21,15 +21,102 @@ class Settings:
     def __init__(self):
         self.environment = Environment(os.getenv("ENVIRONMENT", "development"))
         self.log_level = os.getenv("LOG_LEVEL", "info")
+        self.log_queue_size = int(os.getenv("LOG_QUEUE_SIZE", 10000))
 
         # LLM configuration
         self.llm_provider = os.getenv("LLM_PROVIDER", "openai")
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
 
+        # LLM concurrency limits (per worker process)
+        self.llm_max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", 256))
+        self.llm_max_queue = int(os.getenv("LLM_MAX_QUEUE", 512))
+        self.llm_queue_timeout = float(os.getenv("LLM_QUEUE_TIMEOUT", 10))
+
+        # LLM provider connection pooling
+        self.llm_http_pool_size = int(os.getenv("LLM_HTTP_POOL_SIZE", 100))
+        self.llm_http_keepalive = int(os.getenv("LLM_HTTP_KEEPALIVE", 20))
+        self.llm_connect_timeout = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+        self.llm_read_timeout = float(os.getenv("LLM_READ_TIMEOUT", 60))
+        self.llm_warmup = os.getenv("LLM_WARMUP", "false").lower() == "true"
+
+        # Provider prompt-prefix caching (cache markers and cache keys)
+        self.llm_prompt_cache = os.getenv("LLM_PROMPT_CACHE", "true").lower() == "true"
+
+        # LLM token accounting: daily budget across all workers (0: none),
+        # remaining fraction below which history is cut back, and whether
+        # /message responses carry Server-Timing and usage headers
+        self.llm_daily_token_budget = int(os.getenv("LLM_DAILY_TOKEN_BUDGET", 0))
+        self.llm_token_budget_low = float(os.getenv("LLM_TOKEN_BUDGET_LOW", 0.1))
+        self.llm_usage_headers = (
+            os.getenv("LLM_USAGE_HEADERS", "false").lower() == "true"
+        )
+
+        # LLM record/replay cassette (off unless a mode is set)
+        self.llm_cassette_mode = os.getenv("LLM_CASSETTE_MODE", "").lower() or None
+        self.llm_cassette_path = os.getenv("LLM_CASSETTE", "llm_cassette.jsonl")
+        self.llm_cassette_replay_latency = (
+            os.getenv("LLM_CASSETTE_REPLAY_LATENCY", "false").lower() == "true"
+        )
+
+        # Routing across LLM_MODELS: per-model breaker and concurrency
+        self.llm_breaker_window = int(os.getenv("LLM_BREAKER_WINDOW", 20))
+        self.llm_breaker_error_rate = float(os.getenv("LLM_BREAKER_ERROR_RATE", 0.5))
+        self.llm_breaker_min_calls = int(os.getenv("LLM_BREAKER_MIN_CALLS", 10))
+        self.llm_breaker_cooldown = float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+        self.llm_model_max_concurrency = int(
+            os.getenv("LLM_MODEL_MAX_CONCURRENCY", self.llm_max_concurrency)
+        )
+
+        # Hedged LLM requests (opt-in; hedge model is LLM_HEDGE_MODEL)
+        self.llm_hedge_enabled = (
+            os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+        )
+        self.llm_hedge_percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+        self.llm_hedge_initial_delay = float(os.getenv("LLM_HEDGE_INITIAL_DELAY", 2))
+        self.llm_hedge_budget = float(os.getenv("LLM_HEDGE_BUDGET", 0.05))
+
+        # Per-client rate limits, in tokens: every message pays the base
+        # cost, messages that reach the LLM pay the LLM cost on top
+        self.rate_limit_enabled = (
+            os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+        )
+        self.rate_limit_rate = float(os.getenv("RATE_LIMIT_RATE", 1))
+        self.rate_limit_burst = float(os.getenv("RATE_LIMIT_BURST", 40))
+        self.rate_limit_base_cost = float(os.getenv("RATE_LIMIT_BASE_COST", 1))
+        self.rate_limit_llm_cost = float(os.getenv("RATE_LIMIT_LLM_COST", 4))
+        self.rate_limit_max_clients = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", 100000))
+
+        # Idempotency-Key on /message: seconds a completed reply is replayed
+        # for, and most keys kept (least recently used are evicted)
+        self.idempotency_ttl = float(os.getenv("IDEMPOTENCY_TTL", 300))
+        self.idempotency_max_keys = int(os.getenv("IDEMPOTENCY_MAX_KEYS", 10000))
+
+        # Request deadline: hard ceiling on time to a reply, in seconds, and
+        # the part of it kept back from the LLM for post-processing
+        self.request_deadline = float(os.getenv("REQUEST_DEADLINE", 20))
+        self.post_llm_reserve = float(os.getenv("POST_LLM_RESERVE", 0.05))
+
+        # Safety pattern pack (default: the pack shipped in safety/packs)
+        self.pattern_pack_path = os.getenv("PATTERN_PACK") or None
+        self.pattern_pack_poll_interval = float(
+            os.getenv("PATTERN_PACK_POLL_INTERVAL", 10)
+        )
+
+        # Prompt assembly
+        self.history_token_budget = int(os.getenv("HISTORY_TOKEN_BUDGET", 2000))
+
         # API configuration
         self.api_host = os.getenv("API_HOST", "0.0.0.0")
         self.api_port = int(os.getenv("PORT", 8000))
 
+        # Production server: worker processes (0: one per available CPU) and
+        # seconds in-flight requests get to finish after SIGTERM
+        self.web_concurrency = int(os.getenv("WEB_CONCURRENCY", 0))
+        self.shutdown_grace_period = float(os.getenv("SHUTDOWN_GRACE_PERIOD", 25))
+        # Proxies whose X-Forwarded-For is trusted for the client address
+        # (comma-separated, "*": any). Rate limits key on that address
+        self.forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1,::1")
+
     @property
     def is_development(self) -> bool:
         """Check if running in development mode."""
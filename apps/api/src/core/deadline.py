@@ -0,0 +1,85 @@
+"""Per-request deadlines for Unconditional API.
+
+A deadline is fixed when a message arrives and handed to every stage after
+it. The safety checks run first and take microseconds; the LLM call gets
+whatever is left, minus a small reserve for the guardrails that follow it.
+When the deadline passes, the provider call is cancelled and the user gets
+the safe fallback instead of waiting on a hung provider.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from time import monotonic
+from typing import Self
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a stage runs past the request deadline."""
+
+
+@dataclass(frozen=True, slots=True)
+class Deadline:
+    """
+    Absolute point in time a request must be answered by.
+
+    Attributes:
+        expires_at: time.monotonic() value at which the deadline passes
+    """
+
+    expires_at: float
+
+    @classmethod
+    def after(cls, seconds: float) -> Self:
+        """Deadline `seconds` from now."""
+        return cls(monotonic() + seconds)
+
+    def remaining(self, reserve: float = 0.0) -> float:
+        """
+        Seconds left, keeping `reserve` seconds back for later stages.
+
+        Returns:
+            Seconds available, never negative
+        """
+        return max(self.expires_at - monotonic() - reserve, 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return monotonic() >= self.expires_at
+
+    @asynccontextmanager
+    async def enforce(self, reserve: float = 0.0) -> AsyncIterator[None]:
+        """
+        Cancel the block if it runs past the deadline (less `reserve`).
+
+        Raises:
+            DeadlineExceededError: If the block was cancelled by the deadline
+
+        Usage:
+            ```python
+            async with deadline.enforce(reserve=0.05):
+                reply = await generate_response(...)
+            ```
+        """
+        timeout = asyncio.timeout(self.remaining(reserve))
+        try:
+            async with timeout:
+                yield
+        except TimeoutError:
+            if timeout.expired():
+                raise DeadlineExceededError("Request deadline exceeded") from None
+            raise
+
+    async def wait[T](self, awaitable: Awaitable[T], reserve: float = 0.0) -> T:
+        """
+        Await one step within the deadline (less `reserve`).
+
+        For code that yields between steps, such as a stream generator,
+        where a timeout must not stay armed across the yield.
+
+        Raises:
+            DeadlineExceededError: If the step was cancelled by the deadline
+        """
+        async with self.enforce(reserve):
+            return await awaitable
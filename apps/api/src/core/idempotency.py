@@ -0,0 +1,180 @@
+"""Idempotency keys and in-flight coalescing for /message.
+
+Clients on flaky connections resubmit, and the frontend retries on failure.
+A request carrying an Idempotency-Key header is answered at most once per
+key and client:
+    - While the first request with a key is generating, repeats wait for
+      its reply instead of starting their own (single-flight)
+    - Once it has completed, repeats get the same reply from the store for
+      IDEMPOTENCY_TTL seconds
+    - A key reused with a different message is rejected
+
+Only replies worth repeating are stored: a failed generation is not, so
+retrying after a failure generates again.
+
+The store is an LRU map capped at IDEMPOTENCY_MAX_KEYS, and per worker
+process, like rate limits. A repeat served by another worker generates
+again, which is what happened before.
+
+Safety reasoning:
+    - Only hashes of the key and of the request are kept, never message
+      text; the stored reply is what the user was already shown
+    - Keys are scoped to the client, so one client can never receive
+      another's reply by guessing its key
+    - Banned and crisis checks run on every request before the store is
+      consulted, so a repeat never skips them
+"""
+
+import asyncio
+import hashlib
+import re
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from time import monotonic
+from typing import Literal
+
+from core.metrics import IDEMPOTENT_REQUESTS
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+
+# Set on responses that were not generated for the request itself
+IDEMPOTENT_REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Printable ASCII, as clients generate them (UUIDs, random tokens)
+_VALID_KEY = re.compile(r"[\x21-\x7e]{1,255}")
+
+Outcome = Literal["generated", "coalesced", "replayed"]
+
+
+class IdempotencyKeyError(ValueError):
+    """Raised for a malformed Idempotency-Key header."""
+
+
+class IdempotencyConflictError(Exception):
+    """Raised when a key is reused with a different request."""
+
+
+class _Entry[T]:
+    """A key's request fingerprint, and its reply once there is one."""
+
+    __slots__ = ("expires", "fingerprint", "pending", "result")
+
+    def __init__(self, fingerprint: bytes, pending: "asyncio.Future[T]"):
+        self.fingerprint = fingerprint
+        self.pending = pending
+        self.result: T | None = None
+        self.expires = 0.0
+
+
+def store_key(client: str | None, key: str) -> bytes:
+    """
+    Hash of a client's Idempotency-Key, the store's only record of it.
+
+    Raises:
+        IdempotencyKeyError: If the key is empty, too long or not printable
+    """
+    if not _VALID_KEY.fullmatch(key):
+        raise IdempotencyKeyError("Idempotency-Key must be 1-255 printable characters")
+    return hashlib.sha256(f"{client}\0{key}".encode()).digest()
+
+
+def fingerprint(body: str) -> bytes:
+    """Hash of a request body, to tell a repeat from a reused key."""
+    return hashlib.sha256(body.encode()).digest()
+
+
+class IdempotencyStore[T]:
+    """
+    Replies by key: in flight, then completed until they expire.
+
+    Args:
+        ttl: Seconds a completed reply is replayed for
+        max_keys: Most keys kept; least recently used are evicted
+        clock: Monotonic clock, in seconds
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_keys: int,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._clock = clock
+        self._entries: OrderedDict[bytes, _Entry[T]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def run(
+        self,
+        key: bytes,
+        fingerprint: bytes,
+        produce: Callable[[], Awaitable[T]],
+        keep: Callable[[T], bool],
+    ) -> tuple[T, Outcome]:
+        """
+        Produce the reply for a key, or share the one already produced.
+
+        Args:
+            key: Hash from `store_key`
+            fingerprint: Hash from `fingerprint` of the request
+            produce: Generates the reply; called at most once at a time per key
+            keep: Whether a reply may be replayed (False: retries generate again)
+
+        Returns:
+            The reply, and whether it was generated, coalesced or replayed
+
+        Raises:
+            IdempotencyConflictError: If the key was used for another request
+            Exception: Whatever `produce` raises, for this request only
+        """
+        while True:
+            entry = self._entries.get(key)
+            if (
+                entry is not None
+                and entry.result is not None
+                and self._clock() >= entry.expires
+            ):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                break
+
+            self._entries.move_to_end(key)
+            if entry.fingerprint != fingerprint:
+                IDEMPOTENT_REQUESTS.inc("conflict")
+                raise IdempotencyConflictError
+            if entry.result is not None:
+                IDEMPOTENT_REQUESTS.inc("replayed")
+                return entry.result, "replayed"
+            # Waiting never cancels the shared generation
+            await asyncio.wait([entry.pending])
+            if not entry.pending.cancelled():
+                IDEMPOTENT_REQUESTS.inc("coalesced")
+                return entry.pending.result(), "coalesced"
+            # The first request failed: try again, perhaps as the first
+
+        pending: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        entry = self._entries[key] = _Entry(fingerprint, pending)
+        if len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+        try:
+            result = await produce()
+        except BaseException:
+            self._discard(key, entry)
+            pending.cancel()
+            raise
+
+        if keep(result):
+            entry.result = result
+            entry.expires = self._clock() + self.ttl
+        else:
+            self._discard(key, entry)
+        pending.set_result(result)
+        return result, "generated"
+
+    def _discard(self, key: bytes, entry: _Entry[T]) -> None:
+        if self._entries.get(key) is entry:
+            del self._entries[key]
@@ -0,0 +1,215 @@
+"""Structured, non-blocking logging for Unconditional API.
+
+Records are JSON objects carrying a fixed set of fields: event name, level,
+logger, request id and pipeline context (stage, model, severity, pattern,
+reason, error type). Anything else passed to a log call is dropped, so
+message content cannot reach the logs even by accident.
+
+Records from libraries (uvicorn, httpx, ...) follow their own conventions,
+so their arguments are interpolated; only the app's own records get the
+event-name rule. Exceptions are written with their type and traceback (for
+the app's records, the frames without the exception message).
+
+Log calls only put the record on a bounded in-memory queue; formatting and
+writing happen on a background listener thread. When the queue is full
+(a burst of guardrail hits faster than stdout drains) records are dropped
+and counted rather than making a request wait.
+"""
+
+import json
+import logging
+import queue
+import re
+import sys
+import traceback
+import uuid
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.metrics import Counter, registry
+
+# Context fields allowed in a record, besides the standard ones
+CONTEXT_FIELDS = (
+    "stage",
+    "model",
+    "severity",
+    "pattern",
+    "reason",
+    "error",
+    "version",
+    "workers",
+)
+
+# Top-level packages of the app; records from anything else are libraries'
+APP_PACKAGES = frozenset(
+    {"api", "core", "main", "models", "prompts", "safety", "server", "services"}
+)
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# Client-supplied request ids are kept only if short and plain
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+LOG_RECORDS_DROPPED = registry.register(
+    Counter(
+        "unconditional_log_records_dropped_total",
+        "Log records dropped because the log queue was full.",
+    )
+)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+
+    Safety reasoning:
+        - For the app's records, only the event name and whitelisted context
+          fields are written; log arguments are never interpolated, so
+          content passed by mistake is not emitted
+        - Library records are interpolated: the app never passes them
+          message content, and uninterpolated they are unreadable
+        - Exceptions keep their type and traceback, so failures can be
+          diagnosed; the app's records leave out the exception message,
+          which can carry provider error text echoing a prompt
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        app = record.name.partition(".")[0] in APP_PACKAGES
+        if app:
+            event = record.msg
+        else:
+            event = record.getMessage()
+        entry = {
+            "time": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": event,
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and record.exc_info[0] is not None:
+            entry.setdefault("error", record.exc_info[0].__name__)
+            if app:
+                # Frames only: the exception message may echo a prompt
+                entry["traceback"] = "Traceback (most recent call last):\n" + "".join(
+                    traceback.format_tb(record.exc_info[2])
+                )
+            else:
+                entry["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that never formats or waits on the calling thread.
+
+    The stdlib handler formats each record before queueing it; here the
+    record is only stamped with the request id and queued, and formatting is
+    left to the listener thread. A full queue drops the record.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+_listener: QueueListener | None = None
+
+
+def configure_logging(level: str, queue_size: int, stream=None) -> QueueListener:
+    """
+    Route all logging through a bounded queue to a JSON stdout writer.
+
+    Args:
+        level: Log level name (e.g. "info"), from Settings.log_level
+        queue_size: Records buffered before new ones are dropped
+        stream: Output stream (defaults to stdout)
+
+    Returns:
+        The running listener (stopped by `shutdown_logging`)
+
+    Safe to call again: the previous listener is stopped and replaced.
+    """
+    global _listener
+    shutdown_logging()
+
+    writer = logging.StreamHandler(stream or sys.stdout)
+    writer.setFormatter(JsonFormatter())
+
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=queue_size)
+    root = logging.getLogger()
+    root.handlers = [
+        handler
+        for handler in root.handlers
+        if not isinstance(handler, NonBlockingQueueHandler)
+    ]
+    root.addHandler(NonBlockingQueueHandler(log_queue))
+    root.setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, writer, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """
+    Pure ASGI middleware assigning each request an id for its log records.
+
+    A well-formed X-Request-ID from the client (or a proxy) is reused,
+    otherwise one is generated. The id is echoed in the response headers.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.fullmatch(candidate):
+                    request_id = candidate
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+
+        header = (REQUEST_ID_HEADER.encode(), request_id.encode())
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), header]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,456 @@
+"""Process-wide metrics for Unconditional API, in Prometheus text format.
+
+A deliberately small, dependency-free subset of the Prometheus client:
+counters, gauges and histograms, each with at most one label. Recording
+happens on the event loop thread, so no locks are taken; bucket counts live
+in preallocated arrays and label series are created once, so recording does
+not allocate containers per observation.
+
+Values are per process. Under the preforked production server each worker
+labels its samples with worker="<pid>", so scrapes that reach different
+workers stay separate series; sum over the label for deployment totals.
+
+Safety reasoning:
+    - Labels are fixed identifiers (stage, severity, pattern, reason), never
+      message content, so no user text can leak into metrics
+    - Instrumentation cost is far below the stages it measures
+"""
+
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from sub-millisecond safety checks to long LLM calls
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)  # fmt: skip
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    """Common name, help text and label handling."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelname: str | None = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelname = labelname
+        self._selectors: dict[str, str] = {}
+
+    def _selector(self, label: str, extra: str = "") -> str:
+        """Label set such as {stage="llm_call"}, cached per label value."""
+        key = label + "\0" + extra
+        selector = self._selectors.get(key)
+        if selector is None:
+            pairs = []
+            if self.labelname:
+                pairs.append(f'{self.labelname}="{_escape(label)}"')
+            if extra:
+                pairs.append(extra)
+            selector = "{" + ",".join(pairs) + "}" if pairs else ""
+            self._selectors[key] = selector
+        return selector
+
+    @abstractmethod
+    def _samples(self) -> Iterator[str]:
+        """Sample lines of the exposition, one per series (and bucket)."""
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+
+class Counter(_Metric):
+    """
+    Monotonic counter, optionally split by one label.
+
+    Args:
+        name: Metric name
+        documentation: HELP text
+        labelname: Label to split by, or None
+        labels: Label values to expose as 0 before their first increment
+    """
+
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelname: str | None = None,
+        labels: Iterable[str] = (),
+    ):
+        super().__init__(name, documentation, labelname)
+        self._values: dict[str, int] = dict.fromkeys(labels, 0)
+
+    def inc(self, label: str = "", amount: int = 1) -> None:
+        """Add `amount` to the series for `label`."""
+        self._values[label] = self._values.get(label, 0) + amount
+
+    def value(self, label: str = "") -> int:
+        return self._values.get(label, 0)
+
+    def _samples(self) -> Iterator[str]:
+        for label, value in self._values.items():
+            yield f"{self.name}{self._selector(label)} {value}"
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down (no labels).
+
+    Args:
+        name: Metric name
+        documentation: HELP text
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._value: float = 0
+
+    def inc(self) -> None:
+        self._value += 1
+
+    def dec(self) -> None:
+        self._value -= 1
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def value(self) -> float:
+        return self._value
+
+    def _samples(self) -> Iterator[str]:
+        yield f"{self.name} {self._value}"
+
+
+class Info(_Metric):
+    """
+    Gauge exposing one current label value, such as a version, set to 1.
+
+    Args:
+        name: Metric name (conventionally ending in _info)
+        documentation: HELP text
+        labelname: Label carrying the value
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelname: str):
+        super().__init__(name, documentation, labelname)
+        self._label = ""
+
+    def set(self, label: str) -> None:
+        self._label = label
+
+    def value(self) -> str:
+        return self._label
+
+    def _samples(self) -> Iterator[str]:
+        if self._label:
+            yield f"{self.name}{self._selector(self._label)} 1"
+
+
+class HistogramSeries:
+    """
+    One histogram series: bucket counts, sum and count.
+
+    Args:
+        bounds: Sorted upper bucket bounds (without +Inf)
+    """
+
+    __slots__ = ("_bounds", "_counts", "_sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self._bounds = bounds
+        # Last slot is the +Inf bucket; sum in a one-slot double array
+        self._counts = array("Q", bytes(8 * (len(bounds) + 1)))
+        self._sum = array("d", [0.0])
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self._sum[0] += value
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def total(self) -> float:
+        return self._sum[0]
+
+
+class Histogram(_Metric):
+    """
+    Histogram, optionally split by one label.
+
+    Args:
+        name: Metric name
+        documentation: HELP text
+        labelname: Label to split by, or None
+        buckets: Upper bucket bounds, ascending
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelname: str | None = None,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelname)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[str, HistogramSeries] = {}
+
+    def labels(self, label: str = "") -> HistogramSeries:
+        """
+        Series for a label value, created on first use.
+
+        Bind the series once (e.g. at module level) and call `observe` on it,
+        so the hot path skips the lookup.
+        """
+        series = self._series.get(label)
+        if series is None:
+            series = self._series[label] = HistogramSeries(self.buckets)
+        return series
+
+    def _samples(self) -> Iterator[str]:
+        for label, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(
+                (*self.buckets, float("inf")), series._counts, strict=True
+            ):
+                cumulative += count
+                selector = self._selector(label, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{selector} {cumulative}"
+            selector = self._selector(label)
+            yield f"{self.name}_sum{selector} {_format_value(series.total)}"
+            yield f"{self.name}_count{selector} {cumulative}"
+
+
+class MetricsRegistry:
+    """Ordered collection of metrics rendered together at /metrics."""
+
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._worker: str | None = None
+
+    def register[M: _Metric](self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def label_worker(self, worker: str) -> None:
+        """Add a worker label to every sample, for one of several processes."""
+        self._worker = f'worker="{_escape(worker)}"'
+
+    def _with_worker(self, line: str) -> str:
+        if line.startswith("#"):
+            return line
+        name, brace, rest = line.partition("{")
+        if brace:
+            return f"{name}{{{self._worker},{rest}"
+        name, _, value = line.partition(" ")
+        return f"{name}{{{self._worker}}} {value}"
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text exposition format."""
+        lines = [line for metric in self._metrics for line in metric.render()]
+        if self._worker is not None:
+            lines = [self._with_worker(line) for line in lines]
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry and the API's metrics
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.register(
+    Histogram(
+        "unconditional_stage_duration_seconds",
+        "Time spent in each conversation pipeline stage.",
+        labelname="stage",
+    )
+)
+CRISIS_DETECTIONS = registry.register(
+    Counter(
+        "unconditional_crisis_detections_total",
+        "Messages detected as crisis, by severity.",
+        labelname="severity",
+        labels=("high", "critical"),
+    )
+)
+GUARDRAIL_BLOCKS = registry.register(
+    Counter(
+        "unconditional_guardrail_blocks_total",
+        "LLM responses replaced by guardrails, by matched pattern.",
+        labelname="pattern",
+    )
+)
+LLM_FALLBACKS = registry.register(
+    Counter(
+        "unconditional_llm_fallbacks_total",
+        "LLM calls answered with the safe fallback, by reason.",
+        labelname="reason",
+        labels=("error", "overloaded", "unavailable", "deadline", "budget"),
+    )
+)
+LLM_FAILOVERS = registry.register(
+    Counter(
+        "unconditional_llm_failovers_total",
+        "LLM calls retried on another model after an error, by model retried on.",
+        labelname="model",
+    )
+)
+LLM_CIRCUIT_TRIPS = registry.register(
+    Counter(
+        "unconditional_llm_circuit_trips_total",
+        "LLM circuit breakers opened, by model.",
+        labelname="model",
+    )
+)
+LLM_HEDGES = registry.register(
+    Counter(
+        "unconditional_llm_hedges_total",
+        "Hedged LLM calls by outcome: won, lost to the first call, or denied "
+        "by the hedge budget.",
+        labelname="outcome",
+        labels=("won", "lost", "denied"),
+    )
+)
+RATE_LIMITED = registry.register(
+    Counter(
+        "unconditional_rate_limited_total",
+        "Requests rejected with 429, by limit: client base charge, client LLM "
+        "charge, or the global cap on LLM calls.",
+        labelname="limit",
+        labels=("client", "llm", "global"),
+    )
+)
+IDEMPOTENT_REQUESTS = registry.register(
+    Counter(
+        "unconditional_idempotent_requests_total",
+        "Requests with an Idempotency-Key answered without a generation of "
+        "their own, by outcome: coalesced onto one in flight, replayed from "
+        "the store, or rejected for reusing a key with a different message.",
+        labelname="outcome",
+        labels=("coalesced", "replayed", "conflict"),
+    )
+)
+PATTERN_PACK_INFO = registry.register(
+    Info(
+        "unconditional_pattern_pack_info",
+        "Active safety pattern pack version.",
+        labelname="version",
+    )
+)
+PATTERN_PACK_RELOADS = registry.register(
+    Counter(
+        "unconditional_pattern_pack_reloads_total",
+        "Safety pattern pack reloads by outcome: applied, unchanged, or "
+        "rejected by validation.",
+        labelname="outcome",
+        labels=("applied", "unchanged", "rejected"),
+    )
+)
+LLM_INPUT_TOKENS = registry.register(
+    Counter(
+        "unconditional_llm_input_tokens_total",
+        "LLM input tokens by prompt cache status: read from the cache, "
+        "written to it, or uncached.",
+        labelname="cache",
+        labels=("read", "write", "uncached"),
+    )
+)
+LLM_TOKENS = registry.register(
+    Counter(
+        "unconditional_llm_tokens_total",
+        "LLM tokens by direction: input (prompt) or output (completion).",
+        labelname="direction",
+        labels=("input", "output"),
+    )
+)
+LLM_MODEL_TOKENS = registry.register(
+    Counter(
+        "unconditional_llm_model_tokens_total",
+        "LLM input and output tokens, by model.",
+        labelname="model",
+    )
+)
+LLM_REQUEST_TOKENS = registry.register(
+    Histogram(
+        "unconditional_llm_request_tokens",
+        "Tokens per message answered by the LLM, by direction.",
+        labelname="direction",
+        buckets=(50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000),
+    )
+)
+LLM_TOKENS_TODAY = registry.register(
+    Gauge(
+        "unconditional_llm_tokens_today",
+        "LLM tokens used by this worker since midnight UTC, counted against "
+        "its share of the daily token budget.",
+    )
+)
+LLM_CACHED_INPUT_RATIO = registry.register(
+    Histogram(
+        "unconditional_llm_cached_input_ratio",
+        "Fraction of each LLM request's input tokens read from the prompt cache.",
+        buckets=(0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+    )
+)
+LLM_CHARS_PER_TOKEN = registry.register(
+    Gauge(
+        "unconditional_llm_chars_per_token",
+        "Observed characters per LLM output token, used to size max_tokens "
+        "to the response length limit.",
+    )
+)
+REQUESTS_IN_FLIGHT = registry.register(
+    Gauge(
+        "unconditional_requests_in_flight",
+        "HTTP requests and WebSocket connections currently being handled.",
+    )
+)
+
+
+class InFlightMiddleware:
+    """
+    Pure ASGI middleware tracking requests in flight.
+
+    Streaming responses and WebSocket connections count until they close.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
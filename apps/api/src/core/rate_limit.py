@@ -0,0 +1,143 @@
+"""Per-client rate limiting for Unconditional API.
+
+Every client has a token bucket, keyed by its IP address (for IPv6, its
+/64 network, which is what one subscriber is usually given). Client-sent
+identifiers are not used: anyone can make up a new one per request.
+
+The message endpoints charge each message once it has cleared crisis
+detection: a small base charge, plus an extra charge for messages that go
+on to the LLM, so cheap short-circuits are not billed like paid provider
+calls. Rejections are 429 responses (or WebSocket error frames) with
+Retry-After.
+
+Buckets live in an LRU map capped at `max_clients`: the least recently seen
+client is evicted first, so memory stays bounded under any number of
+clients. An evicted client comes back with a full bucket, which is what an
+idle client would have had anyway. Each address (or /64) is one bucket, so
+a single client cannot mint new buckets to evict everyone else's.
+
+Safety reasoning:
+    - Crisis messages are never charged and never limited: nothing is
+      charged until crisis detection has run, so someone in crisis always
+      gets the crisis resources
+    - The base charge is small next to the bucket, so a person typing never
+      meets the limit; only scripted traffic does
+    - Client IPs come from the ASGI scope: behind a proxy, run the server
+      with proxy headers enabled so each user is a separate client
+"""
+
+import ipaddress
+import math
+from collections import OrderedDict
+from time import monotonic
+
+from starlette.requests import HTTPConnection
+from starlette.types import Scope
+
+from core.config import settings
+
+# Prefix length an IPv6 client is keyed by: one /64 is one subscriber
+IPV6_CLIENT_PREFIX = 64
+
+
+class TokenBucket:
+    """Tokens refilled continuously up to a burst capacity."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """
+    Token buckets per client, in a bounded LRU map.
+
+    Args:
+        rate: Tokens refilled per second
+        burst: Bucket capacity (and a new client's starting balance)
+        max_clients: Most buckets kept; least recently used are evicted
+        enabled: When False every charge is admitted
+    """
+
+    def __init__(
+        self, rate: float, burst: float, max_clients: int, enabled: bool = True
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.enabled = enabled
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def charge(self, client: str | None, cost: float) -> float:
+        """
+        Take `cost` tokens from a client's bucket.
+
+        Args:
+            client: Client key from `client_key`, or None if unknown
+            cost: Tokens to take
+
+        Returns:
+            0.0 if admitted, otherwise seconds until the charge would fit
+            (nothing is taken from a rejected client)
+        """
+        if not self.enabled or client is None:
+            return 0.0
+        now = monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            elapsed = now - bucket.updated
+            bucket.tokens = min(bucket.tokens + elapsed * self.rate, self.burst)
+            bucket.updated = now
+
+        if bucket.tokens >= cost:
+            bucket.tokens -= cost
+            return 0.0
+        return (cost - bucket.tokens) / self.rate
+
+
+def connection_client(connection: HTTPConnection) -> str | None:
+    """Bucket key of a request or WebSocket."""
+    return client_key(connection.scope)
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After value: whole seconds, at least 1."""
+    return str(max(math.ceil(seconds), 1))
+
+
+def client_key(scope: Scope) -> str | None:
+    """Bucket key for a request: its IP address, or IPv6 /64 network."""
+    client = scope.get("client")
+    if not client:
+        return None
+    host = client[0]
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        # Not an IP (e.g. a Unix socket peer or a test client name)
+        return "ip:" + host
+    if isinstance(address, ipaddress.IPv6Address):
+        if address.ipv4_mapped is not None:
+            return "ip:" + str(address.ipv4_mapped)
+        network = ipaddress.IPv6Network((address, IPV6_CLIENT_PREFIX), strict=False)
+        return "ip:" + str(network)
+    return "ip:" + str(address)
+
+
+# Process-wide buckets, charged by the message endpoints
+rate_limiter = RateLimiter(
+    rate=settings.rate_limit_rate,
+    burst=settings.rate_limit_burst,
+    max_clients=settings.rate_limit_max_clients,
+    enabled=settings.rate_limit_enabled,
+)
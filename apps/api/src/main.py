@@ -3,12 +3,80 @@
 Minimal, focused backend providing conversation processing with safety-first design.
 """
 
+import asyncio
+import atexit
+import contextlib
+import signal
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import cast
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.v1.endpoints import conversation
+from core import metrics
+from core.config import settings
+from core.logging import RequestIdMiddleware, configure_logging, shutdown_logging
+from safety.pattern_packs import pattern_packs
+from services.llm.factory import get_llm_models
+from services.llm.loader import ensure_llm_stack, start_loading
+from services.llm.registry import llm_registry
+
+# Structured logs drain on a background thread; flush them at exit
+configure_logging(settings.log_level, settings.log_queue_size)
+atexit.register(shutdown_logging)
+
+
+async def warm_up_models() -> None:
+    """Load the LLM stack, then open a connection to every configured model."""
+    await ensure_llm_stack()
+    for model, _ in get_llm_models():
+        await llm_registry.warm_up(model)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Manage process-wide LLM resources and safety pattern reloads.
+
+    Safety reasoning:
+        - The LLM stack loads in the background: health checks and the
+          crisis path are served before it is ready
+        - Provider connections are opened once, not per message
+        - Optional warm-up pays the TLS handshake before the first user does,
+          in the background: a slow or unreachable provider never holds up
+          startup or the health checks
+        - Pooled connections are closed cleanly on shutdown
+        - Pattern packs reload on file change or SIGHUP, without a restart
+    """
+    start_loading()
+    warmup = None
+    if settings.llm_warmup:
+        warmup = asyncio.create_task(warm_up_models())
+
+    loop = asyncio.get_running_loop()
+    watcher = None
+    if settings.pattern_pack_poll_interval > 0:
+        watcher = asyncio.create_task(
+            pattern_packs.watch(settings.pattern_pack_poll_interval)
+        )
+    # Not available off the main thread (e.g. TestClient) or on Windows
+    with contextlib.suppress(NotImplementedError, RuntimeError):
+        loop.add_signal_handler(signal.SIGHUP, pattern_packs.reload)
+
+    yield
+
+    with contextlib.suppress(NotImplementedError, RuntimeError):
+        loop.remove_signal_handler(signal.SIGHUP)
+    if watcher is not None:
+        watcher.cancel()
+    if warmup is not None:
+        warmup.cancel()
+        # Let it unwind before its connections are closed
+        await asyncio.wait([warmup])
+    await llm_registry.aclose()
+
 
 # Application metadata
 app = FastAPI(
@@ -20,6 +88,7 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS configuration
@@ -33,8 +102,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-LLM-Usage", "Idempotent-Replayed"],
 )
 
+# Requests in flight, counted outermost so streaming responses are included
+app.add_middleware(metrics.InFlightMiddleware)
+
+# Request id on every log record and response
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers
 app.include_router(
     conversation.router,
@@ -53,7 +129,19 @@ async def root() -> dict[str, str]:
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    """
+    Prometheus metrics: per-stage latency, crisis, guardrail, fallbacks.
+
+    Values are per worker process: under the preforked production server a
+    scrape reaches one worker at random and sees only that worker's counts,
+    labelled with its pid as `worker`.
+    """
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
-    import uvicorn
+    import server
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    server.main(app)
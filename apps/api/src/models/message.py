@@ -35,3 +35,12 @@ class ConversationHistory(BaseModel):
     def add_assistant_message(self, content: str) -> None:
         """Add assistant message to history."""
         self.messages.append({"role": "assistant", "content": content})
+
+
+class MessageRequest(UserMessage):
+    """Body of a conversation request: the new message plus prior turns."""
+
+    history: ConversationHistory = Field(
+        default_factory=ConversationHistory,
+        description="Conversation so far (optional, for context)",
+    )
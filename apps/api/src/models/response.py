@@ -46,3 +46,10 @@ class CrisisResponse(BaseModel):
     session_locked: bool = Field(
         default=True, description="Whether the session is locked"
     )
+
+
+class HealthStatus(BaseModel):
+    """Health check response."""
+
+    status: str = "ok"
+    service: str = "unconditional-api"
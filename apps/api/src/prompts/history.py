@@ -0,0 +1,162 @@
+"""Conversation history assembly for Unconditional.
+
+Turns the client-held conversation into pydantic-ai messages under a token
+budget. The newest turns are kept; older turns are trimmed or dropped, so the
+prompt (and with it latency and cost) stays bounded however long a
+conversation runs.
+
+History is sent by the client, so it gets the same checks as a message:
+user turns with banned content and assistant turns the guardrails would
+have blocked are dropped.
+"""
+
+import re
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+from safety.banned_patterns import contains_banned_content
+from safety.guardrails import violates_guardrails
+
+if TYPE_CHECKING:
+    from pydantic_ai.messages import ModelMessage
+
+# Approximate tokenizer: runs of up to 6 word characters, or one punctuation mark
+_TOKEN_PIECE = re.compile(r"\w{1,6}|[^\w\s]")
+
+# Framing tokens providers add around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Don't keep a trimmed fragment shorter than this
+MIN_TRIMMED_TOKENS = 16
+
+# Approximate characters per token, for trimming
+CHARS_PER_TOKEN = 4
+
+# Token counts keyed by (hash, length) of the text, never the text itself
+_TOKEN_CACHE: OrderedDict[tuple[int, int], int] = OrderedDict()
+_TOKEN_CACHE_SIZE = 8192
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate the token count of a message, with caching.
+
+    Args:
+        text: Message content
+
+    Returns:
+        Approximate token count
+
+    Safety reasoning:
+        - Cache keys are hashes, so no message content is retained in memory
+        - Each turn only tokenizes messages not seen before
+    """
+    key = (hash(text), len(text))
+    count = _TOKEN_CACHE.get(key)
+    if count is None:
+        count = len(_TOKEN_PIECE.findall(text))
+        _TOKEN_CACHE[key] = count
+        if len(_TOKEN_CACHE) > _TOKEN_CACHE_SIZE:
+            _TOKEN_CACHE.popitem(last=False)
+    else:
+        _TOKEN_CACHE.move_to_end(key)
+    return count
+
+
+def max_history_turns(token_budget: int) -> int:
+    """
+    Upper bound on how many turns can fit in a token budget.
+
+    Args:
+        token_budget: Maximum tokens for history plus the current message
+
+    Returns:
+        Turn count beyond which older turns can never be used
+
+    Every turn costs at least one token plus the per-message overhead, so a
+    server-held conversation never needs to keep more turns than this.
+    """
+    return token_budget // (MESSAGE_OVERHEAD_TOKENS + 1)
+
+
+def _trim_to_tokens(text: str, tokens: int) -> str:
+    """Keep roughly the last `tokens` tokens of a message."""
+    tail = text[-tokens * CHARS_PER_TOKEN :]
+    # Start on a word boundary rather than mid-word
+    _, space, rest = tail.partition(" ")
+    return "…" + (rest if space else tail)
+
+
+def build_message_history(
+    messages: Sequence[dict[str, str]],
+    current_message: str,
+    token_budget: int,
+) -> "list[ModelMessage]":
+    """
+    Convert conversation history to pydantic-ai messages under a token budget.
+
+    Args:
+        messages: Conversation turns as {role, content} dicts, oldest first
+        current_message: The message being answered (sent separately)
+        token_budget: Maximum tokens for history plus the current message
+
+    Returns:
+        Chronological list of ModelRequest/ModelResponse messages
+
+    Safety reasoning:
+        - Only "user" and "assistant" turns are used: a client cannot
+          inject system instructions through history
+        - User turns with banned content and assistant turns that break
+          the guardrails are dropped, so a jailbreak or a forged reply
+          cannot reach the model through history
+        - Newest turns are kept, as they matter most to the moment
+        - History starts with a user turn, which every provider accepts
+        - Work stops once the budget is spent, so cost does not grow with
+          conversation length
+    """
+    remaining = token_budget - count_tokens(current_message) - MESSAGE_OVERHEAD_TOKENS
+    kept: list[tuple[str, str]] = []
+    newest = True
+
+    for turn in reversed(messages):
+        role = turn.get("role")
+        content = turn.get("content")
+        if role not in ("user", "assistant") or not content:
+            continue
+
+        # The client may already include the current message as the last turn
+        if newest:
+            newest = False
+            if role == "user" and content == current_message:
+                continue
+
+        if role == "user" and contains_banned_content(content):
+            continue
+        if role == "assistant" and violates_guardrails(content):
+            continue
+
+        cost = count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+        if cost <= remaining:
+            kept.append((role, content))
+            remaining -= cost
+            continue
+
+        # Oldest turn that fits only partially: keep its end, then stop
+        available = remaining - MESSAGE_OVERHEAD_TOKENS
+        if available >= MIN_TRIMMED_TOKENS:
+            kept.append((role, _trim_to_tokens(content, available)))
+        break
+
+    kept.reverse()
+    while kept and kept[0][0] == "assistant":
+        kept.pop(0)
+
+    from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart
+
+    return [
+        ModelRequest.user_text_prompt(content)
+        if role == "user"
+        else ModelResponse(parts=[TextPart(content=content)])
+        for role, content in kept
+    ]
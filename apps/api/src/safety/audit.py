@@ -0,0 +1,312 @@
+"""Bulk safety audit of anonymized transcripts.
+
+Streams a JSONL file of conversation turns through the production safety
+checks and counts what they flag, per pattern and per severity. Given a
+candidate pattern file, every turn is checked against both the current and
+the candidate patterns, and the report shows how the counts would change
+before the candidate ships.
+
+Input lines are single turns, `{"role": "user" | "assistant", "content": ...}`,
+or whole conversations, `{"messages": [turn, ...]}`. User turns go through
+the banned-content and crisis checks, assistant turns through the
+guardrails. Other roles are ignored; unparseable lines are counted.
+
+The current patterns are the active pattern pack's. A candidate file is a
+pattern pack (see safety.pattern_packs) in which families left out keep
+the current patterns.
+
+The file is read in chunks of raw lines and fanned out to a process pool,
+with a bounded number of chunks in flight, so memory stays constant however
+large the file is and throughput grows with the number of cores.
+
+Usage:
+    PYTHONPATH=src python -m safety.audit transcripts.jsonl \\
+        [--candidate patterns.json] [--workers N] [--json]
+
+Safety reasoning:
+    - Counts only: no message content is logged, printed or kept
+    - Verdicts come from the same scanners and severity rules as production
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from collections import Counter, deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from safety.crisis_detection import classify_crisis
+from safety.pattern_packs import PatternPack, parse_patterns, pattern_packs
+
+# Bytes of input lines per chunk sent to a worker
+CHUNK_BYTES = 1 << 20
+
+# Chunks queued per worker; bounds the memory held by the reader
+CHUNKS_PER_WORKER = 2
+
+CURRENT = "current"
+CANDIDATE = "candidate"
+
+# Pattern family name -> patterns, as in a pattern pack
+type Patterns = dict[str, tuple[str, ...]]
+
+# Audit counts: (check, version, detail) -> number of turns
+type AuditCounts = Counter[tuple[str, str, str]]
+
+
+def current_patterns() -> Patterns:
+    """Patterns of the active pack."""
+    return dict(pattern_packs.active.patterns)
+
+
+def load_candidate(path: Path) -> Patterns:
+    """
+    Read a candidate pattern file over the current patterns.
+
+    Raises:
+        ValueError: If the file is not JSON or fails pack validation
+    """
+    return parse_patterns(json.loads(path.read_text()), base=current_patterns())
+
+
+class Auditor:
+    """Scanners compiled once for one pattern version."""
+
+    def __init__(self, version: str, patterns: Patterns):
+        self.version = version
+        self.pack = PatternPack(version, "", patterns)
+
+    def user_turn(self, text: str, counts: AuditCounts) -> tuple[bool, str]:
+        """Count the input checks on a user turn; returns (banned, severity)."""
+        banned = self.pack.banned_input.matches(text)
+        for pattern in banned:
+            counts["banned_pattern", self.version, pattern] += 1
+        if banned:
+            counts["banned", self.version, ""] += 1
+
+        severity, matched = classify_crisis(text, self.pack)
+        for pattern in matched:
+            counts["crisis_pattern", self.version, pattern] += 1
+        counts["crisis", self.version, severity] += 1
+        return bool(banned), severity
+
+    def assistant_turn(self, text: str, counts: AuditCounts) -> bool:
+        """Count the guardrails on an assistant turn; returns whether blocked."""
+        matched = self.pack.banned_phrases.matches(text)
+        for pattern in matched:
+            counts["guardrail_pattern", self.version, pattern] += 1
+        if matched:
+            counts["blocked", self.version, ""] += 1
+        return bool(matched)
+
+
+def _turns(line: bytes) -> list[dict[str, Any]] | None:
+    """Turns in one input line, or None if it is malformed."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    turns = record.get("messages", [record]) if isinstance(record, dict) else None
+    if not isinstance(turns, list) or not all(
+        isinstance(turn, dict) and isinstance(turn.get("content"), str)
+        for turn in turns
+    ):
+        return None
+    return turns
+
+
+def _changed(
+    counts: AuditCounts, check: str, current: object, candidate: object
+) -> None:
+    """Count a verdict that differs between the two versions."""
+    if current != candidate:
+        counts["changed", check, f"{current} -> {candidate}"] += 1
+
+
+def audit_lines(lines: Iterable[bytes], auditors: list[Auditor]) -> AuditCounts:
+    """
+    Audit raw JSONL lines against each pattern version.
+
+    Args:
+        lines: Input lines (blank lines are skipped)
+        auditors: The current version, then optionally the candidate
+
+    Returns:
+        Counts keyed by (check, version, pattern or severity)
+    """
+    counts: AuditCounts = Counter()
+    for line in lines:
+        if not line.strip():
+            continue
+        turns = _turns(line)
+        if turns is None:
+            counts["lines", "invalid", ""] += 1
+            continue
+        counts["lines", "valid", ""] += 1
+
+        for turn in turns:
+            role = turn.get("role")
+            text = turn["content"].lower()
+            if role == "user":
+                counts["turns", "user", ""] += 1
+                verdicts = [auditor.user_turn(text, counts) for auditor in auditors]
+                if len(verdicts) == 2:
+                    (banned, severity), (new_banned, new_severity) = verdicts
+                    _changed(counts, "banned", banned, new_banned)
+                    _changed(counts, "crisis", severity, new_severity)
+            elif role == "assistant":
+                counts["turns", "assistant", ""] += 1
+                blocked = [auditor.assistant_turn(text, counts) for auditor in auditors]
+                if len(blocked) == 2:
+                    _changed(counts, "blocked", *blocked)
+    return counts
+
+
+# Per-process auditors, built once by the pool initializer
+_worker_auditors: list[Auditor] = []
+
+
+def _init_worker(versions: list[tuple[str, Patterns]]) -> None:
+    _worker_auditors[:] = [Auditor(version, patterns) for version, patterns in versions]
+
+
+def _audit_chunk(lines: list[bytes]) -> AuditCounts:
+    return audit_lines(lines, _worker_auditors)
+
+
+def read_chunks(
+    stream: BinaryIO, chunk_bytes: int = CHUNK_BYTES
+) -> Iterator[list[bytes]]:
+    """Group input lines into chunks of about `chunk_bytes` bytes."""
+    chunk: list[bytes] = []
+    size = 0
+    for line in stream:
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+
+def run_audit(
+    stream: BinaryIO,
+    versions: list[tuple[str, Patterns]],
+    workers: int,
+    chunk_bytes: int = CHUNK_BYTES,
+) -> AuditCounts:
+    """
+    Audit a JSONL stream on a process pool.
+
+    Args:
+        stream: Binary input, read line by line
+        versions: (name, patterns) for the current and optional candidate
+        workers: Worker processes
+        chunk_bytes: Bytes of input per task
+
+    Returns:
+        Counts summed over every chunk
+    """
+    totals: AuditCounts = Counter()
+    pending: deque[Future[AuditCounts]] = deque()
+    with ProcessPoolExecutor(
+        workers,
+        # Fork is unsafe from a threaded parent; workers import only this module
+        mp_context=multiprocessing.get_context("forkserver"),
+        initializer=_init_worker,
+        initargs=(versions,),
+    ) as pool:
+        for chunk in read_chunks(stream, chunk_bytes):
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                totals.update(pending.popleft().result())
+            pending.append(pool.submit(_audit_chunk, chunk))
+        while pending:
+            totals.update(pending.popleft().result())
+    return totals
+
+
+def _rows(counts: AuditCounts, check: str) -> list[str]:
+    """Details of a check, most frequent (current version) first."""
+    details = {detail for c, _, detail in counts if c == check}
+    return sorted(details, key=lambda d: (-counts[check, CURRENT, d], d))
+
+
+def format_report(counts: AuditCounts, versions: list[str]) -> str:
+    """Plain-text report of the audit counts."""
+    header = f"{'':60}" + "".join(f"{v:>12}" for v in versions)
+    if len(versions) == 2:
+        header += f"{'delta':>10}"
+
+    def row(label: str, check: str, detail: str) -> str:
+        values = [counts[check, version, detail] for version in versions]
+        line = f"  {label[:58]:58}" + "".join(f"{v:>12}" for v in values)
+        if len(values) == 2:
+            line += f"{values[1] - values[0]:>+10}"
+        return line
+
+    valid, invalid = counts["lines", "valid", ""], counts["lines", "invalid", ""]
+    user, assistant = counts["turns", "user", ""], counts["turns", "assistant", ""]
+    lines = [
+        f"lines: {valid} (invalid: {invalid})",
+        f"turns: {user} user, {assistant} assistant",
+        "",
+        header,
+        "crisis (user turns)",
+    ]
+    lines += [row(f"severity {s}", "crisis", s) for s in ("none", "high", "critical")]
+    lines += [row(p, "crisis_pattern", p) for p in _rows(counts, "crisis_pattern")]
+    lines += ["banned input (user turns)", row("flagged", "banned", "")]
+    lines += [row(p, "banned_pattern", p) for p in _rows(counts, "banned_pattern")]
+    lines += ["guardrails (assistant turns)", row("blocked", "blocked", "")]
+    lines += [
+        row(p, "guardrail_pattern", p) for p in _rows(counts, "guardrail_pattern")
+    ]
+    if len(versions) == 2:
+        lines += ["", "verdict changes (current -> candidate)"]
+        changes = sorted(key for key in counts if key[0] == "changed")
+        lines += [f"  {key[1]} {key[2]}: {counts[key]}" for key in changes]
+        if not changes:
+            lines.append("  none")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("transcripts", type=Path, help="JSONL file, or - for stdin")
+    parser.add_argument(
+        "--candidate", type=Path, help="JSON pattern file to compare against"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-bytes", type=int, default=CHUNK_BYTES)
+    parser.add_argument("--json", action="store_true", help="Print counts as JSON")
+    args = parser.parse_args()
+
+    versions = [(CURRENT, current_patterns())]
+    if args.candidate is not None:
+        try:
+            versions.append((CANDIDATE, load_candidate(args.candidate)))
+        except ValueError as e:
+            parser.error(f"{args.candidate}: {e}")
+
+    if str(args.transcripts) == "-":
+        counts = run_audit(sys.stdin.buffer, versions, args.workers, args.chunk_bytes)
+    else:
+        with args.transcripts.open("rb") as stream:
+            counts = run_audit(stream, versions, args.workers, args.chunk_bytes)
+
+    if args.json:
+        nested: dict[str, dict[str, dict[str, int]]] = {}
+        for (check, version, detail), value in sorted(counts.items()):
+            nested.setdefault(check, {}).setdefault(version, {})[detail] = value
+        print(json.dumps(nested, indent=2))
+    else:
+        print(format_report(counts, [version for version, _ in versions]))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,10 @@
 
 Hard blocks on specific content that should never be processed.
 This is the first line of defense before any LLM interaction.
+The patterns are the active pack's `banned_input` family.
 """
 
-import re
-
-
-# Content that should be immediately rejected
-BANNED_INPUT_PATTERNS = [
-    # Explicit abuse or harassment
-    r"\b(fuck|shit|damn)\s+you\b",
-    r"\bstupid\s+(bot|ai|assistant)\b",
-    # Attempts to jailbreak or manipulate
-    r"\bignore\s+(previous|all)\s+instructions\b",
-    r"\bpretend\s+you\s+are\b",
-    r"\bact\s+as\s+(if\s+)?you\b",
-    r"\broleplay\b",
-]
+from safety.pattern_packs import pattern_packs
 
 
 def contains_banned_content(message: str) -> bool:
@@ -35,10 +23,4 @@ def contains_banned_content(message: str) -> bool:
         - Prevents jailbreaking attempts
         - First line of defense before any processing
     """
-    message_lower = message.lower()
-
-    for pattern in BANNED_INPUT_PATTERNS:
-        if re.search(pattern, message_lower):
-            return True
-
-    return False
+    return pattern_packs.active.banned_input.search(message.lower())
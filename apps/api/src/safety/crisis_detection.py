@@ -5,11 +5,16 @@ False positives (showing crisis resources unnecessarily) are infinitely preferab
 to false negatives (missing someone in crisis).
 
 This is non-negotiable.
+
+The patterns are the active pack's `self_harm`, `harm_to_others` and
+`immediate_danger` families (see safety.pattern_packs).
 """
 
-import re
 from dataclasses import dataclass
 
+from core.metrics import CRISIS_DETECTIONS
+from safety.pattern_packs import PatternPack, pattern_packs
+
 
 @dataclass
 class CrisisDetectionResult:
@@ -21,45 +26,28 @@ class CrisisDetectionResult:
     reason: str
 
 
-# Self-harm and suicide keywords
-# Conservative matching: any indication triggers crisis response
-SELF_HARM_PATTERNS = [
-    r"\bkill\s+(my)?self\b",
-    r"\bend\s+(my\s+)?life\b",
-    r"\bsuicide\b",
-    r"\bsuicidal\b",
-    r"\bwant\s+to\s+die\b",
-    r"\bwish\s+I\s+(was|were)\s+dead\b",
-    r"\bcut\s+(my)?self\b",
-    r"\bhurt\s+(my)?self\b",
-    r"\bending\s+it\s+all\b",
-    r"\bno\s+reason\s+to\s+live\b",
-    r"\bbetter\s+off\s+dead\b",
-    r"\bdon'?t\s+want\s+to\s+(be\s+)?here\b",
-    r"\bcan'?t\s+go\s+on\b",
-    r"\boverdose\b",
-    r"\bjump\s+off\b",
-    r"\bhang\s+(my)?self\b",
-]
-
-# Harm to others
-HARM_TO_OTHERS_PATTERNS = [
-    r"\bkill\s+(them|him|her|someone)\b",
-    r"\bhurt\s+(them|him|her|someone)\b",
-    r"\bharm\s+(them|him|her|someone)\b",
-    r"\bmurder\b",
-    r"\bhomicide\b",
-]
-
-# Immediate danger indicators
-IMMEDIATE_DANGER_PATTERNS = [
-    r"\bright\s+now\b",
-    r"\btonight\b",
-    r"\btoday\b",
-    r"\bgoing\s+to\b",
-    r"\bplan\s+to\b",
-    r"\bready\s+to\b",
-]
+def classify_crisis(message_lower: str, pack: PatternPack) -> tuple[str, list[str]]:
+    """
+    Severity and matched patterns of a lowercased message.
+
+    Takes the pack as an argument so an audit can apply candidate patterns
+    with exactly the production rules.
+
+    Returns:
+        ("none" | "high" | "critical", matched patterns)
+    """
+    # Check self-harm and harm to others patterns
+    matched = pack.self_harm.matches(message_lower)
+    matched += pack.harm_to_others.matches(message_lower)
+    if not matched:
+        return "none", matched
+
+    # Escalate to critical if immediate danger indicated
+    danger = pack.immediate_danger.first_match(message_lower)
+    if danger is None:
+        return "high", matched
+    matched.append(danger)
+    return "critical", matched
 
 
 def detect_crisis(message: str) -> CrisisDetectionResult:
@@ -78,35 +66,14 @@ def detect_crisis(message: str) -> CrisisDetectionResult:
         - Severity escalation based on immediacy language
         - All matched patterns logged for transparency
     """
-    message_lower = message.lower()
-    matched = []
-    severity = "none"
-
-    # Check self-harm patterns
-    for pattern in SELF_HARM_PATTERNS:
-        if re.search(pattern, message_lower):
-            matched.append(pattern)
-            severity = "high"
-
-    # Check harm to others
-    for pattern in HARM_TO_OTHERS_PATTERNS:
-        if re.search(pattern, message_lower):
-            matched.append(pattern)
-            severity = "high"
-
-    # Escalate to critical if immediate danger indicated
-    if matched:
-        for pattern in IMMEDIATE_DANGER_PATTERNS:
-            if re.search(pattern, message_lower):
-                severity = "critical"
-                matched.append(pattern)
-                break
-
+    # Patterns come from the active pack (see safety.pattern_packs)
+    severity, matched = classify_crisis(message.lower(), pattern_packs.active)
     is_crisis = len(matched) > 0
 
     reason = ""
     if is_crisis:
         reason = f"Detected {len(matched)} crisis pattern(s) with {severity} severity"
+        CRISIS_DETECTIONS.inc(severity)
 
     return CrisisDetectionResult(
         is_crisis=is_crisis,
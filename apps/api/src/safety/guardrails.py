@@ -2,44 +2,25 @@
 
 Post-generation filtering to ensure LLM outputs align with mission and safety.
 Prevents therapeutic language, diagnosis, prescriptive advice, and tone violations.
+The banned phrases are the active pack's `banned_phrases` family (diagnostic
+language, prescriptive advice, false intimacy, promises, spiritual claims and
+flattery).
 """
 
-import re
-
-
-# Patterns that violate Unconditional's mission
-BANNED_PHRASES = [
-    # Diagnostic language
-    r"\bdiagnose(d)?\b",
-    r"\byou\s+(have|might\s+have|could\s+have)\s+\w+(disorder|syndrome|condition)\b",
-    r"\bmental\s+illness\b",
-    r"\bclinical(ly)?\b",
-    r"\bpsychiatric\b",
-    # Prescriptive advice
-    r"\byou\s+should\b",
-    r"\byou\s+must\b",
-    r"\byou\s+need\s+to\b",
-    r"\bI\s+recommend\b",
-    r"\bmy\s+advice\b",
-    # False intimacy
-    r"\bI\s+love\s+you\b",
-    r"\bI\s+care\s+(deeply\s+)?about\s+you\b",
-    r"\byou'?re\s+special\s+to\s+me\b",
-    r"\bwe'?re\s+friends\b",
-    # Promises
-    r"\bI\s+promise\b",
-    r"\bI\s+guarantee\b",
-    r"\beverything\s+will\s+be\s+(okay|fine|alright)\b",
-    r"\bit\s+will\s+get\s+better\b",
-    # Spiritual/metaphysical claims
-    r"\bGod\s+(wants|has\s+a\s+plan)\b",
-    r"\buniverse\s+has\s+a\s+plan\b",
-    r"\beverything\s+happens\s+for\s+a\s+reason\b",
-    r"\bmeant\s+to\s+be\b",
-    # Flattery
-    r"\byou'?re\s+(so\s+)?(strong|brave|courageous)\b",
-    r"\bI'?m\s+(so\s+)?proud\s+of\s+you\b",
-]
+import logging
+
+from core.metrics import GUARDRAIL_BLOCKS
+from safety.pattern_packs import pattern_packs
+
+logger = logging.getLogger(__name__)
+
+
+# Longest response shown to the user, in characters
+MAX_RESPONSE_LENGTH = 500
+
+# A sentence ends with terminal punctuation (. ! ? or …), any closing quotes
+# or brackets, then whitespace (so "3.5" or "e.g.x" do not end one)
+_CLOSING_MARKS = "\"')]\u201d\u2019"
 
 # Replacement for banned content
 GUARDRAIL_REPLACEMENT = (
@@ -63,34 +44,224 @@ def apply_guardrails(response_text: str) -> str:
         - Preserves user safety over LLM output quality
         - Logs violations for future prompt refinement
     """
-    response_lower = response_text.lower()
-
-    for pattern in BANNED_PHRASES:
-        if re.search(pattern, response_lower):
-            # Violation found - return safe fallback
-            # Log this for prompt engineering review
-            print(f"[GUARDRAIL] Blocked response containing pattern: {pattern}")
-            return GUARDRAIL_REPLACEMENT
+    pattern = pattern_packs.active.banned_phrases.first_match(response_text.lower())
+    if pattern is not None:
+        # Violation found - return safe fallback
+        # Log this for prompt engineering review
+        logger.warning(
+            "guardrail_blocked", extra={"stage": "guardrails", "pattern": pattern}
+        )
+        GUARDRAIL_BLOCKS.inc(pattern)
+        return GUARDRAIL_REPLACEMENT
 
     return response_text
 
 
-def check_length(response_text: str, max_length: int = 500) -> str:
+def violates_guardrails(response_text: str) -> bool:
+    """
+    Check whether `apply_guardrails` would replace a response.
+
+    Unlike `apply_guardrails`, this neither logs nor counts a block, so it
+    can re-check replies the user was already shown.
+    """
+    return (
+        pattern_packs.active.banned_phrases.first_match(response_text.lower())
+        is not None
+    )
+
+
+def last_sentence_end(text: str, after: int = 0) -> int:
+    """
+    Index just past the last sentence end in `text`, if it is past `after`.
+
+    Searches backwards from the end with str.rfind, so the cost does not
+    grow with the number of sentences before the last one.
+
+    Returns:
+        The index, or 0 if no sentence ends past `after`
+    """
+    stop = len(text)
+    while True:
+        at = max(
+            text.rfind(".", 0, stop),
+            text.rfind("!", 0, stop),
+            text.rfind("?", 0, stop),
+            text.rfind("\u2026", 0, stop),
+        )
+        if at < 0:
+            return 0
+        end = at + 1
+        while end < len(text) and text[end] in _CLOSING_MARKS:
+            end += 1
+        if end <= after:
+            # Every earlier sentence ends earlier still
+            return 0
+        if end < len(text) and text[end].isspace():
+            return end
+        stop = at
+
+
+def check_length(
+    response_text: str,
+    max_length: int = MAX_RESPONSE_LENGTH,
+    *,
+    truncated: bool = False,
+) -> str:
     """
     Ensure response is not excessively long.
 
+    Long responses are cut after the last whole sentence that fits. If that
+    would drop more than half the limit (one long sentence), they are cut
+    at a word instead and end with "...". A response the model was cut off
+    in (`truncated`) loses its unfinished last sentence whatever its
+    length, and is cut at a word only if it has no complete sentence.
+
     Args:
         response_text: LLM response
         max_length: Maximum character length
+        truncated: Whether generation stopped at the token limit
 
     Returns:
-        Truncated response if needed
+        Truncated response if needed, at most `max_length` characters
 
     Safety reasoning:
         - Long responses can overwhelm vulnerable users
         - Presence should be concise, not verbose
-        - Truncation preserves first (most important) content
+        - Truncation preserves first (most important) content, and ends on
+          a whole sentence rather than a thought cut off midway
     """
-    if len(response_text) > max_length:
-        return response_text[:max_length].rsplit(" ", 1)[0] + "..."
-    return response_text
+    if len(response_text) <= max_length:
+        if not truncated or not response_text.strip():
+            return response_text
+        # The end of the text can end a sentence too
+        head = response_text.rstrip() + " "
+        limit = len(head) - 1
+    else:
+        # One character past the limit, so a sentence ending right at it counts
+        head = response_text[: max_length + 1]
+        limit = max_length
+    # An unfinished sentence is dropped however much that cuts
+    floor = 0 if truncated else limit // 2
+    end = last_sentence_end(head, floor)
+    if end:
+        return response_text[:end]
+    return response_text[: limit - 3].rsplit(" ", 1)[0].rstrip() + "..."
+
+
+def _lower_same_length(text: str) -> str:
+    """
+    Lowercase text without changing its length.
+
+    A few characters lowercase to two ("İ" to "i̇"), which would shift
+    positions in the lowercased text away from the original's. Those are
+    kept as they are.
+    """
+    lower = text.lower()
+    if len(lower) == len(text):
+        return lower
+    return "".join(low if len(low := char.lower()) == 1 else char for char in text)
+
+
+class StreamingGuardrail:
+    """
+    Incremental guardrail matcher for streamed LLM output.
+
+    Text is fed chunk by chunk and released only once it can no longer be part
+    of a banned phrase, so phrases split across chunk boundaries are still
+    caught before they reach the user.
+
+    Args:
+        holdback: Characters withheld at the end of the stream (default:
+            enough for the longest banned phrase)
+
+    Safety reasoning:
+        - The tail of the stream is withheld until the longest banned phrase
+          could have been matched in full
+        - A match touching the end of the buffer is only confirmed once the
+          next character arrives, so "meant to be" in "meant to better" is
+          not blocked early
+        - finish() re-checks the whole response exactly like apply_guardrails,
+          so streaming never lets through what the batch path would block
+    """
+
+    def __init__(self, holdback: int | None = None):
+        # One stream is checked against one pack, even across a reload
+        self._pack = pattern_packs.active
+        self.holdback = self._pack.guardrail_holdback if holdback is None else holdback
+        self.blocked = False
+        self.violation: str | None = None
+        self._text = ""
+        self._lower = ""
+        self._released = 0
+
+    @property
+    def text(self) -> str:
+        """All text fed so far."""
+        return self._text
+
+    def _confirmed_match(self) -> bool:
+        """Check for a banned phrase that can no longer change with more text."""
+        end = len(self._lower)
+        pos = max(0, self._released - self.holdback)
+        while (match := self._pack.banned_phrases.find(self._lower, pos)) is not None:
+            if match.end() < end:
+                return True
+            pos = match.start() + 1
+        return False
+
+    def _block(self) -> None:
+        self.blocked = True
+        self.violation = self._pack.banned_phrases.first_match(self._lower)
+        logger.warning(
+            "guardrail_blocked_stream",
+            extra={"stage": "guardrails", "pattern": self.violation},
+        )
+        GUARDRAIL_BLOCKS.inc(str(self.violation))
+
+    def feed(self, chunk: str) -> str:
+        """
+        Add a chunk of streamed output.
+
+        Args:
+            chunk: Newly generated text
+
+        Returns:
+            Text that is now safe to show (may be empty). Nothing is released
+            once the stream is blocked.
+        """
+        if self.blocked:
+            return ""
+
+        self._text += chunk
+        # Match positions in _lower must be positions in _text too
+        self._lower += _lower_same_length(chunk)
+
+        if self._confirmed_match():
+            self._block()
+            return ""
+
+        safe_end = len(self._text) - self.holdback
+        if safe_end <= self._released:
+            return ""
+        released = self._text[self._released : safe_end]
+        self._released = safe_end
+        return released
+
+    def finish(self) -> str:
+        """
+        Close the stream and check the complete response.
+
+        Returns:
+            Remaining withheld text that is safe to show, or "" if blocked
+        """
+        if self.blocked:
+            return ""
+
+        self._lower = self._text.lower()
+        if self._pack.banned_phrases.search(self._lower):
+            self._block()
+            return ""
+
+        released = self._text[self._released :]
+        self._released = len(self._text)
+        return released
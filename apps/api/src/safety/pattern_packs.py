@@ -0,0 +1,309 @@
+"""Versioned, hot-reloadable safety pattern packs.
+
+Every safety pattern (crisis, banned input and guardrail phrases) lives in a
+pattern pack: a JSON file with a version and one list of regexes per family.
+The pack shipped with this build is `packs/default.json`; PATTERN_PACK points
+at another. A pack is validated and compiled once, then swapped in whole, so
+a crisis pattern can be fixed without a redeploy.
+
+Readers take `pattern_packs.active` once and use its scanners: the swap is a
+single attribute assignment, so there is no lock on the read path and a
+request in flight finishes on the pack it started with.
+
+Reloads happen when the file changes (polled every
+PATTERN_PACK_POLL_INTERVAL seconds) or on SIGHUP. Compiled packs are cached
+by content hash, so reloading an unchanged pack compiles nothing.
+
+Safety reasoning:
+    - A pack that fails validation is rejected and the current one stays
+      active: a bad edit can never leave the service without patterns
+    - The crisis families must be non-empty in every pack
+    - The active version is exported at /metrics, so every replica's
+      patterns are auditable
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from collections.abc import Mapping
+from pathlib import Path
+from re import _constants as sre_constants  # type: ignore[attr-defined]
+from re import _parser as sre_parse  # type: ignore[attr-defined]
+
+from core.config import settings
+from core.metrics import PATTERN_PACK_INFO, PATTERN_PACK_RELOADS
+from safety.scanner import PatternScanner, holdback_length
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PACK_PATH = Path(__file__).parent / "packs" / "default.json"
+
+# Pattern families, in the order they are listed in pack files
+FAMILIES = (
+    "self_harm",
+    "harm_to_others",
+    "immediate_danger",
+    "banned_input",
+    "banned_phrases",
+)
+
+# Families crisis detection depends on: never allowed to be empty
+CRISIS_FAMILIES = ("self_harm", "harm_to_others", "immediate_danger")
+
+
+class PatternPackError(ValueError):
+    """Raised for a pattern pack that fails validation."""
+
+
+def _uses_backreference(items: sre_parse.SubPattern | list) -> bool:
+    """Check parsed regex items for backreferences, at any depth."""
+    for op, av in items:
+        if op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS):
+            return True
+        if op == sre_constants.BRANCH:
+            branches = av[1]
+        elif op == sre_constants.SUBPATTERN:
+            branches = [av[-1]]
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            branches = [av[1]]
+        elif op in (
+            sre_constants.MAX_REPEAT,
+            sre_constants.MIN_REPEAT,
+            sre_constants.POSSESSIVE_REPEAT,
+        ):
+            branches = [av[2]]
+        elif op == sre_constants.ATOMIC_GROUP:
+            branches = [av]
+        else:
+            continue
+        if any(_uses_backreference(branch) for branch in branches):
+            return True
+    return False
+
+
+def check_pattern(pattern: str) -> None:
+    """
+    Validate one pattern, including that it can be merged with its family.
+
+    Patterns are merged into one alternation per family (see
+    safety.scanner), which renumbers groups and puts each pattern in the
+    middle of a larger regex. Backreferences would silently stop matching,
+    and named groups or inline global flags would fail to compile.
+
+    Raises:
+        PatternPackError: If the pattern is invalid or cannot be merged
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error as e:
+        raise PatternPackError(f"Invalid pattern {pattern!r}: {e}") from None
+    if parsed.state.flags & ~re.UNICODE:
+        raise PatternPackError(
+            f"Pattern {pattern!r} sets global flags; use a scoped group like (?i:...)"
+        )
+    if parsed.state.groupdict:
+        raise PatternPackError(f"Pattern {pattern!r} uses named groups")
+    if _uses_backreference(parsed):
+        raise PatternPackError(f"Pattern {pattern!r} uses a backreference")
+
+
+def parse_patterns(
+    data: object, base: Mapping[str, tuple[str, ...]] | None = None
+) -> dict[str, tuple[str, ...]]:
+    """
+    Validate the pattern families of a decoded pack.
+
+    Args:
+        data: Decoded JSON object
+        base: Families to fall back on for any left out (None: all required)
+
+    Returns:
+        Family name to patterns, for every family
+
+    Raises:
+        PatternPackError: On unknown or missing families, non-string or
+            invalid regexes, regexes that cannot be merged into their
+            family's scanner, or an empty crisis family
+    """
+    if not isinstance(data, dict):
+        raise PatternPackError("Pattern pack must be a JSON object")
+    unknown = data.keys() - {"version", *FAMILIES}
+    if unknown:
+        raise PatternPackError(f"Unknown pattern families: {sorted(unknown)}")
+
+    families = {}
+    for name in FAMILIES:
+        if name in data:
+            patterns = data[name]
+        elif base is not None:
+            patterns = base[name]
+        else:
+            raise PatternPackError(f"Missing pattern family {name!r}")
+        if not isinstance(patterns, list | tuple) or not all(
+            isinstance(pattern, str) for pattern in patterns
+        ):
+            raise PatternPackError(f"Pattern family {name!r} must be a list of strings")
+        for pattern in patterns:
+            check_pattern(pattern)
+        if name in CRISIS_FAMILIES and not patterns:
+            raise PatternPackError(f"Crisis pattern family {name!r} is empty")
+        # Compile the family's merged scanner, exactly as the pack will
+        try:
+            PatternScanner(patterns)
+        except re.error as e:
+            raise PatternPackError(
+                f"Pattern family {name!r} does not compile: {e}"
+            ) from None
+        families[name] = tuple(patterns)
+    return families
+
+
+class PatternPack:
+    """
+    One validated, compiled pattern pack.
+
+    Args:
+        version: Pack version, as written in the file
+        digest: SHA-256 of the file contents
+        patterns: Family name to patterns
+
+    Attributes:
+        self_harm, harm_to_others, immediate_danger, banned_input,
+        banned_phrases: Compiled scanner per family
+        guardrail_holdback: Characters of streamed output withheld until
+            they can be checked against banned_phrases
+    """
+
+    def __init__(self, version: str, digest: str, patterns: dict[str, tuple[str, ...]]):
+        self.version = version
+        self.digest = digest
+        self.patterns = patterns
+        self.self_harm = PatternScanner(patterns["self_harm"])
+        self.harm_to_others = PatternScanner(patterns["harm_to_others"])
+        self.immediate_danger = PatternScanner(patterns["immediate_danger"])
+        self.banned_input = PatternScanner(patterns["banned_input"])
+        self.banned_phrases = PatternScanner(patterns["banned_phrases"])
+        self.guardrail_holdback = holdback_length(patterns["banned_phrases"])
+
+
+# Compiled packs by content hash, shared by every load and reload
+_compiled: dict[str, PatternPack] = {}
+
+
+def compile_pack(raw: bytes) -> PatternPack:
+    """
+    Validate and compile a pack file's contents, cached by content hash.
+
+    Raises:
+        PatternPackError: If the pack is malformed
+    """
+    digest = hashlib.sha256(raw).hexdigest()
+    pack = _compiled.get(digest)
+    if pack is not None:
+        return pack
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        raise PatternPackError(f"Pattern pack is not valid JSON: {e}") from None
+    patterns = parse_patterns(data)
+    version = data.get("version")
+    if not isinstance(version, str) or not version:
+        raise PatternPackError("Pattern pack needs a version string")
+    pack = _compiled[digest] = PatternPack(version, digest, patterns)
+    return pack
+
+
+def load_pack(path: Path) -> PatternPack:
+    """
+    Read and compile a pack file.
+
+    Raises:
+        PatternPackError: If the file cannot be read or is malformed
+    """
+    try:
+        raw = path.read_bytes()
+    except OSError as e:
+        raise PatternPackError(f"Cannot read pattern pack: {e}") from None
+    return compile_pack(raw)
+
+
+class PatternPackStore:
+    """
+    Holds the active pack and swaps in new ones.
+
+    Args:
+        path: Pack file to load and watch
+
+    If the configured file is unusable at startup, the pack shipped with
+    this build is used instead, so the safety checks always have patterns.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._stamp = self._file_stamp()
+        try:
+            pack = load_pack(path)
+        except PatternPackError as e:
+            logger.error(
+                "pattern_pack_rejected",
+                extra={"stage": "pattern_pack", "reason": str(e)},
+            )
+            PATTERN_PACK_RELOADS.inc("rejected")
+            pack = load_pack(DEFAULT_PACK_PATH)
+        self.active = pack
+        PATTERN_PACK_INFO.set(pack.version)
+
+    def _file_stamp(self) -> tuple[float, int] | None:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
+
+    def reload(self) -> bool:
+        """
+        Load the pack file again and swap it in if it changed.
+
+        Returns:
+            True if a new pack is now active
+        """
+        self._stamp = self._file_stamp()
+        try:
+            pack = load_pack(self.path)
+        except PatternPackError as e:
+            logger.error(
+                "pattern_pack_rejected",
+                extra={"stage": "pattern_pack", "reason": str(e)},
+            )
+            PATTERN_PACK_RELOADS.inc("rejected")
+            return False
+        if pack is self.active:
+            PATTERN_PACK_RELOADS.inc("unchanged")
+            return False
+
+        # Single assignment: readers see the old pack or the new, never a mix
+        self.active = pack
+        PATTERN_PACK_INFO.set(pack.version)
+        PATTERN_PACK_RELOADS.inc("applied")
+        logger.warning(
+            "pattern_pack_applied",
+            extra={"stage": "pattern_pack", "version": pack.version},
+        )
+        return True
+
+    async def watch(self, interval: float) -> None:
+        """Reload whenever the file's modification time or size changes."""
+        while True:
+            await asyncio.sleep(interval)
+            if self._file_stamp() != self._stamp:
+                self.reload()
+
+
+# Process-wide active pack, read by every safety check
+pattern_packs = PatternPackStore(
+    Path(settings.pattern_pack_path)
+    if settings.pattern_pack_path
+    else DEFAULT_PACK_PATH
+)
@@ -0,0 +1,240 @@
+"""Precompiled single-pass pattern scanner for Unconditional safety checks.
+
+Each pattern family (banned input, self-harm, harm to others, immediate danger,
+guardrail phrases) is merged into one compiled alternation with a named group
+per pattern. The common case, a message that matches nothing, is answered by a
+single scan of the text instead of one `re.search` per pattern.
+
+Verdicts are exactly those of searching each pattern on its own: the merged
+regex only decides *whether* and *where* the first hit is. Which patterns
+matched is then confirmed per pattern, starting from that first hit.
+"""
+
+import re
+from collections import defaultdict
+from collections.abc import Sequence
+from re import _constants as sre_constants  # type: ignore[attr-defined]
+from re import _parser as sre_parse  # type: ignore[attr-defined]
+
+# A pattern can be grouped under its leading literal if it starts with a word
+# boundary followed by one plain, unquantified character
+_GROUPABLE_PREFIX = re.compile(r"\\b([\w'])(?![?*+{])")
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    """Check whether a pattern contains `|` outside any group or class."""
+    depth = 0
+    in_class = False
+    escaped = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+def _group_name(index: int) -> str:
+    return f"p{index}"
+
+
+def build_combined_pattern(patterns: Sequence[str]) -> str:
+    """
+    Merge a pattern family into one alternation with a named group per pattern.
+
+    Args:
+        patterns: Regex patterns, in priority order
+
+    Returns:
+        Combined regex source
+
+    Patterns of the form `\\b<char>...` are grouped by their leading character
+    behind a single shared word boundary, so the regex engine tries only the
+    handful of alternatives that can start at each position.
+    """
+    grouped: dict[str, list[str]] = defaultdict(list)
+    ungrouped: list[str] = []
+
+    for index, pattern in enumerate(patterns):
+        name = _group_name(index)
+        prefix = _GROUPABLE_PREFIX.match(pattern)
+        if prefix and not _has_top_level_alternation(pattern):
+            grouped[prefix.group(1)].append(f"(?P<{name}>{pattern[prefix.end() :]})")
+        else:
+            ungrouped.append(f"(?P<{name}>{pattern})")
+
+    branches = []
+    if grouped:
+        heads = "|".join(
+            f"{re.escape(char)}(?:{'|'.join(tails)})" for char, tails in grouped.items()
+        )
+        branches.append(rf"\b(?:{heads})")
+    branches.extend(ungrouped)
+
+    return "|".join(branches)
+
+
+# Times an unbounded repeat (`\s+`, `\w+`) is counted in a span. Runs of
+# whitespace in replies are far shorter; a longer run (or word, for `\w+`)
+# can show the start of a phrase before the reply is replaced at its end
+UNBOUNDED_REPEAT_WIDTH = 8
+
+
+def _span_width(items: sre_parse.SubPattern | list) -> int:
+    """Longest span of parsed regex items, with unbounded repeats capped."""
+    width = 0
+    for op, av in items:
+        if op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            continue
+        if op == sre_constants.SUBPATTERN:
+            width += _span_width(av[-1])
+        elif op == sre_constants.ATOMIC_GROUP:
+            width += _span_width(av)
+        elif op == sre_constants.BRANCH:
+            width += max(_span_width(branch) for branch in av[1])
+        elif op in (
+            sre_constants.MAX_REPEAT,
+            sre_constants.MIN_REPEAT,
+            sre_constants.POSSESSIVE_REPEAT,
+        ):
+            low, high, item = av
+            if high == sre_constants.MAXREPEAT:
+                count = max(low, UNBOUNDED_REPEAT_WIDTH)
+            else:
+                count = high
+            width += count * _span_width(item)
+        else:
+            # Literals, character classes, "." and anything else single-width
+            width += 1
+    return width
+
+
+def holdback_length(patterns: Sequence[str]) -> int:
+    """
+    Longest span any pattern covers in ordinary text.
+
+    Args:
+        patterns: Regex patterns
+
+    Returns:
+        Character count, taking the longest alternative of every branch and
+        counting unbounded repeats (`\\s+`, `\\w+`) UNBOUNDED_REPEAT_WIDTH
+        times
+
+    Streaming output is held back by this many characters, so a phrase that
+    is still arriving has not been shown before it can be matched.
+    """
+    return max(
+        (_span_width(sre_parse.parse(pattern)) for pattern in patterns), default=0
+    )
+
+
+class PatternScanner:
+    """
+    Compiled scanner for one family of safety patterns.
+
+    Args:
+        patterns: Regex patterns, in priority order
+
+    Safety reasoning:
+        - Same verdicts as searching each pattern individually
+        - Patterns are compiled once, never per message
+        - Clean messages (the common case) cost a single pass over the text
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = tuple(patterns)
+        self._compiled = tuple(re.compile(pattern) for pattern in self.patterns)
+        self._combined = (
+            re.compile(build_combined_pattern(self.patterns)) if self.patterns else None
+        )
+
+    def _first_hit(self, text: str) -> tuple[int, int] | None:
+        """Leftmost match of any pattern as (position, pattern index), or None."""
+        if self._combined is None:
+            return None
+        match = self._combined.search(text)
+        if match is None:
+            return None
+        # The outermost per-pattern group always closes last
+        return match.start(), int(str(match.lastgroup)[1:])
+
+    def find(self, text: str, pos: int = 0) -> re.Match[str] | None:
+        """
+        Find the leftmost match of any pattern at or after a position.
+
+        Args:
+            text: Text to scan (callers normalize case)
+            pos: Index to start scanning from
+
+        Returns:
+            Match object spanning the hit, or None
+        """
+        if self._combined is None:
+            return None
+        return self._combined.search(text, pos)
+
+    def search(self, text: str) -> bool:
+        """
+        Check whether any pattern matches.
+
+        Args:
+            text: Text to scan (callers normalize case)
+
+        Returns:
+            True if at least one pattern matches
+        """
+        return self._first_hit(text) is not None
+
+    def first_match(self, text: str) -> str | None:
+        """
+        Find the first pattern, in priority order, that matches.
+
+        Args:
+            text: Text to scan (callers normalize case)
+
+        Returns:
+            The matching pattern string, or None
+        """
+        hit = self._first_hit(text)
+        if hit is None:
+            return None
+        start, hit_index = hit
+        # Only higher-priority patterns can take precedence over the known hit
+        for index in range(hit_index):
+            if self._compiled[index].search(text, start):
+                return self.patterns[index]
+        return self.patterns[hit_index]
+
+    def matches(self, text: str) -> list[str]:
+        """
+        Find every pattern that matches, in priority order.
+
+        Args:
+            text: Text to scan (callers normalize case)
+
+        Returns:
+            List of matching pattern strings (empty if none)
+        """
+        hit = self._first_hit(text)
+        if hit is None:
+            return []
+        start, hit_index = hit
+        # No pattern can match before the leftmost hit of the combined scan
+        return [
+            pattern
+            for index, (pattern, compiled) in enumerate(
+                zip(self.patterns, self._compiled)
+            )
+            if index == hit_index or compiled.search(text, start)
+        ]
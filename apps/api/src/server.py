@@ -0,0 +1,283 @@
+"""Production server: preforked uvicorn workers sharing one listening socket.
+
+The supervisor imports the app once, so compiled safety patterns, prompts
+and prerendered responses exist before any worker does. It then binds the
+socket and forks the workers. Each worker runs its own event loop and
+accepts from the shared socket, so the kernel spreads connections across
+them. The preloaded objects are shared copy-on-write, and the garbage
+collector is frozen after preload so it never writes to their pages.
+
+Threads and tasks do not survive a fork, so each worker runs the app's
+lifespan itself: LLM stack loading (kept out of the preload, so the first
+health check is not held up) and the pattern pack watcher. Rate
+limits, LLM concurrency limits and metrics are therefore per worker, and
+each worker gets an equal share of the daily LLM token budget. Metrics
+carry a worker="<pid>" label, so a scrape says which worker answered it.
+
+Behind a reverse proxy, the client address comes from X-Forwarded-For when
+the proxy is listed in FORWARDED_ALLOW_IPS; otherwise every client would
+share the proxy's address, and its rate limit.
+
+On SIGTERM or SIGINT the supervisor sends SIGTERM to every worker. A
+worker then stops accepting connections and lets requests in flight finish
+for up to SHUTDOWN_GRACE_PERIOD seconds. That includes streamed
+generations. Workers still running after that are killed. SIGHUP is
+forwarded, so every worker reloads its pattern pack. A worker that exits
+on its own is replaced.
+
+Usage (from src):
+    python -m server
+    WEB_CONCURRENCY=4 SHUTDOWN_GRACE_PERIOD=25 python -m server
+    FORWARDED_ALLOW_IPS='*' python -m server
+
+Safety reasoning:
+    - A deploy no longer cuts off a reply mid-conversation: in-flight
+      generations finish before the worker exits
+    - Every worker runs the same preloaded patterns
+    - A crashed worker is replaced, so capacity recovers without a restart
+"""
+
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from types import FrameType
+
+import uvicorn
+from starlette.types import ASGIApp
+
+from core.config import settings
+from core.logging import configure_logging, shutdown_logging
+from core.metrics import registry
+from services.llm.usage import token_budget
+
+logger = logging.getLogger(__name__)
+
+# Connections the kernel queues on the shared socket before refusing more
+BACKLOG = 2048
+
+# Seconds between checks for exited workers while draining
+_DRAIN_POLL_INTERVAL = 0.1
+
+# Seconds a worker that keeps dying waits before it is replaced again
+_RESPAWN_DELAY = 1.0
+
+# Signals the supervisor handles, blocked while forking
+_SIGNALS = {signal.SIGTERM, signal.SIGINT, signal.SIGHUP}
+
+
+def worker_count(configured: int) -> int:
+    """
+    Number of worker processes to run.
+
+    Args:
+        configured: WEB_CONCURRENCY (0: one per available CPU)
+
+    Returns:
+        The configured count, or the CPUs this process may run on
+
+    The CPU affinity ignores container CPU quotas, so deployments on a
+    fractional CPU should set WEB_CONCURRENCY.
+    """
+    if configured > 0:
+        return configured
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        # Not available on every platform
+        return os.cpu_count() or 1
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Bind and listen on the socket every worker accepts from."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(BACKLOG)
+    return sock
+
+
+def _exit_worker(signum: int, frame: FrameType | None) -> None:
+    raise SystemExit(0)
+
+
+def _run_worker(app: ASGIApp, sock: socket.socket, grace_period: float) -> int:
+    """Serve on the shared socket until told to stop; returns the exit code."""
+    # Before uvicorn takes over the signals, SIGTERM just exits: nothing is
+    # in flight yet. SIGHUP waits for the lifespan's pattern pack handler.
+    signal.signal(signal.SIGTERM, _exit_worker)
+    signal.signal(signal.SIGINT, _exit_worker)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, _SIGNALS)
+    # The log writer thread is not inherited: start this worker's own
+    configure_logging(settings.log_level, settings.log_queue_size)
+    registry.label_worker(str(os.getpid()))
+    server = uvicorn.Server(
+        uvicorn.Config(
+            app,
+            lifespan="on",
+            log_config=None,
+            timeout_graceful_shutdown=grace_period,
+            proxy_headers=True,
+            forwarded_allow_ips=settings.forwarded_allow_ips,
+        )
+    )
+    try:
+        server.run(sockets=[sock])
+    except SystemExit:
+        # uvicorn re-raises the SIGTERM it drained on, after shutdown
+        pass
+    finally:
+        shutdown_logging()
+    return 0 if server.started else 1
+
+
+class Supervisor:
+    """
+    Forks the workers, replaces dead ones and drains them on shutdown.
+
+    Args:
+        app: Preloaded ASGI app
+        sock: Bound listening socket, shared by every worker
+        workers: Number of worker processes
+        grace_period: Seconds workers get to finish requests after SIGTERM
+    """
+
+    def __init__(
+        self, app: ASGIApp, sock: socket.socket, workers: int, grace_period: float
+    ):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.grace_period = grace_period
+        self.pids: set[int] = set()
+        self.stopping = False
+
+    def spawn(self) -> None:
+        """Fork one worker."""
+        # Fork with no other threads running: the log writer is flushed and
+        # stopped, and restarted in both processes. Signals wait until each
+        # process has its own handlers.
+        shutdown_logging()
+        signal.pthread_sigmask(signal.SIG_BLOCK, _SIGNALS)
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = _run_worker(self.app, self.sock, self.grace_period)
+            finally:
+                # Never return into the supervisor's loop or atexit handlers
+                os._exit(code)
+        self.pids.add(pid)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, _SIGNALS)
+        configure_logging(settings.log_level, settings.log_queue_size)
+
+    def _stop(self, signum: int, frame: FrameType | None) -> None:
+        self.stopping = True
+        self._signal_workers(signal.SIGTERM)
+
+    def _reload(self, signum: int, frame: FrameType | None) -> None:
+        self._signal_workers(signal.SIGHUP)
+
+    def _signal_workers(self, signum: int) -> None:
+        for pid in self.pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        """Run the workers until a shutdown signal, then drain them."""
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._reload)
+
+        for _ in range(self.workers):
+            if self.stopping:
+                break
+            self.spawn()
+        logger.info("server_started", extra={"workers": self.workers})
+
+        while not self.stopping:
+            pid, status = os.wait()
+            self.pids.discard(pid)
+            if not self.stopping:
+                logger.error(
+                    "worker_exited",
+                    extra={"error": f"exit status {os.waitstatus_to_exitcode(status)}"},
+                )
+                time.sleep(_RESPAWN_DELAY)
+                # A stop may have arrived while sleeping
+                if not self.stopping:
+                    self.spawn()
+
+        self.drain()
+
+    def drain(self) -> None:
+        """Wait for workers to finish in-flight requests, then kill the rest."""
+        logger.warning("server_draining", extra={"workers": len(self.pids)})
+        self.sock.close()
+        # Again, for a worker forked while the stop signal was handled
+        self._signal_workers(signal.SIGTERM)
+        # Workers also run the app's lifespan shutdown after the grace period
+        deadline = time.monotonic() + self.grace_period + 5
+        while self.pids and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                self.pids.discard(pid)
+            else:
+                time.sleep(_DRAIN_POLL_INTERVAL)
+        if self.pids:
+            logger.error("server_drain_timeout", extra={"reason": "killing workers"})
+            self._signal_workers(signal.SIGKILL)
+            for pid in self.pids:
+                os.waitpid(pid, 0)
+            self.pids.clear()
+
+
+def serve(
+    app: ASGIApp, host: str, port: int, workers: int, grace_period: float
+) -> None:
+    """
+    Serve a preloaded app from forked workers until SIGTERM or SIGINT.
+
+    Args:
+        app: ASGI app, imported (and so preloaded) by the caller
+        host: Interface to bind
+        port: Port to bind
+        workers: Worker processes (0: one per available CPU)
+        grace_period: Seconds in-flight requests get after SIGTERM
+    """
+    sock = bind_socket(host, port)
+    # Everything allocated so far is shared with the workers copy-on-write;
+    # keep the garbage collector from touching (and so copying) it
+    gc.collect()
+    gc.freeze()
+    count = worker_count(workers)
+    token_budget.share(count)
+    supervisor = Supervisor(app, sock, count, grace_period)
+    try:
+        supervisor.run()
+    finally:
+        shutdown_logging()
+
+
+def main(app: ASGIApp | None = None) -> None:
+    """Serve the app (default: `main.app`) with the configured settings."""
+    if app is None:
+        from main import app
+
+    serve(
+        app,
+        settings.api_host,
+        settings.api_port,
+        settings.web_concurrency,
+        settings.shutdown_grace_period,
+    )
+
+
+if __name__ == "__main__":
+    main()
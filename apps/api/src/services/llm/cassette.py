@@ -0,0 +1,252 @@
+"""Record/replay cassettes for LLM calls.
+
+In record mode every completed LLM call is appended to a JSONL cassette,
+keyed by a hash of everything that determines the output: the model, the
+instructions, the user message, the history and the model settings. In replay
+mode calls are answered from the cassette with no provider and no network,
+optionally after the recorded latency. Pipeline regression runs become
+deterministic and fast, and offline benchmarks can use real model outputs.
+
+Safety reasoning:
+    - Requests are stored only as a hash; cassettes hold model outputs,
+      which is what guardrail regressions need
+    - A replay miss is an error, so the caller's safe fallback answers
+      instead of a made-up reply
+    - Off unless LLM_CASSETTE_MODE is set; production never replays
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Self
+
+from core.config import settings
+
+if TYPE_CHECKING:
+    from pydantic_ai.messages import ModelMessage
+
+logger = logging.getLogger(__name__)
+
+
+class CassetteMode(str, Enum):
+    """What the cassette does with LLM calls."""
+
+    RECORD = "record"
+    REPLAY = "replay"
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode for a call that was never recorded."""
+
+
+def cassette_key(
+    model: str,
+    instructions: str,
+    message_text: str,
+    message_history: "Sequence[ModelMessage] | None",
+    model_settings: dict[str, Any],
+) -> str:
+    """
+    Hash of everything that determines an LLM call's output.
+
+    History is reduced to the text of each turn: timestamps and other
+    metadata differ between runs but do not reach the model.
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    history = [
+        [message.kind, [getattr(part, "content", None) for part in message.parts]]
+        for message in message_history or []
+    ]
+    request = [
+        model,
+        hashlib.sha256(instructions.encode()).hexdigest(),
+        message_text,
+        history,
+        model_settings,
+    ]
+    encoded = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
+class Recording:
+    """
+    One recorded call.
+
+    Attributes:
+        model: Model identifier, for reading the cassette
+        deltas: Output text as streamed (a single delta for plain runs)
+        first: Seconds to the first delta
+        latency: Seconds to the complete output
+    """
+
+    model: str
+    deltas: tuple[str, ...]
+    first: float
+    latency: float
+
+    @property
+    def output(self) -> str:
+        return "".join(self.deltas)
+
+
+class Cassette:
+    """
+    Cassette file of LLM outputs keyed by request hash.
+
+    Args:
+        path: JSONL file; read at start, appended to while recording
+        mode: Record live calls, or replay recorded ones
+        replay_latency: Whether replay waits the recorded latency
+
+    Recording overwrites an earlier entry for the same key (the last line
+    of the file wins when it is read back).
+    """
+
+    def __init__(self, path: Path, mode: CassetteMode, replay_latency: bool = False):
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self._recordings: dict[str, Recording] = {}
+        if path.exists():
+            with path.open() as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._recordings[entry["key"]] = Recording(
+                            model=entry["model"],
+                            deltas=tuple(entry["deltas"]),
+                            first=entry["first"],
+                            latency=entry["latency"],
+                        )
+
+    @classmethod
+    def from_settings(cls) -> Self | None:
+        """The cassette configured by LLM_CASSETTE_MODE, or None if off."""
+        if not settings.llm_cassette_mode:
+            return None
+        return cls(
+            Path(settings.llm_cassette_path),
+            CassetteMode(settings.llm_cassette_mode),
+            replay_latency=settings.llm_cassette_replay_latency,
+        )
+
+    def __len__(self) -> int:
+        return len(self._recordings)
+
+    def _lookup(self, key: str) -> Recording:
+        recording = self._recordings.get(key)
+        if recording is None:
+            logger.warning("llm_cassette_miss", extra={"stage": "llm"})
+            raise CassetteMissError("LLM call not in cassette")
+        return recording
+
+    def _save(self, key: str, recording: Recording) -> None:
+        self._recordings[key] = recording
+        entry = {
+            "key": key,
+            "model": recording.model,
+            "deltas": recording.deltas,
+            "first": round(recording.first, 4),
+            "latency": round(recording.latency, 4),
+        }
+        with self.path.open("a") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    async def run(
+        self, key: str, model: str, live: Callable[[], Awaitable[str]]
+    ) -> str:
+        """
+        Answer a plain LLM call.
+
+        Args:
+            key: cassette_key() of the call
+            model: Model identifier the call is routed to
+            live: Makes the provider call (only called when recording)
+
+        Returns:
+            The output text
+
+        Raises:
+            CassetteMissError: If replaying a call that was not recorded
+        """
+        if self.mode is CassetteMode.REPLAY:
+            recording = self._lookup(key)
+            if self.replay_latency:
+                await asyncio.sleep(recording.latency)
+            return recording.output
+
+        start = monotonic()
+        output = await live()
+        latency = monotonic() - start
+        self._save(key, Recording(model, (output,), latency, latency))
+        return output
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        key: str,
+        model: str,
+        live: Callable[[], AbstractAsyncContextManager[AsyncIterator[str]]],
+    ) -> AsyncIterator[AsyncIterator[str]]:
+        """
+        Answer a streamed LLM call.
+
+        Args:
+            key: cassette_key() of the call
+            model: Model identifier the call is routed to
+            live: Opens the provider stream (only called when recording)
+
+        Yields:
+            Text deltas. A recording is saved only if they were consumed
+            to the end; a stream cancelled part way is not a complete reply.
+
+        Raises:
+            CassetteMissError: If replaying a call that was not recorded
+        """
+        if self.mode is CassetteMode.REPLAY:
+            yield self._replay(self._lookup(key))
+            return
+
+        start = monotonic()
+        deltas: list[str] = []
+        first: list[float] = []
+        finished = False
+
+        async def recorded(stream: AsyncIterator[str]) -> AsyncIterator[str]:
+            nonlocal finished
+            async for delta in stream:
+                if not first:
+                    first.append(monotonic() - start)
+                deltas.append(delta)
+                yield delta
+            finished = True
+
+        async with live() as stream:
+            yield recorded(stream)
+        if finished:
+            latency = monotonic() - start
+            ttft = first[0] if first else latency
+            self._save(key, Recording(model, tuple(deltas), ttft, latency))
+
+    async def _replay(self, recording: Recording) -> AsyncIterator[str]:
+        """Recorded deltas, paced like the original stream if configured."""
+        if not self.replay_latency or not recording.deltas:
+            for delta in recording.deltas:
+                yield delta
+            return
+        await asyncio.sleep(recording.first)
+        gap = (recording.latency - recording.first) / len(recording.deltas)
+        for index, delta in enumerate(recording.deltas):
+            if index:
+                await asyncio.sleep(gap)
+            yield delta
@@ -0,0 +1,103 @@
+"""Concurrency limiting for LLM calls.
+
+Bounds how many provider calls a single worker keeps in flight, with a
+bounded wait queue in front of it. Everything else on the event loop
+(health checks, banned and crisis short-circuits) never waits here.
+"""
+
+import asyncio
+import contextlib
+from collections import deque
+from typing import Self
+
+
+class LLMOverloadedError(Exception):
+    """Raised when an LLM call cannot be admitted in time."""
+
+
+class ConcurrencyLimiter:
+    """
+    Async limiter with a bounded FIFO wait queue.
+
+    Args:
+        max_in_flight: Maximum number of concurrent holders
+        max_waiting: Maximum number of callers allowed to queue for a slot
+        wait_timeout: Seconds a caller may wait in the queue
+
+    Safety reasoning:
+        - A provider slowdown cannot pile up unbounded work on one worker
+        - Callers that cannot be served fail fast into the safe fallback
+        - Not bound to a specific event loop, so it is safe as a module global
+    """
+
+    def __init__(self, max_in_flight: int, max_waiting: int, wait_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of callers currently holding a slot."""
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        """Number of callers currently queued for a slot."""
+        return len(self._waiters)
+
+    @property
+    def saturated(self) -> bool:
+        """Whether a new caller would be rejected outright (queue full)."""
+        return (
+            self._in_flight >= self.max_in_flight
+            and len(self._waiters) >= self.max_waiting
+        )
+
+    async def acquire(self) -> None:
+        """
+        Acquire a slot, queueing if all slots are taken.
+
+        Raises:
+            LLMOverloadedError: If the queue is full or the wait times out
+        """
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            return
+
+        if len(self._waiters) >= self.max_waiting:
+            raise LLMOverloadedError("LLM wait queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(self.wait_timeout):
+                await waiter
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                with contextlib.suppress(ValueError):
+                    self._waiters.remove(waiter)
+            if isinstance(e, TimeoutError):
+                raise LLMOverloadedError("Timed out waiting for an LLM slot") from e
+            raise
+
+    def release(self) -> None:
+        """Release a slot, handing it directly to the next waiter if any."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    async def __aenter__(self) -> Self:
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.release()
@@ -4,9 +4,11 @@ Provides centralized model configuration for pydantic-ai Agents.
 Returns model name that can be passed directly to Agent() constructor.
 """
 
+import functools
 import os
 
 
+@functools.cache
 def get_llm_model() -> str:
     """
     Get configured LLM model identifier.
@@ -16,7 +18,7 @@ def get_llm_model() -> str:
 
     Safety reasoning:
         - Single point of model configuration
-        - Environment-driven model selection
+        - Environment-driven model selection, resolved once per process
         - pydantic-ai handles all provider-specific logic
         - Supports all pydantic-ai model providers
 
@@ -38,6 +40,11 @@ def get_llm_model() -> str:
         agent = Agent(get_llm_model(), instructions="...")
         ```
     """
+    return _env_model()
+
+
+def _env_model() -> str:
+    """Read LLM_MODEL (or the legacy LLM_PROVIDER)."""
     # Get provider and model from environment
     # Format: "provider:model-name" (e.g., "openai:gpt-5.1")
     model = os.getenv("LLM_MODEL", "openai:gpt-5.1")
@@ -53,3 +60,70 @@ def get_llm_model() -> str:
         # Add more legacy provider mappings as needed
 
     return model
+
+
+@functools.cache
+def _configured_models() -> tuple[tuple[str, float | None], ...]:
+    """Parse LLM_MODELS ("model[=weight],..."), resolved once per process."""
+    choices = []
+    for entry in os.getenv("LLM_MODELS", "").split(","):
+        model, _, weight = entry.strip().partition("=")
+        if model:
+            choices.append((model, float(weight) if weight else None))
+    if any(weight is not None for _, weight in choices):
+        # Weighted routing: unweighted entries get weight 1
+        choices = [
+            (model, 1.0 if weight is None else weight) for model, weight in choices
+        ]
+    return tuple(choices)
+
+
+def get_llm_models() -> list[tuple[str, float | None]]:
+    """
+    Get the models conversations are routed across.
+
+    Returns:
+        (model identifier, weight) pairs. Weight None means ordered
+        failover: the first healthy model is used
+
+    Configuration:
+        LLM_MODELS="openai:gpt-5.1,anthropic:claude-sonnet-4-0"
+            Ordered: the second model only serves when the first fails
+        LLM_MODELS="openai:gpt-5.1=3,anthropic:claude-sonnet-4-0=1"
+            Weighted: traffic split 3:1, shifted away from failing models
+        Unset: the single model from get_llm_model()
+
+    Safety reasoning:
+        - A second provider keeps conversations going through an outage
+          of the first instead of every user getting the fallback
+    """
+    return list(_configured_models()) or [(get_llm_model(), None)]
+
+
+def get_hedge_model() -> str | None:
+    """
+    Get the model identifier for hedged LLM calls.
+
+    Returns:
+        LLM_HEDGE_MODEL if set, otherwise None (routed like the first call)
+
+    Safety reasoning:
+        - A hedge may go to a different provider, so one provider's tail
+          latency is not hedged against itself
+        - Hedge output passes the same guardrails as the primary's
+    """
+    return os.getenv("LLM_HEDGE_MODEL") or None
+
+
+def llm_providers() -> set[str]:
+    """
+    Provider names of every configured model, for preloading their modules.
+
+    Reads the configuration directly, so preloading never resolves (or
+    caches) the models conversations use.
+    """
+    models = [model for model, _ in _configured_models()] or [_env_model()]
+    hedge = get_hedge_model()
+    if hedge:
+        models.append(hedge)
+    return {model.partition(":")[0] for model in models if ":" in model}
@@ -0,0 +1,298 @@
+"""LLM generation service.
+
+Runs the pydantic-ai Agent natively on the event loop. Provider round trips
+are awaited, never run synchronously, so a slow completion only occupies one
+concurrency slot instead of stalling every other request on the worker.
+
+Each call asks for only as many output tokens as fit the response length
+limit (see services.llm.length), so the provider does not generate text
+that check_length would cut. A reply the provider cut off at that limit is
+cut back to its last whole sentence.
+"""
+
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from core.config import settings
+from core.metrics import STAGE_SECONDS
+from safety.guardrails import MAX_RESPONSE_LENGTH, check_length
+from services.llm import factory
+from services.llm.cassette import Cassette, cassette_key
+from services.llm.concurrency import ConcurrencyLimiter
+from services.llm.hedging import Hedger
+from services.llm.length import LengthController
+from services.llm.loader import ensure_llm_stack
+from services.llm.prompt_cache import cache_user_prompt, prompt_cache_settings
+from services.llm.registry import llm_registry, model_name
+from services.llm.routing import ModelRouter
+from services.llm.usage import record_usage, token_budget
+
+if TYPE_CHECKING:
+    from pydantic_ai.messages import ModelMessage
+    from pydantic_ai.models import Model
+    from pydantic_ai.settings import ModelSettings
+
+MODEL_SETTINGS: "ModelSettings" = {
+    "temperature": 0.7,
+    "max_tokens": 500,
+}
+
+# Process-wide max_tokens sizing, learned from observed replies
+length_controller = LengthController(
+    max_chars=MAX_RESPONSE_LENGTH, max_tokens=MODEL_SETTINGS["max_tokens"]
+)
+
+# Time from opening a provider stream to its first text delta
+LLM_FIRST_TOKEN_SECONDS = STAGE_SECONDS.labels("llm_first_token")
+
+# Process-wide limiter for in-flight provider calls
+llm_limiter = ConcurrencyLimiter(
+    max_in_flight=settings.llm_max_concurrency,
+    max_waiting=settings.llm_max_queue,
+    wait_timeout=settings.llm_queue_timeout,
+)
+
+# Process-wide model health, breakers and per-model concurrency limits
+model_router = ModelRouter(
+    window=settings.llm_breaker_window,
+    error_threshold=settings.llm_breaker_error_rate,
+    min_calls=settings.llm_breaker_min_calls,
+    cooldown=settings.llm_breaker_cooldown,
+    max_concurrency=settings.llm_model_max_concurrency,
+)
+
+# Process-wide hedging state (latency window and budget), used when enabled
+llm_hedger = Hedger(
+    percentile=settings.llm_hedge_percentile,
+    initial_delay=settings.llm_hedge_initial_delay,
+    budget_ratio=settings.llm_hedge_budget,
+)
+
+# Record/replay cassette for LLM calls (LLM_CASSETTE_MODE), None when off
+llm_cassette = Cassette.from_settings()
+
+
+def _cut_off(finish_reason: str | None, output_tokens: int, max_tokens: int) -> bool:
+    """Whether the provider stopped at the token limit, mid-sentence."""
+    # Not every provider reports a finish reason; a full token limit tells
+    return finish_reason == "length" or output_tokens >= max_tokens
+
+
+def _model_settings(model: "Model | str") -> "ModelSettings":
+    """Base settings, sized to the length limit, plus provider caching."""
+    return (
+        MODEL_SETTINGS
+        | {"max_tokens": length_controller.max_tokens()}
+        | prompt_cache_settings(model)
+    )
+
+
+async def generate_response(
+    message_text: str,
+    instructions: str,
+    message_history: "list[ModelMessage] | None" = None,
+    model: "Model | str | None" = None,
+) -> str:
+    """
+    Generate an LLM response without blocking the event loop.
+
+    Args:
+        message_text: User's message
+        instructions: System prompt passed to the agent as instructions
+        message_history: Prior turns, already fitted to the token budget
+        model: Model to call (default: routed across the configured models)
+
+    Returns:
+        Raw LLM output text, cut to its last whole sentence if the provider
+        stopped at the token limit (guardrails are applied by the caller)
+
+    Raises:
+        LLMOverloadedError: If no concurrency slot frees up in time
+        LLMUnavailableError: If every model's circuit breaker is open
+        TokenBudgetExhaustedError: If today's token budget is spent
+        Exception: Any provider error, for the caller's safe fallback
+
+    Safety reasoning:
+        - Bounded in-flight calls keep one worker responsive under load
+        - Agents and provider connections are shared, never rebuilt per message
+        - A failing model is skipped for the next healthy one
+        - Output is returned raw so guardrails stay in the orchestrator
+    """
+
+    async def call(routed: "Model | str") -> str:
+        start = perf_counter()
+        model_settings = _model_settings(routed)
+        result = await llm_registry.get_agent(routed).run(
+            cache_user_prompt(routed, message_text),
+            message_history=message_history,
+            instructions=instructions,
+            model_settings=model_settings,
+        )
+        usage = result.usage()
+        record_usage(usage, model_name(routed), perf_counter() - start)
+        length_controller.observe(len(result.output), usage.output_tokens)
+        if _cut_off(
+            result.response.finish_reason,
+            usage.output_tokens,
+            model_settings["max_tokens"],
+        ):
+            return check_length(result.output, truncated=True)
+        return result.output
+
+    async def run(routed: "Model | str") -> str:
+        if llm_cassette is None:
+            return await call(routed)
+        name = model_name(routed)
+        key = cassette_key(
+            name, instructions, message_text, message_history, dict(MODEL_SETTINGS)
+        )
+        return await llm_cassette.run(key, name, lambda: call(routed))
+
+    token_budget.check()
+    await ensure_llm_stack()
+    choices = factory.get_llm_models() if model is None else [(model, None)]
+    async with llm_limiter:
+        return await model_router.call(choices, run)
+
+
+async def _time_first_delta(
+    deltas: AsyncIterator[str], start: float
+) -> AsyncIterator[str]:
+    """Pass deltas through, timing the first against `start`."""
+    async for delta in deltas:
+        LLM_FIRST_TOKEN_SECONDS.observe(perf_counter() - start)
+        yield delta
+        break
+    async for delta in deltas:
+        yield delta
+
+
+class _StreamCancelled(Exception):
+    """Raised inside a provider stream to abandon it."""
+
+
+@dataclass
+class ResponseStream:
+    """Async iterator of raw text deltas that the consumer can cancel."""
+
+    deltas: AsyncIterator[str]
+    cancelled: bool = False
+    # Whether the provider stopped at the token limit; known once the
+    # stream has been read to the end and closed
+    truncated: bool = False
+
+    def cancel(self) -> None:
+        """Cancel the provider call once the consumer stops iterating."""
+        self.cancelled = True
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self.deltas
+
+
+@asynccontextmanager
+async def stream_response(
+    message_text: str,
+    instructions: str,
+    message_history: "list[ModelMessage] | None" = None,
+) -> AsyncIterator[ResponseStream]:
+    """
+    Stream an LLM response as text deltas.
+
+    Args:
+        message_text: User's message
+        instructions: System prompt passed to the agent as instructions
+        message_history: Prior turns, already fitted to the token budget
+
+    Yields:
+        ResponseStream of raw text deltas as the provider produces them
+
+    Raises:
+        LLMOverloadedError: If no concurrency slot frees up in time
+        LLMUnavailableError: If every model's circuit breaker is open
+        TokenBudgetExhaustedError: If today's token budget is spent
+        Exception: Any provider error, for the caller's safe fallback
+
+    Safety reasoning:
+        - Streams go to the healthiest model but do not fail over: part of
+          the reply may already be on screen
+        - Calling cancel() stops the provider stream (and spend) as soon as
+          the consumer leaves the block, e.g. on a guardrail violation
+        - Deltas are raw: the caller must run them through StreamingGuardrail
+        - `truncated` tells the caller, once the block is left, to cut the
+          reply back to a whole sentence
+
+    Usage:
+        ```python
+        async with stream_response(text, instructions) as stream:
+            async for delta in stream:
+                if should_stop(delta):
+                    stream.cancel()
+                    break
+        ```
+    """
+
+    truncated = False
+
+    @asynccontextmanager
+    async def provider_stream(
+        model: "Model | str",
+    ) -> AsyncIterator[AsyncIterator[str]]:
+        nonlocal truncated
+        start = perf_counter()
+        model_settings = _model_settings(model)
+        async with llm_registry.get_agent(model).run_stream(
+            cache_user_prompt(model, message_text),
+            message_history=message_history,
+            instructions=instructions,
+            model_settings=model_settings,
+        ) as result:
+            chars = 0
+
+            async def counted(deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+                nonlocal chars
+                async for delta in deltas:
+                    chars += len(delta)
+                    yield delta
+
+            # No debouncing: time to first token is what users feel
+            yield counted(
+                _time_first_delta(
+                    result.stream_text(delta=True, debounce_by=None), start
+                )
+            )
+            # Not reached when the consumer cancels: usage would be partial
+            usage = result.usage()
+            record_usage(usage, model_name(model), perf_counter() - start)
+            length_controller.observe(chars, usage.output_tokens)
+            truncated = _cut_off(
+                result.response.finish_reason,
+                usage.output_tokens,
+                model_settings["max_tokens"],
+            )
+
+    token_budget.check()
+    await ensure_llm_stack()
+    async with llm_limiter, model_router.route(factory.get_llm_models()) as model:
+        if llm_cassette is None:
+            opened = provider_stream(model)
+        else:
+            name = model_name(model)
+            key = cassette_key(
+                name, instructions, message_text, message_history, dict(MODEL_SETTINGS)
+            )
+            opened = llm_cassette.stream(key, name, lambda: provider_stream(model))
+        try:
+            async with opened as deltas:
+                stream = ResponseStream(deltas)
+                yield stream
+                if stream.cancelled:
+                    # Leaving run_stream normally would drain the whole
+                    # response; leaving it with an exception cancels the call
+                    raise _StreamCancelled
+            stream.truncated = truncated
+        except _StreamCancelled:
+            # Stopped by the consumer, not a provider failure
+            pass
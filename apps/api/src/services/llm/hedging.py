@@ -0,0 +1,205 @@
+"""Hedged LLM requests.
+
+Provider latency has a long tail. When a call has not returned within the
+hedge delay (a high percentile of recent call latencies), a second call is
+fired, possibly to a different model. The first result the caller accepts
+wins and the other call is cancelled.
+
+Extra calls are capped by a budget: each request earns a fraction of a hedge
+(e.g. 0.05), and a hedge spends a whole one, so hedges can never exceed that
+fraction of requests, however slow the provider gets.
+"""
+
+import asyncio
+import math
+from collections import deque
+from collections.abc import Awaitable, Callable
+from time import perf_counter
+
+from core.metrics import LLM_HEDGES
+
+
+def _discard_outcome(task: asyncio.Task[object]) -> None:
+    """Mark a losing call's outcome as seen, so asyncio does not log it."""
+    if not task.cancelled():
+        task.exception()
+
+
+class LatencyWindow:
+    """
+    Percentiles over the most recent call latencies.
+
+    Args:
+        size: Number of recent latencies kept
+        refresh_every: Observations between percentile recomputations
+
+    The percentile is recomputed every `refresh_every` observations rather
+    than per request, so reading it costs nothing on the hot path.
+    """
+
+    def __init__(self, size: int = 1000, refresh_every: int = 32):
+        self._samples: deque[float] = deque(maxlen=size)
+        self._refresh_every = refresh_every
+        self._since_refresh = 0
+        self._cached: dict[float, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        """Record one completed call."""
+        self._samples.append(seconds)
+        self._since_refresh += 1
+        if self._since_refresh >= self._refresh_every:
+            self._since_refresh = 0
+            self._cached.clear()
+
+    def percentile(self, q: float) -> float:
+        """
+        Nearest-rank percentile of the window.
+
+        Args:
+            q: Percentile, 0 to 100
+
+        Returns:
+            Latency in seconds (0.0 for an empty window)
+        """
+        value = self._cached.get(q)
+        if value is None:
+            ordered = sorted(self._samples)
+            if not ordered:
+                return 0.0
+            rank = max(math.ceil(q / 100 * len(ordered)), 1)
+            value = self._cached[q] = ordered[rank - 1]
+        return value
+
+
+class HedgeBudget:
+    """
+    Token bucket capping hedges to a fraction of requests.
+
+    Args:
+        ratio: Hedges earned per request (0.05 allows 5% extra calls)
+        burst: Most hedges that can be saved up while the provider is fast
+
+    Safety reasoning:
+        - A provider slowdown makes every call a hedge candidate; the
+          budget stops hedging from doubling load on a struggling provider
+    """
+
+    def __init__(self, ratio: float, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+
+    def earn(self) -> None:
+        """Credit one request."""
+        self._tokens = min(self._tokens + self.ratio, self.burst)
+
+    def try_spend(self) -> bool:
+        """Take one hedge from the budget, if there is one."""
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+
+class Hedger:
+    """
+    Runs a call, hedging it with a second one when it is slow.
+
+    Args:
+        percentile: Latency percentile used as the hedge delay
+        initial_delay: Hedge delay until `min_samples` calls have completed
+        budget_ratio: Hedges allowed per request
+        min_samples: Completed calls needed before the percentile is used
+
+    Metrics:
+        LLM_HEDGES counts hedges that won, lost (the first call was used)
+        and were denied by the budget
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        initial_delay: float,
+        budget_ratio: float,
+        min_samples: int = 20,
+    ):
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.latencies = LatencyWindow()
+        self.budget = HedgeBudget(budget_ratio)
+
+    def delay(self) -> float:
+        """Seconds to wait on the first call before hedging."""
+        if len(self.latencies) < self.min_samples:
+            return self.initial_delay
+        return self.latencies.percentile(self.percentile)
+
+    async def _timed[T](self, call: Callable[[], Awaitable[T]]) -> T:
+        start = perf_counter()
+        result = await call()
+        self.latencies.observe(perf_counter() - start)
+        return result
+
+    async def run[T](
+        self,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[], Awaitable[T]],
+        accept: Callable[[T], bool],
+    ) -> T:
+        """
+        Run `primary`, hedging it with `hedge` if it is slow.
+
+        Args:
+            primary: Starts the first call
+            hedge: Starts the second call (same or different model)
+            accept: Whether a result may be used (e.g. passes guardrails)
+
+        Returns:
+            The first accepted result; if none is accepted, a rejected one
+
+        Raises:
+            Exception: The call's error, if every call failed
+
+        Safety reasoning:
+            - The loser is cancelled, which releases its concurrency slot
+              and stops provider spend
+            - A result failing `accept` never beats one that passes it
+        """
+        self.budget.earn()
+        tasks = [asyncio.create_task(self._timed(primary))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.delay())
+            if not done:
+                if self.budget.try_spend():
+                    tasks.append(asyncio.create_task(self._timed(hedge)))
+                else:
+                    LLM_HEDGES.inc("denied")
+            winner = await self._first_accepted(tasks, accept)
+        finally:
+            for task in tasks:
+                task.cancel()
+                # A cancelled provider call can still end in an error
+                task.add_done_callback(_discard_outcome)
+
+        if len(tasks) == 2:
+            LLM_HEDGES.inc("won" if winner is tasks[1] else "lost")
+        return winner.result()
+
+    @staticmethod
+    async def _first_accepted[T](
+        tasks: list[asyncio.Task[T]], accept: Callable[[T], bool]
+    ) -> asyncio.Task[T]:
+        """First task with an accepted result, else a rejected, else a failed one."""
+        fallback = None
+        async for task in asyncio.as_completed(tasks):
+            failed = task.exception() is not None
+            if not failed and accept(task.result()):
+                return task
+            if fallback is None or not failed:
+                fallback = task
+        assert fallback is not None
+        return fallback
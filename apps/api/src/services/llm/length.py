@@ -0,0 +1,76 @@
+"""LLM output length control.
+
+Replies are cut to MAX_RESPONSE_LENGTH characters by `check_length`, so
+tokens generated past it are paid for and waited on, then thrown away. The
+length controller sizes each call's max_tokens to the character limit,
+using the characters per output token observed in recent replies.
+
+The estimate starts at a conservative ratio and follows replies as they
+complete. It is clamped to a plausible range, so one odd reply (a list of
+emoji, a run of whitespace) cannot starve or unbound the next call.
+
+Safety reasoning:
+    - A reply cut short by max_tokens is still cut back to a whole sentence
+      by check_length, so users never see a sentence stop midway
+    - The limit only gets smaller than before, never larger: the model's
+      base max_tokens stays the ceiling
+"""
+
+import math
+
+from core.metrics import LLM_CHARS_PER_TOKEN
+
+# Characters per output token assumed before any reply is observed: low for
+# English, so early calls err towards generating enough
+INITIAL_CHARS_PER_TOKEN = 3.5
+
+# Plausible range for the estimate
+MIN_CHARS_PER_TOKEN = 2.0
+MAX_CHARS_PER_TOKEN = 6.0
+
+# Weight of each new observation in the moving average
+SMOOTHING = 0.1
+
+# Extra tokens allowed over the estimate, for replies with shorter tokens
+HEADROOM = 1.15
+
+
+class LengthController:
+    """
+    Token limit for replies cut to a character budget.
+
+    Args:
+        max_chars: Longest reply shown, in characters
+        max_tokens: Ceiling on the token limit
+        chars_per_token: Initial characters per output token
+    """
+
+    def __init__(
+        self,
+        max_chars: int,
+        max_tokens: int,
+        chars_per_token: float = INITIAL_CHARS_PER_TOKEN,
+    ):
+        self.max_chars = max_chars
+        self.ceiling = max_tokens
+        self.chars_per_token = chars_per_token
+        LLM_CHARS_PER_TOKEN.set(chars_per_token)
+
+    def max_tokens(self) -> int:
+        """Output tokens to request: enough for `max_chars`, with headroom."""
+        tokens = math.ceil(self.max_chars / self.chars_per_token * HEADROOM)
+        return min(tokens, self.ceiling)
+
+    def observe(self, chars: int, tokens: int) -> None:
+        """
+        Update the estimate from a completed reply.
+
+        Args:
+            chars: Characters generated
+            tokens: Output tokens the provider billed for them
+        """
+        if not tokens or not chars:
+            return
+        ratio = min(max(chars / tokens, MIN_CHARS_PER_TOKEN), MAX_CHARS_PER_TOKEN)
+        self.chars_per_token += SMOOTHING * (ratio - self.chars_per_token)
+        LLM_CHARS_PER_TOKEN.set(round(self.chars_per_token, 3))
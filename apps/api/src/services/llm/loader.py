@@ -0,0 +1,87 @@
+"""Deferred loading of the LLM stack.
+
+pydantic-ai and the provider SDKs take longer to import than the rest of the
+app together. Nothing imports them at startup: the server answers health
+checks, banned-content and crisis messages as soon as FastAPI is up, while a
+background thread loads the LLM stack. The first message that needs the LLM
+awaits the load instead of blocking the event loop on an import.
+
+Safety reasoning:
+    - After a cold start (e.g. a sleeping free-tier instance waking up),
+      someone in crisis gets resources without waiting for the LLM stack
+    - A failed load is retried by the next message, never cached
+"""
+
+import asyncio
+import importlib
+import logging
+import threading
+from concurrent.futures import Future
+
+from services.llm import factory
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_loading: Future[None] | None = None
+_loaded = False
+
+
+def load_llm_stack() -> None:
+    """Import pydantic-ai and the model modules of the configured providers."""
+    global _loaded
+    importlib.import_module("pydantic_ai")
+    for provider in sorted(factory.llm_providers()):
+        for module in (
+            f"pydantic_ai.models.{provider}",
+            f"pydantic_ai.providers.{provider}",
+        ):
+            try:
+                importlib.import_module(module)
+            except ImportError as e:
+                # Unknown names are left to infer_model to report on first use
+                logger.warning(
+                    "llm_preload_failed",
+                    extra={"model": provider, "error": type(e).__name__},
+                )
+    _loaded = True
+
+
+def _run(future: Future[None]) -> None:
+    try:
+        load_llm_stack()
+    except ImportError as e:
+        # A broken install: waiters get the error, the next call retries
+        future.set_exception(e)
+    except BaseException as e:
+        # Anything else is a bug: fail the waiters, and let it end the thread
+        # loudly rather than being reported as a failed load
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(None)
+
+
+def start_loading() -> Future[None]:
+    """Start loading the LLM stack on a background thread (once)."""
+    global _loading
+    with _lock:
+        # A failed load (e.g. a broken install) is retried on the next call
+        if _loading is None or (_loading.done() and _loading.exception()):
+            _loading = Future()
+            threading.Thread(
+                target=_run, args=(_loading,), name="llm-stack-loader", daemon=True
+            ).start()
+        return _loading
+
+
+async def ensure_llm_stack() -> None:
+    """
+    Wait until the LLM stack is loaded, starting the load if needed.
+
+    Raises:
+        ImportError: If pydantic-ai could not be imported
+    """
+    if _loaded:
+        return
+    await asyncio.wrap_future(start_loading())
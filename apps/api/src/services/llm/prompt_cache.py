@@ -0,0 +1,92 @@
+"""Provider prompt-prefix caching.
+
+Every request is laid out prefix-first: the system prompt, byte-identical on
+every request, then the conversation's older turns, then the new message
+(see prompts.history). Providers cache the longest prefix they have seen
+before, which cuts time to first token and the cost of input tokens.
+
+How each provider is asked to cache:
+    - OpenAI caches prefixes of 1024+ tokens on its own. Requests carry a
+      prompt_cache_key derived from the system prompt, so requests that
+      share the prefix are routed to the same cache.
+    - Anthropic caches only marked prefixes. The instructions are marked,
+      and so is the end of the new turn: the next request in the
+      conversation starts with everything up to that mark. The system
+      prompt alone is below Anthropic's minimum cacheable length.
+    - Other providers get no extra settings.
+
+LLM_PROMPT_CACHE=false turns the settings off, e.g. for an OpenAI-compatible
+endpoint that rejects prompt_cache_key. Cached and uncached input tokens are
+counted at /metrics either way (see services.llm.usage).
+
+Safety reasoning:
+    - Caching never changes what is sent, only how the provider stores it:
+      every request still carries the full system prompt
+    - The cache key is derived from the prompt, not from any user
+"""
+
+import hashlib
+from typing import TYPE_CHECKING
+
+from core.config import settings
+from prompts.system import get_system_prompt
+
+if TYPE_CHECKING:
+    from pydantic_ai.messages import UserContent
+    from pydantic_ai.models import Model
+    from pydantic_ai.settings import ModelSettings
+
+# Changes whenever the system prompt does, so a new prompt starts a new cache
+PROMPT_CACHE_KEY = (
+    "unconditional-" + hashlib.sha256(get_system_prompt().encode()).hexdigest()[:16]
+)
+
+# Model settings that ask each provider to cache the prompt prefix
+_PROVIDER_SETTINGS: dict[str, "ModelSettings"] = {
+    "openai": {"extra_body": {"prompt_cache_key": PROMPT_CACHE_KEY}},
+    "anthropic": {"anthropic_cache_instructions": True},  # type: ignore[typeddict-unknown-key]
+}
+
+# Providers that cache up to explicit cache points in the messages
+_MARKED_PROVIDERS = frozenset({"anthropic"})
+
+
+def _provider(model: "Model | str") -> str:
+    if isinstance(model, str):
+        return model.partition(":")[0]
+    return model.system
+
+
+def prompt_cache_settings(model: "Model | str") -> "ModelSettings":
+    """
+    Model settings that enable prefix caching for a model's provider.
+
+    Args:
+        model: Model identifier ("provider:model-name") or Model instance
+
+    Returns:
+        Settings to merge over the base model settings (empty if none apply)
+    """
+    if not settings.llm_prompt_cache:
+        return {}
+    return _PROVIDER_SETTINGS.get(_provider(model), {})
+
+
+def cache_user_prompt(
+    model: "Model | str", message_text: str
+) -> "str | list[UserContent]":
+    """
+    The new turn, with a cache point after it where the provider needs one.
+
+    Args:
+        model: Model identifier ("provider:model-name") or Model instance
+        message_text: User's message
+
+    Returns:
+        The message as is, or followed by a cache point
+    """
+    if not settings.llm_prompt_cache or _provider(model) not in _MARKED_PROVIDERS:
+        return message_text
+    from pydantic_ai.messages import CachePoint
+
+    return [message_text, CachePoint()]
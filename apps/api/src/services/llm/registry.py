@@ -0,0 +1,182 @@
+"""Process-wide LLM agent and provider registry.
+
+Agents, provider clients and HTTP connection pools are built once per model
+identifier and reused for every message, instead of paying agent construction,
+provider construction and a fresh TLS handshake on each request.
+
+pydantic-ai and httpx are imported on first use, not at startup (see
+services.llm.loader).
+"""
+
+import logging
+from functools import cached_property
+from typing import TYPE_CHECKING, Any
+
+from core.config import settings
+
+if TYPE_CHECKING:
+    import httpx
+    from pydantic_ai import Agent
+    from pydantic_ai.models import Model
+    from pydantic_ai.providers import Provider
+
+logger = logging.getLogger(__name__)
+
+
+def model_name(model: "Model | str") -> str:
+    """Model identifier for logs ("provider:model-name" or the model's name)."""
+    return model if isinstance(model, str) else model.model_name
+
+
+class LLMRegistry:
+    """
+    Long-lived cache of agents keyed by model identifier.
+
+    Args:
+        pool_size: Maximum connections per provider HTTP client
+        keepalive: Maximum idle keep-alive connections per provider
+        connect_timeout: Seconds allowed to establish a connection
+        read_timeout: Seconds allowed between bytes of a provider response
+
+    Safety reasoning:
+        - One pooled client per provider bounds sockets under load
+        - Explicit timeouts stop a hung provider holding a connection forever
+        - Agents carry no per-user state, so sharing them leaks nothing
+    """
+
+    def __init__(
+        self,
+        pool_size: int,
+        keepalive: int,
+        connect_timeout: float,
+        read_timeout: float,
+    ):
+        self.pool_size = pool_size
+        self.keepalive = keepalive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._agents: dict[str | int, Agent[None, str]] = {}
+        self._http_clients: dict[str, httpx.AsyncClient] = {}
+
+    @cached_property
+    def limits(self) -> "httpx.Limits":
+        """Connection pool limits shared by every provider client."""
+        import httpx
+
+        return httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.keepalive,
+        )
+
+    @cached_property
+    def timeout(self) -> "httpx.Timeout":
+        """Timeouts shared by every provider client."""
+        import httpx
+
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    def http_client(self, provider_name: str) -> "httpx.AsyncClient":
+        """
+        Get the shared keep-alive HTTP client for a provider.
+
+        Args:
+            provider_name: pydantic-ai provider name (e.g., "openai")
+
+        Returns:
+            Pooled httpx client, recreated if it was closed at shutdown
+        """
+        import httpx
+
+        client = self._http_clients.get(provider_name)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            self._http_clients[provider_name] = client
+        return client
+
+    def _provider_factory(self, provider_name: str) -> "Provider[Any]":
+        """Build a provider that uses the shared HTTP client where supported."""
+        from pydantic_ai.providers import infer_provider, infer_provider_class
+
+        try:
+            provider_class = infer_provider_class(provider_name)
+        except ValueError:
+            # Unknown to the class lookup: let pydantic-ai build (or reject) it
+            return infer_provider(provider_name)
+        try:
+            return provider_class(http_client=self.http_client(provider_name))  # type: ignore[call-arg]
+        except TypeError:
+            # Providers that manage their own transport
+            return infer_provider(provider_name)
+
+    def get_model(self, model: "Model | str") -> "Model":
+        """
+        Resolve a model identifier to a model bound to the shared clients.
+
+        Args:
+            model: Model identifier ("provider:model-name") or Model instance
+
+        Returns:
+            pydantic-ai Model
+        """
+        from pydantic_ai.models import infer_model
+
+        return infer_model(model, provider_factory=self._provider_factory)
+
+    def get_agent(self, model: "Model | str") -> "Agent[None, str]":
+        """
+        Get the long-lived agent for a model, creating it on first use.
+
+        Args:
+            model: Model identifier ("provider:model-name") or Model instance
+
+        Returns:
+            Shared pydantic-ai Agent (instructions are supplied per run)
+        """
+        key = model if isinstance(model, str) else id(model)
+        agent = self._agents.get(key)
+        if agent is None:
+            from pydantic_ai import Agent
+
+            agent = Agent(self.get_model(model))
+            self._agents[key] = agent
+        return agent
+
+    async def warm_up(self, model: "Model | str") -> None:
+        """
+        Open a provider connection ahead of the first user message.
+
+        Args:
+            model: Model identifier ("provider:model-name") or Model instance
+
+        Safety reasoning:
+            - Failures are logged with their traceback, never raised: the
+              safety path must start even if the provider is unreachable
+              at boot
+        """
+        try:
+            await self.get_agent(model).run(
+                "Reply with one word.",
+                model_settings={"max_tokens": 1},
+            )
+        except Exception as e:
+            # The prompt is fixed, so the traceback carries no user content
+            logger.warning(
+                "llm_warmup_failed",
+                extra={"model": model_name(model), "error": type(e).__name__},
+                exc_info=True,
+            )
+
+    async def aclose(self) -> None:
+        """Close all pooled HTTP clients."""
+        for client in self._http_clients.values():
+            await client.aclose()
+        self._http_clients.clear()
+
+
+# Process-wide registry, warmed up and closed by the application lifespan
+llm_registry = LLMRegistry(
+    pool_size=settings.llm_http_pool_size,
+    keepalive=settings.llm_http_keepalive,
+    connect_timeout=settings.llm_connect_timeout,
+    read_timeout=settings.llm_read_timeout,
+)
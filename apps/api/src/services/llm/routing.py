@@ -0,0 +1,339 @@
+"""Health-aware routing across LLM models.
+
+Each configured model keeps a rolling window of call outcomes, a latency
+average, a circuit breaker and an adaptive concurrency limit. Calls go to the
+healthiest available model and fail over to the next one on error, so a
+provider outage degrades capacity instead of answering every conversation
+with the fallback.
+
+Breaker: after `min_calls` calls in the window with an error rate at or above
+the threshold, the model is skipped for `cooldown` seconds. Then a single
+probe call is let through (half-open): success closes the breaker, failure
+opens it again.
+
+Concurrency: each model's limit halves when the provider answers 429 (rate
+limited) and grows back by one per `limit` successes (AIMD), so the router
+backs off a throttling provider instead of hammering it.
+"""
+
+import logging
+import random
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from contextlib import asynccontextmanager
+from enum import Enum
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from core.metrics import LLM_CIRCUIT_TRIPS, LLM_FAILOVERS
+from services.llm.concurrency import LLMOverloadedError
+from services.llm.registry import model_name
+
+if TYPE_CHECKING:
+    from pydantic_ai.models import Model
+
+logger = logging.getLogger(__name__)
+
+# A configured model and its routing weight (None: ordered failover)
+type ModelChoice = tuple[Model | str, float | None]
+
+# Smallest health multiplier, so a degraded weighted model keeps a trickle
+_HEALTH_FLOOR = 0.01
+
+
+class LLMUnavailableError(Exception):
+    """Raised when every configured model's circuit breaker is open."""
+
+
+class BreakerState(str, Enum):
+    """Circuit breaker state."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether a provider error is a rate-limit (HTTP 429) response."""
+    from pydantic_ai.exceptions import ModelHTTPError
+
+    return isinstance(error, ModelHTTPError) and error.status_code == 429
+
+
+class ModelHealth:
+    """
+    Rolling health, breaker and concurrency limit for one model.
+
+    Args:
+        name: Model identifier, for logs and metrics
+        window: Number of recent call outcomes kept
+        error_threshold: Error rate that opens the breaker
+        min_calls: Calls in the window before the breaker may open
+        cooldown: Seconds the breaker stays open before a probe
+        max_concurrency: Upper bound of the adaptive concurrency limit
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int,
+        error_threshold: float,
+        min_calls: int,
+        cooldown: float,
+        max_concurrency: int,
+    ):
+        self.name = name
+        self.error_threshold = error_threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.max_concurrency = max_concurrency
+        self.breaker = BreakerState.CLOSED
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.latency = 0.0
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        """Fraction of failed calls in the window."""
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    @property
+    def saturated(self) -> bool:
+        """Whether the adaptive concurrency limit is reached."""
+        return self.in_flight >= int(self.limit)
+
+    def available(self, now: float) -> bool:
+        """Whether a call may be sent now."""
+        if self.saturated:
+            return False
+        if self.breaker is BreakerState.OPEN:
+            return now - self._opened_at >= self.cooldown
+        # Half-open: the single probe is already in flight
+        return self.breaker is BreakerState.CLOSED
+
+    def admit(self, now: float) -> bool:
+        """Start a call if available (an open breaker goes half-open)."""
+        if not self.available(now):
+            return False
+        if self.breaker is BreakerState.OPEN:
+            self.breaker = BreakerState.HALF_OPEN
+        self.in_flight += 1
+        return True
+
+    def record_success(self, seconds: float) -> None:
+        """Finish a call that succeeded."""
+        self.in_flight -= 1
+        self._outcomes.append(True)
+        self.latency = (
+            seconds if not self.latency else 0.8 * self.latency + 0.2 * seconds
+        )
+        self.limit = min(self.limit + 1 / self.limit, self.max_concurrency)
+        if self.breaker is BreakerState.HALF_OPEN:
+            self.breaker = BreakerState.CLOSED
+            self._outcomes.clear()
+            logger.warning("llm_circuit_closed", extra={"model": self.name})
+
+    def record_failure(self, error: Exception, now: float) -> None:
+        """Finish a call that failed, backing off on rate limits."""
+        self.in_flight -= 1
+        self._outcomes.append(False)
+        if is_rate_limited(error):
+            self.limit = max(self.limit / 2, 1.0)
+        if self.breaker is BreakerState.HALF_OPEN or (
+            len(self._outcomes) >= self.min_calls
+            and self.error_rate >= self.error_threshold
+        ):
+            self._open(now, error)
+
+    def record_cancelled(self) -> None:
+        """Finish a call abandoned by the caller (no outcome)."""
+        self.in_flight -= 1
+        if self.breaker is BreakerState.HALF_OPEN:
+            # The probe never finished; let the next call probe instead
+            self.breaker = BreakerState.OPEN
+
+    def _open(self, now: float, error: Exception) -> None:
+        if self.breaker is not BreakerState.OPEN:
+            LLM_CIRCUIT_TRIPS.inc(self.name)
+            logger.error(
+                "llm_circuit_opened",
+                extra={"model": self.name, "error": type(error).__name__},
+            )
+        self.breaker = BreakerState.OPEN
+        self._opened_at = now
+
+
+class ModelRouter:
+    """
+    Routes LLM calls to the healthiest available model.
+
+    Args:
+        window: Call outcomes kept per model
+        error_threshold: Error rate that opens a model's breaker
+        min_calls: Calls in the window before a breaker may open
+        cooldown: Seconds a breaker stays open before a probe
+        max_concurrency: Per-model upper bound of the adaptive limit
+        rng: Random source for weighted routing
+
+    Routing:
+        - Unweighted models are tried in configured order (failover)
+        - Weighted models are picked at random, each weight scaled down by
+          the model's error rate; failover then goes healthiest first
+
+    Safety reasoning:
+        - Health is per process and per model name; nothing about users or
+          messages is kept
+        - When no model can be called the caller fails fast into the safe
+          fallback instead of queueing behind a dead provider
+    """
+
+    def __init__(
+        self,
+        window: int,
+        error_threshold: float,
+        min_calls: int,
+        cooldown: float,
+        max_concurrency: int,
+        rng: random.Random | None = None,
+    ):
+        self.window = window
+        self.error_threshold = error_threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.max_concurrency = max_concurrency
+        self._rng = rng or random.Random()
+        self._health: dict[str, ModelHealth] = {}
+
+    def health(self, model: "Model | str") -> ModelHealth:
+        """Health record for a model, created on first use."""
+        name = model_name(model)
+        health = self._health.get(name)
+        if health is None:
+            health = self._health[name] = ModelHealth(
+                name,
+                window=self.window,
+                error_threshold=self.error_threshold,
+                min_calls=self.min_calls,
+                cooldown=self.cooldown,
+                max_concurrency=self.max_concurrency,
+            )
+        return health
+
+    def plan(self, choices: Sequence[ModelChoice]) -> "list[Model | str]":
+        """
+        Order the currently available models for one call.
+
+        Args:
+            choices: Configured models and weights
+
+        Returns:
+            Models to try, first choice first
+
+        Raises:
+            LLMOverloadedError: If every available model is at its limit
+            LLMUnavailableError: If every model's breaker is open
+        """
+        now = monotonic()
+        entries = [(model, weight, self.health(model)) for model, weight in choices]
+        available = [entry for entry in entries if entry[2].available(now)]
+        if not available:
+            if any(health.saturated for _, _, health in entries):
+                raise LLMOverloadedError("Every LLM model is at its concurrency limit")
+            raise LLMUnavailableError("Every LLM model's circuit breaker is open")
+
+        if all(weight is None for _, weight, _ in available):
+            return [model for model, _, _ in available]
+
+        by_health = sorted(available, key=lambda e: (e[2].error_rate, e[2].latency))
+        weights = [
+            (weight or 1.0) * max(1.0 - health.error_rate, _HEALTH_FLOOR)
+            for _, weight, health in available
+        ]
+        first = self._rng.choices(available, weights)[0]
+        return [first[0]] + [
+            model for model, _, _ in by_health if model is not first[0]
+        ]
+
+    @asynccontextmanager
+    async def _tracked(self, health: ModelHealth) -> AsyncIterator[None]:
+        """Record the outcome and latency of one admitted call."""
+        start = monotonic()
+        try:
+            yield
+        except Exception as e:
+            health.record_failure(e, monotonic())
+            raise
+        except BaseException:
+            health.record_cancelled()
+            raise
+        health.record_success(monotonic() - start)
+
+    async def call[T](
+        self,
+        choices: Sequence[ModelChoice],
+        run: "Callable[[Model | str], Awaitable[T]]",
+    ) -> T:
+        """
+        Run a call on the best model, failing over to the others on error.
+
+        Args:
+            choices: Configured models and weights
+            run: Makes the provider call on the given model
+
+        Returns:
+            The first successful result
+
+        Raises:
+            LLMOverloadedError: If no model had capacity
+            LLMUnavailableError: If every breaker is open
+            Exception: The last provider error, if every attempt failed
+        """
+        error: Exception | None = None
+        planned = self.plan(choices)
+        for index, model in enumerate(planned):
+            health = self.health(model)
+            # Earlier attempts took time: the model may have been claimed
+            if not health.admit(monotonic()):
+                continue
+            if error is not None:
+                LLM_FAILOVERS.inc(model_name(model))
+            try:
+                async with self._tracked(health):
+                    return await run(model)
+            except Exception as e:
+                logger.warning(
+                    "llm_call_failed",
+                    extra={"model": health.name, "error": type(e).__name__},
+                )
+                if index == len(planned) - 1:
+                    # Nothing left to fail over to
+                    raise
+                error = e
+        if error is None:
+            raise LLMOverloadedError("No LLM model could be admitted")
+        raise error
+
+    @asynccontextmanager
+    async def route(
+        self, choices: Sequence[ModelChoice]
+    ) -> "AsyncIterator[Model | str]":
+        """
+        Pick the best model for a call that cannot fail over (a stream).
+
+        Args:
+            choices: Configured models and weights
+
+        Yields:
+            The model to call; the block's outcome is recorded against it
+        """
+        for model in self.plan(choices):
+            health = self.health(model)
+            if health.admit(monotonic()):
+                async with self._tracked(health):
+                    yield model
+                return
+        raise LLMOverloadedError("No LLM model could be admitted")
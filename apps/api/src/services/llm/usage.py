@@ -0,0 +1,215 @@
+"""LLM token usage and the daily token budget.
+
+Every provider call reports its usage here: input tokens (and how many of
+them came from the prompt cache), output tokens, model and wall time. Usage
+is added to the process-wide counters at /metrics, to today's total against
+the daily budget, and to the usage of the message being answered.
+
+A message's usage covers every call made for it (a hedged message makes
+two). The endpoint opens a scope with `track_usage()`, and calls made
+inside it (including tasks started from it) add to that scope's record.
+
+The daily budget (LLM_DAILY_TOKEN_BUDGET) degrades in two steps:
+    - Below LLM_TOKEN_BUDGET_LOW of the budget left, history is cut to half
+      its token budget, so each message costs less
+    - With nothing left, messages get the safe fallback without a provider
+      call, until midnight UTC
+
+Counts are per worker process. The production server gives each worker an
+equal share of the budget (see `DailyTokenBudget.share`).
+
+Safety reasoning:
+    - An exhausted budget stops spend, never safety: banned-content and
+      crisis checks run before any of this, and crisis responses never
+      reach the LLM
+    - Users over budget get the same caring fallback as on a provider error
+    - Only counts and the model name are kept, never message content
+"""
+
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from core.config import settings
+from core.metrics import (
+    LLM_CACHED_INPUT_RATIO,
+    LLM_INPUT_TOKENS,
+    LLM_MODEL_TOKENS,
+    LLM_REQUEST_TOKENS,
+    LLM_TOKENS,
+    LLM_TOKENS_TODAY,
+)
+
+if TYPE_CHECKING:
+    from pydantic_ai.usage import RunUsage
+
+SECONDS_PER_DAY = 86400
+
+_CACHED_INPUT_RATIO = LLM_CACHED_INPUT_RATIO.labels()
+_REQUEST_INPUT_TOKENS = LLM_REQUEST_TOKENS.labels("input")
+_REQUEST_OUTPUT_TOKENS = LLM_REQUEST_TOKENS.labels("output")
+
+
+class TokenBudgetExhaustedError(RuntimeError):
+    """Raised instead of calling the LLM once today's token budget is spent."""
+
+
+class DailyTokenBudget:
+    """
+    Tokens used since midnight UTC against a daily limit.
+
+    Args:
+        limit: Tokens allowed per day (0: unlimited)
+        low_fraction: Fraction of the limit left below which the budget is low
+        clock: Wall clock, in seconds since the epoch
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        low_fraction: float,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.limit = limit
+        self.low_fraction = low_fraction
+        self._clock = clock
+        self._day = self._today()
+        self._used = 0
+
+    def _today(self) -> int:
+        return int(self._clock() // SECONDS_PER_DAY)
+
+    def _roll_over(self) -> None:
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used = 0
+            LLM_TOKENS_TODAY.set(0)
+
+    @property
+    def used(self) -> int:
+        """Tokens used today."""
+        self._roll_over()
+        return self._used
+
+    def add(self, tokens: int) -> None:
+        """Count tokens against today's budget."""
+        self._roll_over()
+        self._used += tokens
+        LLM_TOKENS_TODAY.set(self._used)
+
+    @property
+    def low(self) -> bool:
+        """Whether less than `low_fraction` of today's budget is left."""
+        return bool(self.limit) and self.used >= self.limit * (1 - self.low_fraction)
+
+    @property
+    def exhausted(self) -> bool:
+        return bool(self.limit) and self.used >= self.limit
+
+    def check(self) -> None:
+        """
+        Make sure an LLM call is allowed.
+
+        Raises:
+            TokenBudgetExhaustedError: If today's budget is spent
+        """
+        if self.exhausted:
+            raise TokenBudgetExhaustedError("Daily LLM token budget exhausted")
+
+    def share(self, workers: int) -> None:
+        """Split the deployment's budget evenly across worker processes."""
+        if self.limit:
+            self.limit = max(self.limit // workers, 1)
+
+
+@dataclass(slots=True)
+class UsageRecord:
+    """LLM usage of one message, summed over its provider calls."""
+
+    model: str | None = None
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    seconds: float = 0.0
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: wall time spent in LLM calls."""
+        return f'llm;dur={self.seconds * 1000:.1f};desc="{self.calls} calls"'
+
+    def header(self) -> str:
+        """Usage header value, as comma-separated key=value pairs."""
+        return (
+            f"model={self.model or 'none'}, input={self.input_tokens}, "
+            f"output={self.output_tokens}, cache_read={self.cache_read_tokens}, "
+            f"cache_write={self.cache_write_tokens}"
+        )
+
+
+_request_usage: ContextVar[UsageRecord | None] = ContextVar("llm_usage", default=None)
+
+
+@contextmanager
+def track_usage() -> Iterator[UsageRecord]:
+    """Collect the usage of every LLM call made inside the block."""
+    record = UsageRecord()
+    token = _request_usage.set(record)
+    try:
+        yield record
+    finally:
+        _request_usage.reset(token)
+
+
+def record_usage(usage: "RunUsage", model: str, seconds: float) -> None:
+    """
+    Account one provider call's usage.
+
+    Args:
+        usage: Usage reported by pydantic-ai for the run
+        model: Model identifier, for the per-model counter
+        seconds: Wall time of the call
+    """
+    input_tokens = usage.input_tokens
+    output_tokens = usage.output_tokens
+    read = usage.cache_read_tokens
+    write = usage.cache_write_tokens
+
+    LLM_TOKENS.inc("input", input_tokens)
+    LLM_TOKENS.inc("output", output_tokens)
+    LLM_MODEL_TOKENS.inc(model, input_tokens + output_tokens)
+    _REQUEST_INPUT_TOKENS.observe(input_tokens)
+    _REQUEST_OUTPUT_TOKENS.observe(output_tokens)
+    token_budget.add(input_tokens + output_tokens)
+    if input_tokens:
+        LLM_INPUT_TOKENS.inc("read", read)
+        LLM_INPUT_TOKENS.inc("write", write)
+        LLM_INPUT_TOKENS.inc("uncached", max(input_tokens - read - write, 0))
+        _CACHED_INPUT_RATIO.observe(min(read / input_tokens, 1.0))
+
+    record = _request_usage.get()
+    if record is not None:
+        record.model = model
+        record.calls += 1
+        record.input_tokens += input_tokens
+        record.output_tokens += output_tokens
+        record.cache_read_tokens += read
+        record.cache_write_tokens += write
+        record.seconds += seconds
+
+
+def history_token_budget() -> int:
+    """History token budget for the next message: halved when tokens run low."""
+    if token_budget.low:
+        return settings.history_token_budget // 2
+    return settings.history_token_budget
+
+
+# Process-wide daily budget (this worker's share, under the production server)
+token_budget = DailyTokenBudget(
+    settings.llm_daily_token_budget, settings.llm_token_budget_low
+)
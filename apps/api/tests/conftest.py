@@ -0,0 +1,9 @@
+"""Shared test configuration.
+
+Every test client shares one address, so per-client rate limits are off
+unless a test turns them on.
+"""
+
+import os
+
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
@@ -0,0 +1,59 @@
+"""Integration tests for cold start time."""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.startup import SRC, time_to_first_health
+
+# Seconds from launching uvicorn to the first /health response
+COLD_START_BUDGET = float(os.environ.get("COLD_START_BUDGET", "3.0"))
+
+LLM_PACKAGES = ("pydantic_ai", "openai", "anthropic", "httpx")
+
+
+class TestColdStart:
+    """The app answers health checks without waiting for the LLM stack."""
+
+    def test_llm_stack_not_imported_at_startup(self):
+        """Importing the app loads neither pydantic-ai nor a provider SDK."""
+        code = "import json, sys, main; print(json.dumps(list(sys.modules)))"
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            env=os.environ | {"PYTHONPATH": str(SRC)},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        loaded = {name.split(".")[0] for name in json.loads(result.stdout)}
+        assert loaded.isdisjoint(LLM_PACKAGES)
+
+    @pytest.mark.skipif(
+        COLD_START_BUDGET <= 0, reason="COLD_START_BUDGET=0 turns the check off"
+    )
+    def test_first_health_within_budget(self):
+        """A fresh server answers /health within the cold start budget."""
+        elapsed = time_to_first_health()
+
+        assert elapsed < COLD_START_BUDGET, f"{elapsed:.2f}s to first /health"
+
+    def test_slow_warm_up_does_not_hold_up_startup(self, monkeypatch):
+        """With LLM_WARMUP, a provider that never answers delays nothing."""
+        started = asyncio.Event()
+
+        async def hang(model):
+            started.set()
+            await asyncio.sleep(3600)
+
+        monkeypatch.setattr(main.settings, "llm_warmup", True)
+        monkeypatch.setattr(main.llm_registry, "warm_up", hang)
+        with TestClient(main.app) as client:
+            assert client.get("/api/v1/health").status_code == 200
+            client.portal.call(started.wait)
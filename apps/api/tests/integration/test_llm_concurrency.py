@@ -0,0 +1,91 @@
+"""Load test for the async LLM generation path.
+
+A slow fake model keeps 200 generations in flight while /health and crisis
+responses are measured. Neither may wait on the LLM.
+"""
+
+import asyncio
+import statistics
+import time
+from unittest.mock import patch
+
+import httpx
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from main import app
+from services.llm.generation import llm_limiter
+
+IN_FLIGHT = 200
+LLM_DELAY = 2.0
+FAKE_REPLY = "I hear that. What feels heaviest right now?"
+
+
+def slow_model(delay: float) -> FunctionModel:
+    """Fake model that takes `delay` seconds per completion."""
+
+    async def respond(messages, info):
+        await asyncio.sleep(delay)
+        return ModelResponse(parts=[TextPart(FAKE_REPLY)])
+
+    return FunctionModel(respond)
+
+
+async def timed_get(client: httpx.AsyncClient, url: str) -> float:
+    start = time.perf_counter()
+    response = await client.get(url)
+    assert response.status_code == 200
+    return time.perf_counter() - start
+
+
+class TestLLMConcurrency:
+    """The event loop stays responsive while slow LLM calls are in flight."""
+
+    @patch("services.llm.factory.get_llm_model")
+    def test_health_latency_flat_under_slow_llm_load(self, mock_model):
+        mock_model.return_value = slow_model(LLM_DELAY)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                idle = [await timed_get(client, "/api/v1/health") for _ in range(20)]
+
+                posts = [
+                    asyncio.create_task(
+                        client.post(
+                            "/api/v1/message",
+                            json={"content": f"I feel tired {i}"},
+                        )
+                    )
+                    for i in range(IN_FLIGHT)
+                ]
+                while llm_limiter.in_flight < IN_FLIGHT:
+                    await asyncio.sleep(0.01)
+
+                loaded = [await timed_get(client, "/api/v1/health") for _ in range(20)]
+
+                crisis_start = time.perf_counter()
+                crisis = await client.post(
+                    "/api/v1/message",
+                    json={"content": "I want to kill myself"},
+                )
+                crisis_latency = time.perf_counter() - crisis_start
+
+                # Everything above must have happened while all calls were pending
+                assert llm_limiter.in_flight == IN_FLIGHT
+
+                responses = await asyncio.gather(*posts)
+            return idle, loaded, crisis, crisis_latency, responses
+
+        idle, loaded, crisis, crisis_latency, responses = asyncio.run(scenario())
+
+        assert crisis.json()["type"] == "crisis"
+        assert crisis_latency < 0.25
+        assert statistics.median(loaded) < statistics.median(idle) + 0.05
+        assert max(loaded) < 0.25
+
+        assert all(r.status_code == 200 for r in responses)
+        assert all(r.json()["content"] == FAKE_REPLY for r in responses)
+        assert llm_limiter.in_flight == 0
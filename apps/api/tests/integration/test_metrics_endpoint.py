@@ -0,0 +1,91 @@
+"""Integration tests for the /metrics endpoint."""
+
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from main import app
+
+client = TestClient(app)
+
+
+def scrape() -> dict[str, float]:
+    """Fetch /metrics as {series: value}, skipping comments."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            samples[series] = float(value)
+    return samples
+
+
+def post(content: str):
+    return client.post("/api/v1/message", json={"content": content})
+
+
+class TestMetricsEndpoint:
+    """Pipeline stages and safety outcomes are visible at /metrics."""
+
+    @patch("services.llm.factory.get_llm_model")
+    def test_every_stage_timed_for_normal_message(self, mock_model):
+        """A normal message records one observation per pipeline stage."""
+        mock_model.return_value = FunctionModel(
+            lambda messages, info: ModelResponse(parts=[TextPart("I'm here.")])
+        )
+        before = scrape()
+        post("I had a long day")
+        after = scrape()
+
+        for stage in (
+            "banned_check",
+            "crisis_detection",
+            "prompt_assembly",
+            "llm_call",
+            "guardrails",
+            "length_check",
+        ):
+            key = f'unconditional_stage_duration_seconds_count{{stage="{stage}"}}'
+            assert after[key] - before.get(key, 0) == 1, stage
+
+    def test_crisis_counted_by_severity(self):
+        """Crisis detections are counted, and the LLM stage is not reached."""
+        llm_key = 'unconditional_stage_duration_seconds_count{stage="llm_call"}'
+        crisis_key = 'unconditional_crisis_detections_total{severity="critical"}'
+        before = scrape()
+        post("I'm going to kill myself tonight")
+        after = scrape()
+
+        assert after[crisis_key] - before[crisis_key] == 1
+        assert after.get(llm_key, 0) == before.get(llm_key, 0)
+
+    @patch("services.llm.factory.get_llm_model")
+    def test_guardrail_and_fallback_counted(self, mock_model):
+        """Guardrail blocks are counted by pattern, LLM errors by reason."""
+        guardrail_key = (
+            r'unconditional_guardrail_blocks_total{pattern="\\byou\\s+should\\b"}'
+        )
+        fallback_key = 'unconditional_llm_fallbacks_total{reason="error"}'
+
+        def failing(messages, info):
+            raise RuntimeError("provider down")
+
+        before = scrape()
+        mock_model.return_value = FunctionModel(
+            lambda messages, info: ModelResponse(parts=[TextPart("You should rest.")])
+        )
+        post("I feel tired")
+        mock_model.return_value = FunctionModel(failing)
+        post("I feel tired")
+        after = scrape()
+
+        assert after[guardrail_key] - before.get(guardrail_key, 0) == 1
+        assert after[fallback_key] - before[fallback_key] == 1
+
+    def test_in_flight_counts_scrape_itself(self):
+        """The scrape request is in flight while metrics are rendered."""
+        assert scrape()["unconditional_requests_in_flight"] == 1
@@ -0,0 +1,128 @@
+"""Integration tests for rate limiting and LLM admission control."""
+
+import itertools
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from core.config import settings
+from core.metrics import RATE_LIMITED
+from core.rate_limit import rate_limiter
+from main import app
+from services.llm.generation import llm_limiter
+
+client = TestClient(app)
+
+REPLY = FunctionModel(
+    lambda messages, info: ModelResponse(parts=[TextPart("I'm listening.")])
+)
+
+
+def limits(burst: float):
+    """Turn rate limits on with a small bucket and a slow refill."""
+    return patch.multiple(rate_limiter, enabled=True, burst=burst, rate=0.01)
+
+
+_addresses = (
+    f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}" for n in itertools.count(1)
+)
+
+
+def new_client() -> TestClient:
+    """A client at an address nobody has charged yet."""
+    return TestClient(app, client=(next(_addresses), 50000))
+
+
+def post(content: str, sender: TestClient):
+    return sender.post("/api/v1/message", json={"content": content})
+
+
+class TestRateLimit:
+    """Per-client limits and the global LLM cap return 429."""
+
+    @patch("services.llm.factory.get_llm_model", return_value=REPLY)
+    def test_llm_messages_limited_with_retry_after(self, mock_model):
+        """LLM messages pay base plus LLM cost; over the limit is a 429."""
+        sender = new_client()
+        cost = settings.rate_limit_base_cost + settings.rate_limit_llm_cost
+        with limits(burst=2 * cost):
+            assert post("I had a long day", sender).status_code == 200
+            assert post("I had a long day", sender).status_code == 200
+            response = post("I had a long day", sender)
+
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+
+    def test_short_circuits_charged_base_cost_only(self):
+        """Banned messages pay only the cheap base cost."""
+        sender = new_client()
+        with limits(burst=settings.rate_limit_llm_cost):
+            for _ in range(int(settings.rate_limit_llm_cost)):
+                assert post("stupid bot", sender).status_code == 400
+
+            response = post("stupid bot", sender)
+
+        assert response.status_code == 429
+
+    def test_crisis_never_limited(self):
+        """A client over its limit still gets every crisis response."""
+        sender = new_client()
+        with limits(burst=settings.rate_limit_base_cost):
+            assert post("stupid bot", sender).status_code == 400
+            assert post("Hi", sender).status_code == 429
+            responses = [post("I want to kill myself", sender) for _ in range(45)]
+            stream = sender.post(
+                "/api/v1/message/stream", json={"content": "I want to kill myself"}
+            )
+            with sender.websocket_connect("/api/v1/ws") as ws:
+                ws.send_json({"content": "I want to kill myself"})
+                frame = ws.receive_json()
+
+        assert {response.status_code for response in responses} == {200}
+        assert {response.json()["type"] for response in responses} == {"crisis"}
+        assert stream.status_code == 200
+        assert "event: crisis" in stream.text
+        assert frame["type"] == "crisis"
+
+    def test_other_clients_unaffected(self):
+        """One client's exhausted bucket does not limit another."""
+        noisy = new_client()
+        with limits(burst=1):
+            post("stupid bot", noisy)
+            assert post("stupid bot", noisy).status_code == 429
+            assert post("stupid bot", new_client()).status_code == 400
+
+    def test_unmetered_paths_not_limited(self):
+        """Opening and health are never rate limited."""
+        sender = new_client()
+        with limits(burst=0):
+            assert sender.get("/api/v1/opening").status_code == 200
+            assert sender.get("/api/v1/health").status_code == 200
+            assert post("Hi", sender).status_code == 429
+
+    def test_global_llm_cap_rejects_before_charging(self):
+        """With every LLM slot and queue place taken, messages get a 429."""
+        rejected = RATE_LIMITED.value("global")
+        with patch.multiple(llm_limiter, max_in_flight=0, max_waiting=0):
+            response = post("I had a long day", new_client())
+            crisis = post("I want to kill myself", new_client())
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "5"
+        assert RATE_LIMITED.value("global") - rejected == 1
+        assert crisis.json()["type"] == "crisis"
+
+    def test_websocket_message_limited(self):
+        """Over the limit, a WebSocket message gets an error frame."""
+        sender = new_client()
+        with (
+            limits(burst=settings.rate_limit_base_cost * 2),
+            sender.websocket_connect("/api/v1/ws") as ws,
+        ):
+            ws.send_json({"content": "I had a long day"})
+            frame = ws.receive_json()
+
+        assert frame["type"] == "error"
+        assert "Try again" in frame["detail"]
@@ -0,0 +1,97 @@
+"""Integration tests for the preforked production server."""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from benchmarks.startup import SRC, free_port
+from server import worker_count
+
+# App with a slow endpoint standing in for a long generation
+SERVER_SCRIPT = """
+import asyncio, os, sys
+from fastapi import FastAPI
+import server
+
+app = FastAPI()
+
+@app.get("/slow")
+async def slow() -> dict[str, int]:
+    await asyncio.sleep(1.5)
+    return {"pid": os.getpid()}
+
+@app.get("/pid")
+async def pid() -> dict[str, int]:
+    return {"pid": os.getpid()}
+
+server.serve(app, "127.0.0.1", int(sys.argv[1]), workers=2, grace_period=10)
+"""
+
+
+def get(url: str, timeout: float = 10) -> int:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.status
+
+
+@pytest.fixture
+def running_server():
+    """Start the server with two workers; yield (process, base url)."""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER_SCRIPT, str(port)],
+        env=os.environ | {"PYTHONPATH": str(SRC), "LOG_LEVEL": "error"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(300):
+            try:
+                get(f"{base}/pid", timeout=1)
+                break
+            except OSError:
+                time.sleep(0.05)
+        yield process, base
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+
+class TestWorkerCount:
+    """Tests for sizing the worker pool."""
+
+    def test_configured_count_wins(self):
+        """An explicit WEB_CONCURRENCY is used as is."""
+        assert worker_count(3) == 3
+
+    def test_defaults_to_available_cpus(self):
+        """Unset, there is one worker per CPU this process may use."""
+        assert worker_count(0) == len(os.sched_getaffinity(0))
+
+
+class TestGracefulDrain:
+    """SIGTERM lets in-flight requests finish before workers exit."""
+
+    def test_in_flight_request_finishes(self, running_server):
+        """A request started before SIGTERM completes; then the server exits."""
+        process, base = running_server
+        statuses: list[int] = []
+        request = threading.Thread(target=lambda: statuses.append(get(f"{base}/slow")))
+        request.start()
+        time.sleep(0.5)
+
+        process.send_signal(signal.SIGTERM)
+        request.join()
+
+        assert statuses == [200]
+        assert process.wait(timeout=15) == 0
+        with pytest.raises(urllib.error.URLError):
+            get(f"{base}/pid", timeout=1)
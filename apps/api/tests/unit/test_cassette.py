@@ -0,0 +1,148 @@
+"""Unit tests for LLM record/replay cassettes."""
+
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from prompts.history import build_message_history
+from services.llm import generation
+from services.llm.cassette import (
+    Cassette,
+    CassetteMissError,
+    CassetteMode,
+    cassette_key,
+)
+
+MODEL = "test:recorded"
+REPLY = "That sounds like a lot to carry. I'm here."
+
+
+def live_model(calls: list[str]) -> FunctionModel:
+    """Fake provider that counts calls and streams REPLY in pieces."""
+
+    def respond(messages, info):
+        calls.append("run")
+        return ModelResponse(parts=[TextPart(content=REPLY)])
+
+    async def stream(messages, info):
+        calls.append("stream")
+        for word in REPLY.split(" "):
+            yield word + " "
+
+    return FunctionModel(respond, stream_function=stream, model_name=MODEL)
+
+
+def generate(cassette: Cassette, model) -> str:
+    with (
+        patch.object(generation, "llm_cassette", cassette),
+        patch("services.llm.factory.get_llm_models", return_value=[(model, None)]),
+    ):
+        return asyncio.run(generation.generate_response("hello", "Be present."))
+
+
+def stream(cassette: Cassette, model, cancel_after: int | None = None) -> list[str]:
+    async def consume() -> list[str]:
+        deltas = []
+        async with generation.stream_response("hello", "Be present.") as response:
+            async for delta in response:
+                deltas.append(delta)
+                if len(deltas) == cancel_after:
+                    response.cancel()
+                    break
+        return deltas
+
+    with (
+        patch.object(generation, "llm_cassette", cassette),
+        patch("services.llm.factory.get_llm_models", return_value=[(model, None)]),
+    ):
+        return asyncio.run(consume())
+
+
+class TestRecordReplay:
+    """Tests for recording live calls and replaying them offline."""
+
+    def test_replay_serves_recorded_output(self, tmp_path):
+        """A recorded call replays without touching the provider."""
+        path = tmp_path / "cassette.jsonl"
+        calls: list[str] = []
+        recorded = generate(Cassette(path, CassetteMode.RECORD), live_model(calls))
+
+        # Only the model name is needed to replay: no agent, no provider
+        replayed = generate(Cassette(path, CassetteMode.REPLAY), MODEL)
+
+        assert recorded == replayed == REPLY
+        assert calls == ["run"]
+
+    def test_replay_miss_raises(self, tmp_path):
+        """An unrecorded call fails instead of inventing a reply."""
+        cassette = Cassette(tmp_path / "empty.jsonl", CassetteMode.REPLAY)
+
+        with pytest.raises(CassetteMissError):
+            generate(cassette, MODEL)
+
+    def test_stream_replays_recorded_deltas(self, tmp_path):
+        """Streams replay the recorded deltas, and plain runs their text."""
+        path = tmp_path / "cassette.jsonl"
+        calls: list[str] = []
+        recorded = stream(Cassette(path, CassetteMode.RECORD), live_model(calls))
+
+        replay = Cassette(path, CassetteMode.REPLAY)
+
+        assert stream(replay, MODEL) == recorded
+        assert generate(replay, MODEL) == "".join(recorded)
+        assert calls == ["stream"]
+
+    def test_cancelled_stream_not_recorded(self, tmp_path):
+        """A stream stopped part way is not a complete reply to record."""
+        path = tmp_path / "cassette.jsonl"
+        cassette = Cassette(path, CassetteMode.RECORD)
+
+        stream(cassette, live_model([]), cancel_after=2)
+
+        assert len(cassette) == 0
+        assert not path.exists()
+
+    def test_replay_latency(self, tmp_path):
+        """With replay latency on, replies take the recorded time."""
+        path = tmp_path / "cassette.jsonl"
+        key = cassette_key(
+            MODEL, "Be present.", "hello", None, dict(generation.MODEL_SETTINGS)
+        )
+        entry = {"key": key, "model": MODEL, "deltas": ["hi"], "first": 0.2}
+        path.write_text(json.dumps(entry | {"latency": 0.2}) + "\n")
+
+        start = time.monotonic()
+        generate(Cassette(path, CassetteMode.REPLAY, replay_latency=True), MODEL)
+
+        assert time.monotonic() - start >= 0.2
+
+
+class TestCassetteKey:
+    """Tests for request hashing."""
+
+    def key(self, history, text="hello", instructions="Be present."):
+        return cassette_key(MODEL, instructions, text, history, {"temperature": 0.7})
+
+    def test_ignores_history_timestamps(self):
+        """Histories rebuilt at different times hash the same."""
+        turns = [
+            {"role": "user", "content": "hi"},
+            {"role": "assistant", "content": "I'm here."},
+        ]
+        first = build_message_history(turns, "hello", 2000)
+        time.sleep(0.01)
+
+        assert self.key(first) == self.key(build_message_history(turns, "hello", 2000))
+
+    def test_depends_on_request(self):
+        """Message, history and instructions all change the key."""
+        history = build_message_history([{"role": "user", "content": "hi"}], "", 2000)
+
+        assert self.key(None) != self.key(history)
+        assert self.key(None) != self.key(None, text="hello again")
+        assert self.key(None) != self.key(None, instructions="Listen.")
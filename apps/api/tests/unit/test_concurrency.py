@@ -0,0 +1,91 @@
+"""Unit tests for the LLM concurrency limiter."""
+
+import asyncio
+
+import pytest
+
+from services.llm.concurrency import ConcurrencyLimiter, LLMOverloadedError
+
+
+class TestConcurrencyLimiter:
+    """Tests for bounded in-flight LLM calls."""
+
+    def test_admits_up_to_limit(self):
+        """Callers within the limit are admitted immediately."""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter(max_in_flight=2, max_waiting=0, wait_timeout=1)
+            await limiter.acquire()
+            await limiter.acquire()
+            assert limiter.in_flight == 2
+            limiter.release()
+            limiter.release()
+            assert limiter.in_flight == 0
+
+        asyncio.run(scenario())
+
+    def test_queue_full_rejects(self):
+        """Callers beyond the wait queue are rejected immediately."""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter(max_in_flight=1, max_waiting=0, wait_timeout=1)
+            await limiter.acquire()
+            with pytest.raises(LLMOverloadedError):
+                await limiter.acquire()
+
+        asyncio.run(scenario())
+
+    def test_wait_timeout_rejects(self):
+        """Queued callers give up after the wait timeout."""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter(
+                max_in_flight=1, max_waiting=1, wait_timeout=0.01
+            )
+            await limiter.acquire()
+            with pytest.raises(LLMOverloadedError):
+                await limiter.acquire()
+            assert limiter.waiting == 0
+            assert limiter.in_flight == 1
+
+        asyncio.run(scenario())
+
+    def test_release_hands_slot_to_waiter_in_order(self):
+        """Released slots go to queued callers in FIFO order."""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter(max_in_flight=1, max_waiting=2, wait_timeout=1)
+            order = []
+
+            async def worker(name):
+                async with limiter:
+                    order.append(name)
+                    await asyncio.sleep(0)
+
+            await limiter.acquire()
+            tasks = [asyncio.create_task(worker(n)) for n in ("a", "b")]
+            await asyncio.sleep(0)
+            assert limiter.waiting == 2
+            limiter.release()
+            await asyncio.gather(*tasks)
+            assert order == ["a", "b"]
+            assert limiter.in_flight == 0
+
+        asyncio.run(scenario())
+
+    def test_cancelled_waiter_leaves_queue(self):
+        """A cancelled waiter does not leak its queue position or a slot."""
+
+        async def scenario():
+            limiter = ConcurrencyLimiter(max_in_flight=1, max_waiting=1, wait_timeout=1)
+            await limiter.acquire()
+            task = asyncio.create_task(limiter.acquire())
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert limiter.waiting == 0
+            limiter.release()
+            assert limiter.in_flight == 0
+
+        asyncio.run(scenario())
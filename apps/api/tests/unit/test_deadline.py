@@ -0,0 +1,64 @@
+"""Unit tests for request deadlines."""
+
+import asyncio
+import time
+
+import pytest
+
+from core.deadline import Deadline, DeadlineExceededError
+
+
+class TestDeadline:
+    """Tests for the per-request deadline."""
+
+    def test_remaining_keeps_reserve(self):
+        """The reserve is held back, and remaining never goes negative."""
+        deadline = Deadline.after(10)
+
+        assert 9.4 < deadline.remaining(reserve=0.5) <= 9.5
+        assert Deadline.after(0.1).remaining(reserve=1) == 0.0
+        assert Deadline.after(-1).expired
+
+    def test_enforce_cancels_at_deadline(self):
+        """Work running past the deadline is cancelled."""
+        cancelled = []
+
+        async def hang():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def scenario():
+            async with Deadline.after(0.05).enforce():
+                await hang()
+
+        start = time.perf_counter()
+        with pytest.raises(DeadlineExceededError):
+            asyncio.run(scenario())
+
+        assert time.perf_counter() - start < 1
+        assert cancelled == [True]
+
+    def test_other_timeouts_not_mistaken_for_deadline(self):
+        """A timeout raised by the work itself passes through unchanged."""
+
+        async def scenario():
+            async with Deadline.after(10).enforce():
+                raise TimeoutError("provider read timeout")
+
+        with pytest.raises(TimeoutError) as info:
+            asyncio.run(scenario())
+        assert not isinstance(info.value, DeadlineExceededError)
+
+    def test_wait_bounds_one_step(self):
+        """wait() applies the deadline to a single awaitable."""
+
+        async def scenario():
+            deadline = Deadline.after(0.05)
+            assert await deadline.wait(asyncio.sleep(0, "first")) == "first"
+            await deadline.wait(asyncio.sleep(10))
+
+        with pytest.raises(DeadlineExceededError):
+            asyncio.run(scenario())
@@ -3,7 +3,15 @@
 100% coverage required. Vulnerable humans depend on it.
 """
 
-from safety.guardrails import apply_guardrails, check_length
+from safety.guardrails import (
+    StreamingGuardrail,
+    _lower_same_length,
+    apply_guardrails,
+    check_length,
+)
+from safety.pattern_packs import pattern_packs
+
+GUARDRAIL_HOLDBACK = pattern_packs.active.guardrail_holdback
 
 
 class TestGuardrails:
@@ -92,6 +100,29 @@ class TestGuardrails:
         assert len(result) <= 100
         assert result.endswith("...")
 
+    def test_check_length_cuts_at_sentence(self):
+        """Truncation keeps whole sentences when they fill most of the limit."""
+        response = "I hear you. That sounds heavy. " * 10
+        result = check_length(response, max_length=100)
+        assert result == ("I hear you. That sounds heavy. " * 3).rstrip()
+
+    def test_check_length_truncated_ends_on_sentence(self):
+        """A reply cut off by the token limit is cut back even when short."""
+        response = "I hear you. That sounds heavy. And I wonder whether"
+        result = check_length(response, truncated=True)
+        assert result == "I hear you. That sounds heavy."
+
+    def test_check_length_truncated_finished_sentence_kept(self):
+        """A cut-off reply that happens to end a sentence keeps it."""
+        response = "I hear you. That sounds heavy."
+        assert check_length(response, truncated=True) == response
+
+    def test_check_length_sentence_end_with_closing_quote(self):
+        """Closing quotes stay with the sentence they end."""
+        response = 'You said "it is too much." ' + "and then " * 20
+        result = check_length(response, max_length=50)
+        assert result == 'You said "it is too much."'
+
     def test_case_insensitive(self):
         """Guardrail matching is case-insensitive."""
         response1 = "YOU SHOULD see a therapist"
@@ -102,3 +133,86 @@ class TestGuardrails:
 
         assert result1 != response1
         assert result2 != response2
+
+
+def feed_all(guardrail: StreamingGuardrail, chunks: list[str]) -> str:
+    """Feed chunks until blocked, returning everything released."""
+    released = ""
+    for chunk in chunks:
+        released += guardrail.feed(chunk)
+        if guardrail.blocked:
+            return released
+    return released + guardrail.finish()
+
+
+class TestStreamingGuardrail:
+    """Tests for incremental guardrail enforcement on streamed output."""
+
+    def test_safe_stream_released_in_full(self):
+        """A safe response is released unchanged across chunks."""
+        text = (
+            "I hear that you're feeling overwhelmed. "
+            "What's making this moment particularly difficult?"
+        )
+        chunks = [text[i : i + 7] for i in range(0, len(text), 7)]
+        guardrail = StreamingGuardrail()
+        assert feed_all(guardrail, chunks) == text
+        assert guardrail.blocked is False
+
+    def test_phrase_split_across_chunks_blocked(self):
+        """A banned phrase spanning chunk boundaries is caught."""
+        guardrail = StreamingGuardrail()
+        released = feed_all(
+            guardrail, ["That sounds hard. You sh", "ould ", "rest now, ok?"]
+        )
+        assert guardrail.blocked is True
+        assert guardrail.violation == r"\byou\s+should\b"
+        assert "should" not in released.lower()
+
+    def test_phrase_never_released_before_detection(self):
+        """No part of a banned phrase is shown, one character at a time."""
+        text = "It sounds heavy. Everything happens for a reason, right?"
+        guardrail = StreamingGuardrail()
+        released = feed_all(guardrail, list(text))
+        assert guardrail.blocked is True
+        assert "everything" not in released.lower()
+
+    def test_boundary_match_waits_for_next_character(self):
+        """A match at the end of the buffer is not confirmed prematurely."""
+        guardrail = StreamingGuardrail()
+        guardrail.feed("Maybe it was meant to be")
+        assert guardrail.blocked is False
+        guardrail.feed("tter understood")
+        assert guardrail.finish().endswith("understood")
+        assert guardrail.blocked is False
+
+    def test_match_confirmed_at_end_of_stream(self):
+        """A phrase that ends the response is caught by finish()."""
+        guardrail = StreamingGuardrail()
+        released = feed_all(guardrail, ["Maybe it was ", "meant to be"])
+        assert guardrail.blocked is True
+        assert "meant" not in released
+
+    def test_runs_of_whitespace_held_back(self):
+        """A phrase spread out by extra whitespace is not partly shown."""
+        phrase = "Everything    happens    for    a    reason."
+        guardrail = StreamingGuardrail()
+        released = feed_all(guardrail, list("I think that " + phrase))
+        assert guardrail.blocked is True
+        assert "Everything" not in released
+
+    def test_lowercasing_keeps_positions(self):
+        """Characters that lowercase to two do not shift match positions."""
+        guardrail = StreamingGuardrail()
+        released = feed_all(guardrail, ["İİİİ İstanbul was lovely. ", "You should go"])
+        assert guardrail.blocked is True
+        assert "You" not in released
+        assert len(_lower_same_length("İstanbul")) == len("İstanbul")
+
+    def test_holdback_covers_longest_phrase(self):
+        """Holdback is the longest banned phrase, not the whole response."""
+        phrase = "everything happens for a reason".replace(" ", " " * 8)
+        assert len(phrase) == GUARDRAIL_HOLDBACK
+        guardrail = StreamingGuardrail()
+        released = guardrail.feed("a" * (GUARDRAIL_HOLDBACK + 5))
+        assert released == "a" * 5
@@ -0,0 +1,171 @@
+"""Unit tests for hedged LLM requests."""
+
+import asyncio
+
+import pytest
+
+from core.metrics import LLM_HEDGES
+from services.llm.hedging import HedgeBudget, Hedger, LatencyWindow
+
+
+def call(result: str, delay: float, log: list[str] | None = None):
+    """Fake LLM call returning `result` after `delay` seconds."""
+
+    async def run() -> str:
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f"cancelled {result}")
+            raise
+        return result
+
+    return run
+
+
+def failing(delay: float):
+    async def run() -> str:
+        await asyncio.sleep(delay)
+        raise RuntimeError("provider down")
+
+    return run
+
+
+def accept_all(result: str) -> bool:
+    return True
+
+
+def make_hedger(delay: float = 0.02, budget: float = 1.0) -> Hedger:
+    return Hedger(percentile=95, initial_delay=delay, budget_ratio=budget)
+
+
+class TestLatencyWindow:
+    """Tests for the hedge delay percentile."""
+
+    def test_nearest_rank_percentile(self):
+        """Percentiles come from the recorded latencies."""
+        window = LatencyWindow(refresh_every=1)
+        for ms in range(1, 101):
+            window.observe(ms / 1000)
+
+        assert window.percentile(95) == 0.095
+        assert window.percentile(50) == 0.05
+
+    def test_window_keeps_recent_latencies(self):
+        """Old latencies fall out of the window."""
+        window = LatencyWindow(size=10, refresh_every=1)
+        for _ in range(10):
+            window.observe(5.0)
+        for _ in range(10):
+            window.observe(0.1)
+
+        assert window.percentile(99) == 0.1
+
+    def test_initial_delay_until_enough_samples(self):
+        """The configured delay is used until the window has filled."""
+        hedger = make_hedger(delay=2.0)
+        for _ in range(hedger.min_samples - 1):
+            hedger.latencies.observe(0.1)
+        assert hedger.delay() == 2.0
+
+        hedger.latencies.observe(0.1)
+        assert hedger.delay() == 0.1
+
+
+class TestHedgeBudget:
+    """Tests for the hedge budget."""
+
+    def test_hedges_capped_to_ratio_of_requests(self):
+        """At 5%, 100 requests earn at most 5 hedges."""
+        budget = HedgeBudget(ratio=0.05)
+        hedges = 0
+        for _ in range(100):
+            budget.earn()
+            hedges += budget.try_spend()
+
+        assert hedges == 5
+
+    def test_savings_capped_by_burst(self):
+        """A long quiet spell cannot bank an unbounded hedge storm."""
+        budget = HedgeBudget(ratio=0.5, burst=3)
+        for _ in range(100):
+            budget.earn()
+
+        assert [budget.try_spend() for _ in range(4)] == [True, True, True, False]
+
+
+class TestHedger:
+    """Tests for running hedged calls."""
+
+    def test_fast_call_not_hedged(self):
+        """A call finishing within the delay never fires a hedge."""
+        hedged = []
+
+        async def hedge():
+            hedged.append(True)
+            return "hedge"
+
+        result = asyncio.run(make_hedger().run(call("primary", 0), hedge, accept_all))
+
+        assert result == "primary"
+        assert hedged == []
+
+    def test_slow_call_hedged_and_cancelled(self):
+        """A slow call is hedged; the faster hedge wins, the loser is cancelled."""
+        log: list[str] = []
+        won = LLM_HEDGES.value("won")
+
+        async def scenario():
+            result = await make_hedger().run(
+                call("primary", 5, log), call("hedge", 0.01, log), accept_all
+            )
+            await asyncio.sleep(0)
+            return result
+
+        assert asyncio.run(scenario()) == "hedge"
+        assert log == ["cancelled primary"]
+        assert LLM_HEDGES.value("won") - won == 1
+
+    def test_rejected_result_does_not_win(self):
+        """A result failing `accept` loses to a slower accepted one."""
+        lost = LLM_HEDGES.value("lost")
+        result = asyncio.run(
+            make_hedger().run(
+                call("primary", 0.1),
+                call("blocked", 0),
+                lambda result: result != "blocked",
+            )
+        )
+
+        assert result == "primary"
+        assert LLM_HEDGES.value("lost") - lost == 1
+
+    def test_rejected_result_returned_when_nothing_accepted(self):
+        """With no accepted result, a rejected one beats an error."""
+        result = asyncio.run(
+            make_hedger().run(failing(0.05), call("blocked", 0), lambda r: False)
+        )
+
+        assert result == "blocked"
+
+    def test_error_raised_when_every_call_fails(self):
+        """If every call fails, the error reaches the caller's fallback."""
+        with pytest.raises(RuntimeError):
+            asyncio.run(make_hedger().run(failing(0.05), failing(0), accept_all))
+
+    def test_hedge_denied_without_budget(self):
+        """An exhausted budget denies the hedge; the slow call is awaited."""
+        denied = LLM_HEDGES.value("denied")
+        hedged = []
+
+        async def hedge():
+            hedged.append(True)
+            return "hedge"
+
+        result = asyncio.run(
+            make_hedger(budget=0).run(call("primary", 0.05), hedge, accept_all)
+        )
+
+        assert result == "primary"
+        assert hedged == []
+        assert LLM_HEDGES.value("denied") - denied == 1
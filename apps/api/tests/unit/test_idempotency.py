@@ -0,0 +1,159 @@
+"""Unit tests for idempotency keys and in-flight coalescing."""
+
+import asyncio
+
+import pytest
+
+from core.idempotency import (
+    IdempotencyConflictError,
+    IdempotencyKeyError,
+    IdempotencyStore,
+    fingerprint,
+    store_key,
+)
+from core.metrics import IDEMPOTENT_REQUESTS
+
+
+class FakeClock:
+    """Settable monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+KEY = store_key("token:client-1", "retry-1")
+BODY = fingerprint('{"content":"hello"}')
+
+
+def keep_all(reply: str) -> bool:
+    return True
+
+
+class Generator:
+    """Counts calls; each call yields to the loop before replying."""
+
+    def __init__(self, reply: str = "I'm here."):
+        self.reply = reply
+        self.calls = 0
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.reply
+
+
+class TestKeys:
+    """Tests for key hashing."""
+
+    def test_keys_scoped_to_client(self):
+        """The same key from two clients is two keys."""
+        assert store_key("ip:1.2.3.4", "k") != store_key("ip:5.6.7.8", "k")
+
+    def test_malformed_keys_rejected(self):
+        """Empty, over-long and non-printable keys are refused."""
+        for key in ("", "x" * 256, "has space"):
+            with pytest.raises(IdempotencyKeyError):
+                store_key(None, key)
+
+
+class TestIdempotencyStore:
+    """Tests for single-flight generation and replay."""
+
+    def test_concurrent_repeats_share_one_generation(self):
+        """Repeats while the first is in flight wait for its reply."""
+        store: IdempotencyStore[str] = IdempotencyStore(ttl=60, max_keys=10)
+        generate = Generator()
+        coalesced = IDEMPOTENT_REQUESTS.value("coalesced")
+
+        async def main():
+            return await asyncio.gather(
+                *(store.run(KEY, BODY, generate, keep_all) for _ in range(3))
+            )
+
+        results = asyncio.run(main())
+
+        assert generate.calls == 1
+        assert [outcome for _, outcome in results] == [
+            "generated",
+            "coalesced",
+            "coalesced",
+        ]
+        assert {reply for reply, _ in results} == {"I'm here."}
+        assert IDEMPOTENT_REQUESTS.value("coalesced") - coalesced == 2
+
+    def test_completed_reply_replayed_until_expiry(self):
+        """A completed reply is replayed for the TTL, then generated again."""
+        clock = FakeClock()
+        store: IdempotencyStore[str] = IdempotencyStore(60, 10, clock=clock)
+        generate = Generator()
+
+        first = asyncio.run(store.run(KEY, BODY, generate, keep_all))
+        clock.now = 59
+        repeat = asyncio.run(store.run(KEY, BODY, generate, keep_all))
+        clock.now = 61
+        expired = asyncio.run(store.run(KEY, BODY, generate, keep_all))
+
+        assert first == ("I'm here.", "generated")
+        assert repeat == ("I'm here.", "replayed")
+        assert expired == ("I'm here.", "generated")
+        assert generate.calls == 2
+
+    def test_reused_key_with_other_request_conflicts(self):
+        """A key cannot be reused for a different message."""
+        store: IdempotencyStore[str] = IdempotencyStore(ttl=60, max_keys=10)
+        asyncio.run(store.run(KEY, BODY, Generator(), keep_all))
+
+        with pytest.raises(IdempotencyConflictError):
+            asyncio.run(
+                store.run(KEY, fingerprint('{"content":"bye"}'), Generator(), keep_all)
+            )
+
+    def test_unkept_and_failed_replies_not_stored(self):
+        """Retries after a fallback or an error generate again."""
+        store: IdempotencyStore[str] = IdempotencyStore(ttl=60, max_keys=10)
+        generate = Generator("fallback")
+
+        async def fail() -> str:
+            raise ConnectionError
+
+        asyncio.run(store.run(KEY, BODY, generate, lambda reply: False))
+        with pytest.raises(ConnectionError):
+            asyncio.run(store.run(KEY, BODY, fail, keep_all))
+        asyncio.run(store.run(KEY, BODY, generate, keep_all))
+
+        assert generate.calls == 2
+        assert len(store) == 1
+
+    def test_waiters_retry_when_first_fails(self):
+        """If the request in flight fails, a waiting repeat generates itself."""
+        store: IdempotencyStore[str] = IdempotencyStore(ttl=60, max_keys=10)
+        generate = Generator()
+
+        async def fail() -> str:
+            await asyncio.sleep(0.01)
+            raise ConnectionError
+
+        async def main():
+            return await asyncio.gather(
+                store.run(KEY, BODY, fail, keep_all),
+                store.run(KEY, BODY, generate, keep_all),
+                return_exceptions=True,
+            )
+
+        failed, retried = asyncio.run(main())
+
+        assert isinstance(failed, ConnectionError)
+        assert retried == ("I'm here.", "generated")
+
+    def test_least_recently_used_key_evicted(self):
+        """The store never holds more than max_keys keys."""
+        store: IdempotencyStore[str] = IdempotencyStore(ttl=60, max_keys=2)
+
+        for n in range(5):
+            key = store_key(None, f"key-{n}")
+            asyncio.run(store.run(key, BODY, Generator(), keep_all))
+
+        assert len(store) == 2
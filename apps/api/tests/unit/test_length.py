@@ -0,0 +1,85 @@
+"""Unit tests for LLM output length control."""
+
+import asyncio
+from unittest.mock import patch
+
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.usage import RequestUsage
+
+from services.llm import generation
+from services.llm.length import MAX_CHARS_PER_TOKEN, LengthController
+
+
+class TestLengthController:
+    """Tests for sizing max_tokens to the character limit."""
+
+    def test_limit_follows_character_budget(self):
+        """The token limit covers the character budget, with headroom."""
+        controller = LengthController(max_chars=500, max_tokens=500, chars_per_token=4)
+
+        assert 125 < controller.max_tokens() < 150
+
+    def test_ceiling_is_never_exceeded(self):
+        """Short tokens never raise the limit past the model's ceiling."""
+        controller = LengthController(max_chars=5000, max_tokens=500)
+
+        assert controller.max_tokens() == 500
+
+    def test_estimate_follows_observed_replies(self):
+        """Replies with longer tokens lower the limit over time."""
+        controller = LengthController(max_chars=500, max_tokens=500)
+        before = controller.max_tokens()
+
+        for _ in range(20):
+            controller.observe(chars=500, tokens=100)
+
+        assert controller.max_tokens() < before
+        assert 4 < controller.chars_per_token <= 5
+
+    def test_outliers_are_clamped(self):
+        """One implausible reply cannot push the estimate out of range."""
+        controller = LengthController(max_chars=500, max_tokens=500)
+
+        for _ in range(100):
+            controller.observe(chars=10000, tokens=1)
+        controller.observe(chars=0, tokens=50)
+
+        assert controller.chars_per_token <= MAX_CHARS_PER_TOKEN
+
+
+class TestGenerationLimit:
+    """Generation asks for no more tokens than fit the length limit."""
+
+    def test_max_tokens_sent_and_ratio_observed(self, monkeypatch):
+        """Calls carry the derived max_tokens; replies update the estimate."""
+        controller = LengthController(max_chars=500, max_tokens=500)
+        monkeypatch.setattr(generation, "length_controller", controller)
+        limits = []
+
+        def respond(messages, info):
+            limits.append(info.model_settings["max_tokens"])
+            usage = RequestUsage(input_tokens=100, output_tokens=10)
+            return ModelResponse(parts=[TextPart("x" * 50)], usage=usage)
+
+        models = [(FunctionModel(respond), None)]
+        with patch("services.llm.factory.get_llm_models", return_value=models):
+            asyncio.run(generation.generate_response("hello", "Be present."))
+
+        assert limits == [LengthController(500, 500).max_tokens()]
+        assert controller.chars_per_token > 3.5
+
+    def test_reply_cut_off_ends_on_a_sentence(self):
+        """A reply stopped at the token limit loses its unfinished sentence."""
+
+        def respond(messages, info):
+            return ModelResponse(
+                parts=[TextPart("That sounds heavy. I wonder if what you")],
+                finish_reason="length",
+            )
+
+        models = [(FunctionModel(respond), None)]
+        with patch("services.llm.factory.get_llm_models", return_value=models):
+            reply = asyncio.run(generation.generate_response("hello", "Be present."))
+
+        assert reply == "That sounds heavy."
@@ -0,0 +1,75 @@
+"""Unit tests for the process-wide LLM registry."""
+
+import asyncio
+
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from services.llm.registry import LLMRegistry
+
+
+def make_registry() -> LLMRegistry:
+    return LLMRegistry(pool_size=10, keepalive=5, connect_timeout=1, read_timeout=5)
+
+
+class TestLLMRegistry:
+    """Tests for agent and provider client reuse."""
+
+    def test_agent_reused_per_model(self, monkeypatch):
+        """The same model identifier always returns the same agent."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        registry = make_registry()
+
+        first = registry.get_agent("openai:gpt-5.1")
+        second = registry.get_agent("openai:gpt-5.1")
+        other = registry.get_agent("openai:gpt-4o")
+
+        assert first is second
+        assert other is not first
+
+    def test_http_client_shared_per_provider(self, monkeypatch):
+        """Models from one provider share a single pooled HTTP client."""
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        registry = make_registry()
+
+        model_a = registry.get_model("openai:gpt-5.1")
+        model_b = registry.get_model("openai:gpt-4o")
+
+        shared = registry.http_client("openai")
+        assert model_a.client._client is shared
+        assert model_b.client._client is shared
+        assert shared.timeout.connect == 1
+        assert shared.timeout.read == 5
+
+    def test_http_client_recreated_after_close(self):
+        """Closing the registry does not leave a dead client behind."""
+        registry = make_registry()
+        client = registry.http_client("openai")
+
+        asyncio.run(registry.aclose())
+
+        assert client.is_closed
+        assert registry.http_client("openai") is not client
+
+    def test_warm_up_calls_model(self):
+        """Warm-up issues one small request through the shared agent."""
+        calls = []
+
+        def respond(messages, info):
+            calls.append(info.model_settings)
+            return ModelResponse(parts=[TextPart("ok")])
+
+        registry = make_registry()
+        asyncio.run(registry.warm_up(FunctionModel(respond)))
+
+        assert len(calls) == 1
+        assert calls[0]["max_tokens"] == 1
+
+    def test_warm_up_failure_is_swallowed(self):
+        """A provider failure during warm-up never blocks startup."""
+
+        def respond(messages, info):
+            raise ConnectionError("provider unreachable")
+
+        registry = make_registry()
+        asyncio.run(registry.warm_up(FunctionModel(respond)))
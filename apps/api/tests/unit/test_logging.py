@@ -0,0 +1,166 @@
+"""Unit tests for structured, non-blocking logging."""
+
+import io
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+
+from core.config import settings
+from core.logging import (
+    LOG_RECORDS_DROPPED,
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    configure_logging,
+    request_id_var,
+    shutdown_logging,
+)
+from safety.guardrails import apply_guardrails
+
+
+def make_record(
+    msg: str, args=(), name: str = "safety.guardrails", exc_info=None, **extra
+) -> logging.LogRecord:
+    record = logging.LogRecord(name, logging.WARNING, __file__, 1, msg, args, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+
+class SlowHandler(logging.Handler):
+    """Sink that takes `delay` seconds per record, like a blocked stdout."""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.threads: set[int] = set()
+
+    def emit(self, record):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+
+
+class TestJsonFormatter:
+    """Tests for the JSON record format."""
+
+    def test_whitelisted_fields_only(self):
+        """Context fields are kept; anything else, like content, is dropped."""
+        record = make_record(
+            "guardrail_blocked",
+            stage="guardrails",
+            pattern=r"\byou\s+should\b",
+            request_id="abc123",
+            content="I feel awful",
+        )
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["event"] == "guardrail_blocked"
+        assert entry["level"] == "warning"
+        assert entry["stage"] == "guardrails"
+        assert entry["pattern"] == r"\byou\s+should\b"
+        assert entry["request_id"] == "abc123"
+        assert "content" not in entry
+        assert "I feel awful" not in JsonFormatter().format(record)
+
+    def test_arguments_never_interpolated(self):
+        """Log arguments are not merged into the event name."""
+        record = make_record("llm_fallback %s", args=("I feel awful",))
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["event"] == "llm_fallback %s"
+        assert "I feel awful" not in json.dumps(entry)
+
+    def test_library_records_interpolated(self):
+        """Records from libraries like uvicorn read as they were meant to."""
+        record = make_record(
+            "Started server process [%d]", args=(42,), name="uvicorn.error"
+        )
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["event"] == "Started server process [42]"
+
+    def test_exception_type_and_traceback_kept(self):
+        """Logged exceptions carry their type and traceback."""
+        try:
+            raise ConnectionError("provider down")
+        except ConnectionError:
+            record = make_record("llm_fallback", exc_info=sys.exc_info())
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["error"] == "ConnectionError"
+        assert "Traceback" in entry["traceback"]
+        assert "test_exception_type_and_traceback_kept" in entry["traceback"]
+
+    def test_exception_message_left_out_of_app_records(self):
+        """Provider errors can echo the prompt: app tracebacks are frames only."""
+        prompt = "I feel awful"
+        try:
+            raise RuntimeError(prompt)
+        except RuntimeError:
+            app = make_record("llm_fallback", exc_info=sys.exc_info())
+            library = make_record("error", name="uvicorn.error", exc_info=app.exc_info)
+
+        assert "I feel awful" not in JsonFormatter().format(app)
+        assert "I feel awful" in JsonFormatter().format(library)
+
+
+class TestNonBlockingQueueHandler:
+    """Tests for the queue handler and listener."""
+
+    def test_request_id_stamped_from_context(self):
+        """Records carry the request id of the request that logged them."""
+        log_queue: queue.Queue = queue.Queue()
+        handler = NonBlockingQueueHandler(log_queue)
+        token = request_id_var.set("req-1")
+        try:
+            handler.handle(make_record("event"))
+        finally:
+            request_id_var.reset(token)
+
+        assert log_queue.get_nowait().request_id == "req-1"
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """A full queue drops and counts records instead of waiting."""
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        dropped = LOG_RECORDS_DROPPED.value()
+
+        handler.handle(make_record("first"))
+        handler.handle(make_record("second"))
+
+        assert LOG_RECORDS_DROPPED.value() - dropped == 1
+
+    def test_records_written_as_json_lines(self):
+        """Configured logging writes one JSON object per record."""
+        stream = io.StringIO()
+        configure_logging("info", 100, stream=stream)
+        try:
+            logging.getLogger("unit").warning(
+                "crisis_detected", extra={"severity": "high"}
+            )
+            logging.getLogger("unit").debug("below_level")
+        finally:
+            shutdown_logging()
+            configure_logging(settings.log_level, settings.log_queue_size)
+
+        lines = stream.getvalue().splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["severity"] == "high"
+
+    def test_guardrail_burst_adds_no_latency(self):
+        """A burst of guardrail hits is not slowed down by a slow log sink."""
+        listener = configure_logging("info", 10000)
+        slow = SlowHandler(delay=0.005)
+        listener.handlers = (slow,)
+        try:
+            start = time.perf_counter()
+            for _ in range(100):
+                apply_guardrails("You should try to rest.")
+            elapsed = time.perf_counter() - start
+        finally:
+            shutdown_logging()
+            configure_logging(settings.log_level, settings.log_queue_size)
+
+        # Writing 100 records inline would take at least 0.5 seconds
+        assert elapsed < 0.2
+        assert threading.get_ident() not in slow.threads
@@ -0,0 +1,94 @@
+"""Unit tests for the Prometheus metrics primitives."""
+
+from core.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def render(*metrics) -> list[str]:
+    registry = MetricsRegistry()
+    for metric in metrics:
+        registry.register(metric)
+    return registry.render().splitlines()
+
+
+class TestHistogram:
+    """Tests for histogram recording and exposition."""
+
+    def test_buckets_are_cumulative_and_inclusive(self):
+        """Bucket counts are cumulative; a value on a bound falls in it."""
+        histogram = Histogram("stage_seconds", "Stage time.", buckets=(0.1, 1.0))
+        series = histogram.labels()
+        for value in (0.05, 0.1, 0.5, 3.0):
+            series.observe(value)
+
+        assert render(histogram) == [
+            "# HELP stage_seconds Stage time.",
+            "# TYPE stage_seconds histogram",
+            'stage_seconds_bucket{le="0.1"} 2',
+            'stage_seconds_bucket{le="1.0"} 3',
+            'stage_seconds_bucket{le="+Inf"} 4',
+            "stage_seconds_sum 3.65",
+            "stage_seconds_count 4",
+        ]
+
+    def test_labelled_series(self):
+        """Each label value is its own series, created once."""
+        histogram = Histogram(
+            "stage_seconds", "Stage time.", labelname="stage", buckets=(1.0,)
+        )
+        assert histogram.labels("llm_call") is histogram.labels("llm_call")
+        histogram.labels("llm_call").observe(0.5)
+
+        lines = render(histogram)
+        assert 'stage_seconds_bucket{stage="llm_call",le="1.0"} 1' in lines
+        assert 'stage_seconds_count{stage="llm_call"} 1' in lines
+
+
+class TestCounterAndGauge:
+    """Tests for counters and gauges."""
+
+    def test_predeclared_labels_exposed_as_zero(self):
+        """Declared label values appear before their first increment."""
+        counter = Counter(
+            "fallbacks_total", "Fallbacks.", labelname="reason", labels=("error",)
+        )
+        assert 'fallbacks_total{reason="error"} 0' in render(counter)
+
+    def test_label_values_escaped(self):
+        """Regex patterns used as label values are escaped."""
+        counter = Counter("blocks_total", "Blocks.", labelname="pattern")
+        counter.inc(r"\byou\s+should\b")
+        counter.inc(r"\byou\s+should\b")
+
+        assert r'blocks_total{pattern="\\byou\\s+should\\b"} 2' in render(counter)
+
+    def test_gauge_goes_up_and_down(self):
+        """Gauges track a current value."""
+        gauge = Gauge("in_flight", "In flight.")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        assert render(gauge)[-1] == "in_flight 1"
+
+
+class TestRegistry:
+    """Tests for rendering a registry."""
+
+    def test_worker_label_added_to_every_sample(self):
+        """A labelled worker's samples say which worker they came from."""
+        counter = Counter("blocks_total", "Blocks.", labelname="pattern")
+        counter.inc("advice")
+        gauge = Gauge("in_flight", "In flight.")
+        registry = MetricsRegistry()
+        registry.register(counter)
+        registry.register(gauge)
+        registry.label_worker("4242")
+
+        assert registry.render().splitlines() == [
+            "# HELP blocks_total Blocks.",
+            "# TYPE blocks_total counter",
+            'blocks_total{worker="4242",pattern="advice"} 1',
+            "# HELP in_flight In flight.",
+            "# TYPE in_flight gauge",
+            'in_flight{worker="4242"} 0',
+        ]
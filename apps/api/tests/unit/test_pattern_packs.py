@@ -0,0 +1,222 @@
+"""Unit tests for hot-reloadable safety pattern packs."""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from core.metrics import PATTERN_PACK_INFO, PATTERN_PACK_RELOADS
+from safety.crisis_detection import detect_crisis
+from safety.guardrails import StreamingGuardrail
+from safety.pattern_packs import (
+    DEFAULT_PACK_PATH,
+    PatternPackError,
+    PatternPackStore,
+    compile_pack,
+    load_pack,
+)
+
+
+def write_pack(path, version: str, **families) -> None:
+    """Write the default pack with some families replaced."""
+    data = json.loads(DEFAULT_PACK_PATH.read_text())
+    data.update(families, version=version)
+    path.write_text(json.dumps(data))
+
+
+class TestValidation:
+    """Tests for pack validation."""
+
+    def test_default_pack_loads(self):
+        """The pack shipped with the build is valid."""
+        pack = load_pack(DEFAULT_PACK_PATH)
+
+        assert pack.version
+        assert pack.self_harm.search("i want to kill myself")
+
+    def test_rejects_bad_packs(self):
+        """Bad regexes, empty crisis families and missing versions fail."""
+        data = json.loads(DEFAULT_PACK_PATH.read_text())
+        bad = [
+            data | {"banned_phrases": ["(unclosed"]},
+            data | {"self_harm": []},
+            data | {"harm_to_others": "murder"},
+            {key: value for key, value in data.items() if key != "version"},
+            {key: value for key, value in data.items() if key != "banned_input"},
+            data | {"selfharm": []},
+        ]
+
+        for pack in bad:
+            with pytest.raises(PatternPackError):
+                compile_pack(json.dumps(pack).encode())
+
+    def test_rejects_patterns_that_cannot_be_merged(self):
+        """Backreferences, named groups and inline global flags fail."""
+        data = json.loads(DEFAULT_PACK_PATH.read_text())
+        unmergeable = [
+            # Would silently never match once merged (groups are renumbered)
+            r"\b(\w+)\s+\1\s+die\b",
+            # Global flags are only allowed at the start of the merged regex
+            r"(?i)\bsuicide\b",
+            # Named groups clash across patterns and with the scanner's own
+            r"\b(?P<word>end)\s+it\b",
+        ]
+
+        for pattern in unmergeable:
+            with pytest.raises(PatternPackError, match="Pattern"):
+                compile_pack(
+                    json.dumps(
+                        data | {"self_harm": [*data["self_harm"], pattern]}
+                    ).encode()
+                )
+
+    def test_scoped_flags_allowed(self):
+        """Flags scoped to a group merge fine and are accepted."""
+        data = json.loads(DEFAULT_PACK_PATH.read_text())
+        data["banned_phrases"] = [*data["banned_phrases"], r"(?i:\bsoulmate\b)"]
+
+        pack = compile_pack(json.dumps(data).encode())
+
+        assert pack.banned_phrases.search("you are my SOULMATE")
+
+    def test_compiled_once_per_content(self):
+        """The same bytes compile to the same pack object."""
+        raw = DEFAULT_PACK_PATH.read_bytes()
+
+        assert compile_pack(raw) is compile_pack(raw)
+
+
+class TestReload:
+    """Tests for swapping packs at runtime."""
+
+    def test_reload_swaps_pack(self, tmp_path):
+        """A changed file is swapped in; the new patterns apply at once."""
+        path = tmp_path / "pack.json"
+        write_pack(path, "1")
+        store = PatternPackStore(path)
+        old = store.active
+
+        write_pack(path, "2", banned_phrases=[r"\bsounds\s+heavy\b"])
+        applied = PATTERN_PACK_RELOADS.value("applied")
+
+        assert store.reload() is True
+        assert store.active is not old
+        assert store.active.banned_phrases.search("that sounds heavy")
+        assert PATTERN_PACK_INFO.value() == "2"
+        assert PATTERN_PACK_RELOADS.value("applied") - applied == 1
+
+    def test_unchanged_pack_not_swapped(self, tmp_path):
+        """Reloading identical contents keeps the same compiled pack."""
+        path = tmp_path / "pack.json"
+        write_pack(path, "1")
+        store = PatternPackStore(path)
+        old = store.active
+
+        assert store.reload() is False
+        assert store.active is old
+
+    def test_invalid_pack_keeps_current(self, tmp_path):
+        """A pack that fails validation never replaces the active one."""
+        path = tmp_path / "pack.json"
+        write_pack(path, "1")
+        store = PatternPackStore(path)
+        old = store.active
+        rejected = PATTERN_PACK_RELOADS.value("rejected")
+
+        write_pack(path, "2", self_harm=[])
+
+        assert store.reload() is False
+        assert store.active is old
+        assert PATTERN_PACK_RELOADS.value("rejected") - rejected == 1
+
+    def test_unusable_pack_at_startup_uses_default(self, tmp_path):
+        """A missing or bad pack file at startup falls back to the shipped one."""
+        store = PatternPackStore(tmp_path / "missing.json")
+
+        assert store.active is load_pack(DEFAULT_PACK_PATH)
+
+    def test_unmergeable_pack_at_startup_uses_default(self, tmp_path):
+        """A pack that only fails once merged still falls back at startup."""
+        path = tmp_path / "pack.json"
+        write_pack(path, "1", self_harm=[r"(?i)\bsuicide\b"])
+
+        store = PatternPackStore(path)
+
+        assert store.active is load_pack(DEFAULT_PACK_PATH)
+
+    def test_watch_survives_unmergeable_pack(self, tmp_path):
+        """A rejected pack leaves the watcher running for the next fix."""
+        path = tmp_path / "pack.json"
+        write_pack(path, "1")
+        store = PatternPackStore(path)
+
+        async def wait_for_change(watcher: asyncio.Task) -> None:
+            os.utime(path, (0, 0))
+            for _ in range(20):
+                await asyncio.sleep(0.01)
+            assert not watcher.done()
+
+        async def scenario():
+            watcher = asyncio.create_task(store.watch(0.01))
+            write_pack(path, "2", self_harm=[r"\b(?P<a>x)(?P<a>y)\b"])
+            await wait_for_change(watcher)
+            write_pack(path, "3")
+            os.utime(path, (1, 1))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if store.active.version == "3":
+                    break
+            watcher.cancel()
+
+        asyncio.run(scenario())
+        assert store.active.version == "3"
+
+    def test_watch_picks_up_file_change(self, tmp_path):
+        """The file watcher reloads when the pack file changes."""
+        path = tmp_path / "pack.json"
+        write_pack(path, "1")
+        store = PatternPackStore(path)
+
+        async def scenario():
+            watcher = asyncio.create_task(store.watch(0.01))
+            write_pack(path, "2", banned_input=[r"\bpineapple\b"])
+            # Modification times can be coarse: make the change visible
+            os.utime(path, (0, 0))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if store.active.version == "2":
+                    break
+            watcher.cancel()
+
+        asyncio.run(scenario())
+        assert store.active.version == "2"
+
+
+class TestActivePack:
+    """Tests for safety checks reading the active pack."""
+
+    def test_checks_use_swapped_pack(self, tmp_path, monkeypatch):
+        """Crisis detection follows the active pack after a swap."""
+        path = tmp_path / "pack.json"
+        write_pack(path, "1", self_harm=[r"\bdisappear\s+forever\b"])
+        store = PatternPackStore(path)
+        monkeypatch.setattr("safety.crisis_detection.pattern_packs", store)
+
+        assert detect_crisis("I want to disappear forever").is_crisis is True
+        assert detect_crisis("I want to kill myself").is_crisis is False
+
+    def test_stream_keeps_its_pack(self, tmp_path, monkeypatch):
+        """A stream in flight is checked against the pack it started with."""
+        path = tmp_path / "pack.json"
+        write_pack(path, "1")
+        store = PatternPackStore(path)
+        monkeypatch.setattr("safety.guardrails.pattern_packs", store)
+        guardrail = StreamingGuardrail()
+
+        write_pack(path, "2", banned_phrases=[r"\bsounds\s+heavy\b"])
+        store.reload()
+        guardrail.feed("That sounds heavy. ")
+
+        assert guardrail.finish() != ""
+        assert guardrail.blocked is False
@@ -0,0 +1,132 @@
+"""Unit tests for provider prompt-prefix caching."""
+
+import asyncio
+from unittest.mock import patch
+
+from pydantic_ai.messages import (
+    CachePoint,
+    ModelResponse,
+    TextPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.usage import RequestUsage
+
+from core.metrics import LLM_CACHED_INPUT_RATIO, LLM_INPUT_TOKENS
+from prompts.history import build_message_history
+from prompts.system import get_system_prompt
+from services.llm import generation
+from services.llm.prompt_cache import (
+    PROMPT_CACHE_KEY,
+    cache_user_prompt,
+    prompt_cache_settings,
+)
+from services.llm.usage import record_usage
+
+
+def recording_model(requests: list[list]) -> FunctionModel:
+    """Fake provider that keeps each request and reports cached input."""
+
+    def respond(messages, info):
+        requests.append(messages)
+        usage = RequestUsage(input_tokens=1000, cache_read_tokens=800)
+        return ModelResponse(parts=[TextPart("I'm here.")], usage=usage)
+
+    return FunctionModel(respond)
+
+
+def generate(model, text: str, history) -> str:
+    with patch("services.llm.factory.get_llm_models", return_value=[(model, None)]):
+        return asyncio.run(
+            generation.generate_response(text, get_system_prompt(), history)
+        )
+
+
+class TestProviderSettings:
+    """Tests for per-provider cache settings."""
+
+    def test_openai_gets_cache_key(self):
+        """OpenAI requests share a cache key derived from the system prompt."""
+        extra = prompt_cache_settings("openai:gpt-5.1")["extra_body"]
+
+        assert extra == {"prompt_cache_key": PROMPT_CACHE_KEY}
+        assert cache_user_prompt("openai:gpt-5.1", "hi") == "hi"
+
+    def test_anthropic_marks_instructions_and_turn(self):
+        """Anthropic gets cache points on the instructions and the new turn."""
+        model = "anthropic:claude-sonnet-4-0"
+
+        assert prompt_cache_settings(model) == {"anthropic_cache_instructions": True}
+        assert cache_user_prompt(model, "hi") == ["hi", CachePoint()]
+
+    def test_other_providers_and_disabled(self, monkeypatch):
+        """Unknown providers, and every provider when disabled, get nothing."""
+        assert prompt_cache_settings("test:model") == {}
+
+        monkeypatch.setattr("core.config.settings.llm_prompt_cache", False)
+
+        assert prompt_cache_settings("openai:gpt-5.1") == {}
+        assert cache_user_prompt("anthropic:claude-sonnet-4-0", "hi") == "hi"
+
+
+class TestCacheablePrefix:
+    """Requests are laid out so consecutive turns share a prefix."""
+
+    def test_prefix_stable_across_turns(self):
+        """System prompt first, then history, then the new turn, byte-stable."""
+        requests: list[list] = []
+        model = recording_model(requests)
+        turns = [
+            {"role": "user", "content": "I had a rough day"},
+            {"role": "assistant", "content": "I'm here. What happened?"},
+        ]
+
+        generate(model, "Work was too much", build_message_history(turns, "", 2000))
+        turns += [
+            {"role": "user", "content": "Work was too much"},
+            {"role": "assistant", "content": "That sounds heavy."},
+        ]
+        generate(model, "I can't sleep", build_message_history(turns, "", 2000))
+
+        first, second = requests
+        # pydantic-ai strips surrounding whitespace from instructions
+        system_prompt = get_system_prompt().strip()
+        assert first[-1].instructions == second[-1].instructions == system_prompt
+        # The whole first request is a prefix of the second
+        contents = [[part.content for part in message.parts] for message in second]
+        assert contents[: len(first)] == [
+            [part.content for part in message.parts] for message in first
+        ]
+        assert isinstance(second[-1].parts[-1], UserPromptPart)
+        assert second[-1].parts[-1].content == "I can't sleep"
+
+
+class TestUsage:
+    """Tests for cached token accounting."""
+
+    def test_generation_counts_cached_tokens(self):
+        """Each call's cached and uncached input tokens reach the metrics."""
+        read = LLM_INPUT_TOKENS.value("read")
+        uncached = LLM_INPUT_TOKENS.value("uncached")
+        ratios = LLM_CACHED_INPUT_RATIO.labels()
+        count = sum(ratios._counts)
+
+        generate(recording_model([]), "hello", None)
+
+        assert LLM_INPUT_TOKENS.value("read") - read == 800
+        assert LLM_INPUT_TOKENS.value("uncached") - uncached == 200
+        assert sum(ratios._counts) - count == 1
+
+    def test_cache_writes_not_counted_as_uncached(self):
+        """Tokens written to the cache are counted apart."""
+        write = LLM_INPUT_TOKENS.value("write")
+        uncached = LLM_INPUT_TOKENS.value("uncached")
+
+        record_usage(
+            RequestUsage(input_tokens=1200, cache_write_tokens=1000),  # type: ignore[arg-type]
+            "test:model",
+            0.1,
+        )
+
+        assert LLM_INPUT_TOKENS.value("write") - write == 1000
+        assert LLM_INPUT_TOKENS.value("uncached") - uncached == 200
@@ -0,0 +1,95 @@
+"""Unit tests for per-client rate limiting."""
+
+from unittest.mock import patch
+
+from core.rate_limit import RateLimiter, client_key, retry_after_header
+
+
+def scope(headers=(), client=("203.0.113.7", 51000)) -> dict:
+    return {"type": "http", "headers": list(headers), "client": client}
+
+
+class TestRateLimiter:
+    """Tests for the token buckets."""
+
+    def test_burst_then_reject_with_retry_after(self):
+        """A client gets its burst, then waits for the refill."""
+        limiter = RateLimiter(rate=2, burst=5, max_clients=10)
+        with patch("core.rate_limit.monotonic", return_value=100.0):
+            assert [limiter.charge("a", 1) for _ in range(5)] == [0.0] * 5
+            assert limiter.charge("a", 1) == 0.5
+            assert limiter.charge("a", 4) == 2.0
+
+    def test_rejected_charge_takes_nothing(self):
+        """A rejected charge leaves the bucket for smaller charges."""
+        limiter = RateLimiter(rate=1, burst=3, max_clients=10)
+
+        assert limiter.charge("a", 4) > 0
+        assert limiter.charge("a", 3) == 0.0
+
+    def test_refill_over_time(self):
+        """Tokens come back at `rate` per second, up to the burst."""
+        limiter = RateLimiter(rate=2, burst=4, max_clients=10)
+        with patch("core.rate_limit.monotonic", return_value=100.0):
+            limiter.charge("a", 4)
+        with patch("core.rate_limit.monotonic", return_value=101.0):
+            assert limiter.charge("a", 2) == 0.0
+            assert limiter.charge("a", 1) == 0.5
+        with patch("core.rate_limit.monotonic", return_value=1000.0):
+            assert limiter.charge("a", 4) == 0.0
+            assert limiter.charge("a", 1) > 0
+
+    def test_clients_are_independent(self):
+        limiter = RateLimiter(rate=1, burst=1, max_clients=10)
+
+        assert limiter.charge("a", 1) == 0.0
+        assert limiter.charge("a", 1) > 0
+        assert limiter.charge("b", 1) == 0.0
+
+    def test_memory_bounded_by_lru_eviction(self):
+        """The least recently seen client is evicted first."""
+        limiter = RateLimiter(rate=1, burst=1, max_clients=3)
+        for client in ("a", "b", "c"):
+            limiter.charge(client, 1)
+        limiter.charge("a", 0)  # a is recent again
+        limiter.charge("d", 1)
+
+        assert len(limiter) == 3
+        assert limiter.charge("a", 1) > 0  # still tracked, still empty
+        assert limiter.charge("b", 1) == 0.0  # evicted, back with a full bucket
+
+    def test_disabled_or_unknown_client_admitted(self):
+        limiter = RateLimiter(rate=1, burst=0, max_clients=10, enabled=False)
+        assert limiter.charge("a", 1) == 0.0
+        assert RateLimiter(rate=1, burst=0, max_clients=10).charge(None, 1) == 0.0
+
+
+class TestClientKey:
+    """Tests for identifying clients."""
+
+    def test_keyed_by_ip(self):
+        """Clients are keyed by IP address."""
+        assert client_key(scope()) == "ip:203.0.113.7"
+        assert client_key(scope(client=None)) is None
+
+    def test_client_tokens_ignored(self):
+        """A made-up client token cannot buy a fresh bucket."""
+        tokens = [(b"x-client-token", f"web-{n:08d}".encode()) for n in range(3)]
+
+        assert {client_key(scope([token])) for token in tokens} == {"ip:203.0.113.7"}
+
+    def test_ipv6_keyed_by_network(self):
+        """Addresses in one IPv6 /64 share a bucket; mapped IPv4 is IPv4."""
+        first = client_key(scope(client=("2001:db8:1:2::1", 443)))
+        rotated = client_key(scope(client=("2001:db8:1:2:ffff::9", 443)))
+        other = client_key(scope(client=("2001:db8:1:3::1", 443)))
+
+        assert first == rotated == "ip:2001:db8:1:2::/64"
+        assert other != first
+        assert client_key(scope(client=("::ffff:203.0.113.7", 443))) == (
+            "ip:203.0.113.7"
+        )
+
+    def test_retry_after_whole_seconds(self):
+        assert retry_after_header(0.2) == "1"
+        assert retry_after_header(2.5) == "3"
@@ -0,0 +1,92 @@
+"""Unit tests for pre-serialized JSON responses."""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from api.responses import PrerenderedJSON, etag_matches
+from api.v1.endpoints.conversation import CRISIS_RESPONSE
+from models.response import ConversationResponse, CrisisResponse, HealthStatus
+
+
+def opening(content: str = "I'm here to sit with you.") -> ConversationResponse:
+    return ConversationResponse(content=content, timestamp="2025-01-01T00:00:00")
+
+
+class TestPrerenderedJSON:
+    """Tests for the timestamp splice."""
+
+    def test_render_matches_model_with_fresh_timestamp(self):
+        """Rendered JSON equals the model's own JSON apart from the time."""
+        model = opening('Quotes " and \\ and "timestamp" survive')
+        rendered = json.loads(PrerenderedJSON(model).render())
+
+        expected = json.loads(model.model_dump_json())
+        assert rendered.pop("timestamp") != expected.pop("timestamp")
+        assert rendered == expected
+
+    def test_timestamp_is_current_iso_8601(self):
+        """Each render is stamped with the current UTC time."""
+        rendered = json.loads(PrerenderedJSON(opening()).render())
+        stamp = datetime.fromisoformat(rendered["timestamp"])
+
+        assert stamp.utcoffset().total_seconds() == 0
+        assert abs((datetime.now(stamp.tzinfo) - stamp).total_seconds()) < 5
+
+    def test_rendered_crisis_response_validates(self):
+        """The crisis payload still round-trips through its model."""
+        crisis = CrisisResponse.model_validate_json(CRISIS_RESPONSE.render())
+        assert crisis.session_locked is True
+        assert len(crisis.resources) > 0
+
+    def test_static_payload(self):
+        """Payloads without a timestamp render unchanged."""
+        health = PrerenderedJSON(HealthStatus(), timestamp_field=None)
+        assert json.loads(health.render()) == {
+            "status": "ok",
+            "service": "unconditional-api",
+        }
+
+    def test_missing_timestamp_field_rejected(self):
+        """A template without a place for the timestamp fails at startup."""
+        with pytest.raises(ValueError):
+            PrerenderedJSON(HealthStatus())
+
+
+class TestETag:
+    """Tests for ETag generation and If-None-Match matching."""
+
+    def test_etag_ignores_timestamp_tracks_content(self):
+        """The ETag changes with the content, not with the time."""
+        first = PrerenderedJSON(opening())
+        again = PrerenderedJSON(opening())
+        changed = PrerenderedJSON(opening("Something else"))
+
+        assert first.etag == again.etag
+        assert first.etag != changed.etag
+
+    def test_timestamped_etag_is_weak(self):
+        """Bytes that change on every render only get a weak validator."""
+        assert PrerenderedJSON(opening()).etag.startswith('W/"')
+        assert PrerenderedJSON(opening(), timestamp_field=None).etag.startswith('"')
+
+    def test_weak_etag_matches(self):
+        """A weak ETag matches its value with or without the W/ prefix."""
+        assert etag_matches('W/"abc"', 'W/"abc"')
+        assert etag_matches('"abc"', 'W/"abc"')
+        assert not etag_matches('W/"xyz"', 'W/"abc"')
+
+    def test_if_none_match(self):
+        """Lists, weak validators and * are honoured."""
+        cases = {
+            '"abc"': True,
+            'W/"abc"': True,
+            '"xyz", "abc"': True,
+            "*": True,
+            '"xyz"': False,
+            "": False,
+            None: False,
+        }
+        for header, expected in cases.items():
+            assert etag_matches(header, '"abc"') is expected, header
@@ -0,0 +1,204 @@
+"""Unit tests for health-aware LLM routing."""
+
+import asyncio
+import random
+from time import monotonic
+from unittest.mock import patch
+
+import pytest
+from pydantic_ai.exceptions import ModelHTTPError
+
+from core.metrics import LLM_CIRCUIT_TRIPS, LLM_FAILOVERS
+from services.llm import factory
+from services.llm.concurrency import LLMOverloadedError
+from services.llm.routing import BreakerState, LLMUnavailableError, ModelRouter
+
+
+def make_router(**overrides) -> ModelRouter:
+    options = {
+        "window": 10,
+        "error_threshold": 0.5,
+        "min_calls": 4,
+        "cooldown": 60.0,
+        "max_concurrency": 8,
+        "rng": random.Random(0),
+    }
+    options.update(overrides)
+    return ModelRouter(**options)
+
+
+def provider(outcomes: dict[str, object]):
+    """Fake provider call: returns or raises the outcome for each model."""
+
+    async def run(model):
+        outcome = outcomes[model]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    return run
+
+
+def fail(router: ModelRouter, model: str, times: int, error=None) -> None:
+    """Record `times` failed calls to `model`."""
+    error = error or RuntimeError("provider down")
+    for _ in range(times):
+        with pytest.raises(type(error)):
+            asyncio.run(router.call([(model, None)], provider({model: error})))
+
+
+class TestCircuitBreaker:
+    """Tests for per-model circuit breakers."""
+
+    def test_opens_after_error_rate_reached(self):
+        """A model failing past the threshold is skipped."""
+        router = make_router()
+        trips = LLM_CIRCUIT_TRIPS.value("openai:a")
+        fail(router, "openai:a", 3)
+        assert router.health("openai:a").breaker is BreakerState.CLOSED
+
+        fail(router, "openai:a", 1)
+
+        assert router.health("openai:a").breaker is BreakerState.OPEN
+        assert LLM_CIRCUIT_TRIPS.value("openai:a") - trips == 1
+        with pytest.raises(LLMUnavailableError):
+            router.plan([("openai:a", None)])
+
+    def test_probe_after_cooldown_closes(self):
+        """After the cooldown a single probe is let through; success closes."""
+        router = make_router(cooldown=0.0)
+        fail(router, "openai:a", 4)
+        health = router.health("openai:a")
+
+        assert health.admit(monotonic()) is True
+        assert health.breaker is BreakerState.HALF_OPEN
+        assert health.available(monotonic()) is False  # one probe at a time
+        health.record_success(0.1)
+
+        assert health.breaker is BreakerState.CLOSED
+        assert health.error_rate == 0.0
+
+    def test_failed_probe_reopens(self):
+        """A failed probe opens the breaker again."""
+        router = make_router(cooldown=0.0)
+        fail(router, "openai:a", 4)
+        fail(router, "openai:a", 1)
+
+        assert router.health("openai:a").breaker is BreakerState.OPEN
+
+
+class TestFailover:
+    """Tests for routing and failover across models."""
+
+    def test_fails_over_to_next_model(self):
+        """An error on the first model is retried on the second."""
+        router = make_router()
+        failovers = LLM_FAILOVERS.value("anthropic:b")
+        run = provider({"openai:a": RuntimeError("down"), "anthropic:b": "hello"})
+
+        result = asyncio.run(
+            router.call([("openai:a", None), ("anthropic:b", None)], run)
+        )
+
+        assert result == "hello"
+        assert LLM_FAILOVERS.value("anthropic:b") - failovers == 1
+
+    def test_open_breaker_routes_to_healthy_model(self):
+        """Once a model's breaker is open, calls go straight to the next."""
+        router = make_router()
+        fail(router, "openai:a", 4)
+        choices = [("openai:a", None), ("anthropic:b", None)]
+
+        assert router.plan(choices) == ["anthropic:b"]
+
+    def test_ordered_models_prefer_first(self):
+        """Unweighted models are tried in configured order."""
+        router = make_router()
+        choices = [("openai:a", None), ("anthropic:b", None)]
+
+        assert router.plan(choices) == ["openai:a", "anthropic:b"]
+
+    def test_weighted_routing_shifts_from_failing_model(self):
+        """Weights are scaled by health, so a failing model loses traffic."""
+        router = make_router(min_calls=100)
+        choices = [("openai:a", 1.0), ("anthropic:b", 1.0)]
+        before = [router.plan(choices)[0] for _ in range(1000)].count("openai:a")
+        fail(router, "openai:a", 9)
+        after = [router.plan(choices)[0] for _ in range(1000)].count("openai:a")
+
+        assert 400 < before < 600
+        assert after < 50
+
+
+class TestAdaptiveConcurrency:
+    """Tests for per-model concurrency backing off on rate limits."""
+
+    def test_rate_limit_halves_limit(self):
+        """A 429 halves the model's limit; successes grow it back."""
+        router = make_router(min_calls=100)
+        fail(router, "openai:a", 2, ModelHTTPError(429, "openai:a"))
+        health = router.health("openai:a")
+        assert health.limit == 2.0
+
+        for _ in range(40):
+            asyncio.run(router.call([("openai:a", None)], provider({"openai:a": "ok"})))
+
+        assert health.limit == 8.0
+
+    def test_saturated_model_skipped(self):
+        """A model at its limit is skipped; with none left, fail fast."""
+        router = make_router(max_concurrency=1)
+        router.health("openai:a").admit(0.0)
+
+        assert router.plan([("openai:a", None), ("anthropic:b", None)]) == [
+            "anthropic:b"
+        ]
+        with pytest.raises(LLMOverloadedError):
+            router.plan([("openai:a", None)])
+
+    def test_cancelled_call_releases_slot(self):
+        """A cancelled call (e.g. a hedge loser) frees its slot, no outcome."""
+        router = make_router()
+
+        async def scenario():
+            task = asyncio.create_task(
+                router.call([("openai:a", None)], lambda m: asyncio.sleep(10))
+            )
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(scenario())
+        health = router.health("openai:a")
+        assert health.in_flight == 0
+        assert health.error_rate == 0.0
+
+
+class TestModelConfiguration:
+    """Tests for LLM_MODELS parsing."""
+
+    def parse(self, value: str):
+        factory._configured_models.cache_clear()
+        try:
+            with patch.dict("os.environ", {"LLM_MODELS": value}):
+                return factory.get_llm_models()
+        finally:
+            factory._configured_models.cache_clear()
+
+    def test_ordered_list(self):
+        assert self.parse("openai:gpt-5.1, anthropic:claude-sonnet-4-0") == [
+            ("openai:gpt-5.1", None),
+            ("anthropic:claude-sonnet-4-0", None),
+        ]
+
+    def test_weighted_list(self):
+        """Unweighted entries in a weighted list get weight 1."""
+        assert self.parse("openai:gpt-5.1=3,anthropic:claude-sonnet-4-0") == [
+            ("openai:gpt-5.1", 3.0),
+            ("anthropic:claude-sonnet-4-0", 1.0),
+        ]
+
+    def test_unset_uses_single_model(self):
+        with patch.object(factory, "get_llm_model", return_value="openai:x"):
+            assert self.parse("") == [("openai:x", None)]
@@ -0,0 +1,229 @@
+"""Unit tests for the single-pass safety pattern scanner.
+
+The scanner must give exactly the same verdicts as searching every pattern
+on its own. The reference implementations below are the original per-pattern
+loops, kept here as the oracle for a differential test over a generated corpus.
+"""
+
+import random
+import re
+
+from safety.banned_patterns import contains_banned_content
+from safety.crisis_detection import CrisisDetectionResult, detect_crisis
+from safety.guardrails import GUARDRAIL_REPLACEMENT, apply_guardrails
+from safety.pattern_packs import pattern_packs
+from safety.scanner import PatternScanner, build_combined_pattern
+
+PACK = pattern_packs.active
+SELF_HARM_PATTERNS = PACK.patterns["self_harm"]
+HARM_TO_OTHERS_PATTERNS = PACK.patterns["harm_to_others"]
+IMMEDIATE_DANGER_PATTERNS = PACK.patterns["immediate_danger"]
+BANNED_INPUT_PATTERNS = PACK.patterns["banned_input"]
+BANNED_PHRASES = PACK.patterns["banned_phrases"]
+BANNED_PHRASES_SCANNER = PACK.banned_phrases
+
+CORPUS_SIZE = 5000
+
+TRIGGERS = [
+    # Crisis
+    "kill myself", "kill self", "end my life", "end life", "suicide", "suicidal",
+    "want to die", "wish i was dead", "wish I were dead", "cut myself",
+    "hurt myself", "hurtself", "ending it all", "no reason to live",
+    "better off dead", "don't want to be here", "dont want to here",
+    "can't go on", "cant go on", "overdose", "jump off", "hang myself",
+    "kill them", "kill him", "hurt her", "harm someone", "murder", "homicide",
+    # Immediacy
+    "right now", "tonight", "today", "going to", "plan to", "ready to",
+    # Banned input
+    "fuck you", "shit  you", "damn you", "stupid bot", "stupid ai",
+    "ignore previous instructions", "ignore all instructions",
+    "pretend you are", "act as you", "act as if you", "roleplay",
+    # Guardrail phrases
+    "diagnosed", "diagnose", "you have anxietydisorder",
+    "you might have panicsyndrome", "mental illness", "clinical", "clinically",
+    "psychiatric", "you should", "you must", "you need to", "I recommend",
+    "my advice", "I love you", "I care deeply about you", "you're special to me",
+    "youre special to me", "we're friends", "I promise", "I guarantee",
+    "everything will be okay", "it will get better", "God wants",
+    "God has a plan", "universe has a plan", "everything happens for a reason",
+    "meant to be", "you're so strong", "youre brave", "I'm so proud of you",
+]  # fmt: skip
+
+NEAR_MISSES = [
+    "skill myself", "killing myself", "suicides", "murderer", "tonights",
+    "todays", "plant to", "roleplaying", "clinician", "should", "mustard",
+    "overdosed", "hangman", "endless life", "better off deadline",
+    "you shoulder", "diagnoses", "friendship", "promised", "strongest",
+    "goings to", "end mylife", "want todie", "act asif you", "stupidbot",
+]  # fmt: skip
+
+FILLER = [
+    "i", "feel", "so", "tired", "of", "everything", "and", "nobody", "listens",
+    "this", "week", "has", "been", "heavy", "at", "work", "home", "my", "mom",
+    "keeps", "calling", "you", "me", "it", "is", "hard", "to", "sleep",
+    "naïve", "straße", "İstanbul", "ΣΟΦΟΣ", "don't", "can't", "—", "🙂",
+]  # fmt: skip
+
+SEPARATORS = [" ", " ", " ", "  ", "\n", "\t", ", ", ". ", "'", "-", ""]
+
+
+def reference_contains_banned_content(message: str) -> bool:
+    message_lower = message.lower()
+    for pattern in BANNED_INPUT_PATTERNS:
+        if re.search(pattern, message_lower):
+            return True
+    return False
+
+
+def reference_detect_crisis(message: str) -> CrisisDetectionResult:
+    message_lower = message.lower()
+    matched = []
+    severity = "none"
+    for pattern in SELF_HARM_PATTERNS:
+        if re.search(pattern, message_lower):
+            matched.append(pattern)
+            severity = "high"
+    for pattern in HARM_TO_OTHERS_PATTERNS:
+        if re.search(pattern, message_lower):
+            matched.append(pattern)
+            severity = "high"
+    if matched:
+        for pattern in IMMEDIATE_DANGER_PATTERNS:
+            if re.search(pattern, message_lower):
+                severity = "critical"
+                matched.append(pattern)
+                break
+    is_crisis = len(matched) > 0
+    reason = ""
+    if is_crisis:
+        reason = f"Detected {len(matched)} crisis pattern(s) with {severity} severity"
+    return CrisisDetectionResult(
+        is_crisis=is_crisis,
+        severity=severity,
+        matched_patterns=matched,
+        reason=reason,
+    )
+
+
+def reference_guardrail_pattern(response_text: str) -> str | None:
+    response_lower = response_text.lower()
+    for pattern in BANNED_PHRASES:
+        if re.search(pattern, response_lower):
+            return pattern
+    return None
+
+
+def random_case(rng: random.Random, text: str) -> str:
+    style = rng.random()
+    if style < 0.6:
+        return text
+    if style < 0.7:
+        return text.upper()
+    if style < 0.8:
+        return text.title()
+    return "".join(c.upper() if rng.random() < 0.5 else c for c in text)
+
+
+def generate_corpus(size: int, seed: int = 20251118) -> list[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        parts = []
+        for _ in range(rng.randint(1, 14)):
+            roll = rng.random()
+            if roll < 0.25:
+                fragment = rng.choice(TRIGGERS)
+            elif roll < 0.4:
+                fragment = rng.choice(NEAR_MISSES)
+            else:
+                fragment = rng.choice(FILLER)
+            parts.append(random_case(rng, fragment))
+            parts.append(rng.choice(SEPARATORS))
+        corpus.append("".join(parts))
+    return corpus
+
+
+CORPUS = generate_corpus(CORPUS_SIZE)
+
+
+class TestScannerEquivalence:
+    """Differential tests against the original per-pattern loops."""
+
+    def test_corpus_exercises_every_verdict(self):
+        """The corpus contains clean, banned, high and critical messages."""
+        severities = {reference_detect_crisis(m).severity for m in CORPUS}
+        assert severities == {"none", "high", "critical"}
+        assert any(reference_contains_banned_content(m) for m in CORPUS)
+        assert not all(reference_contains_banned_content(m) for m in CORPUS)
+        assert any(reference_guardrail_pattern(m) for m in CORPUS)
+
+    def test_banned_content_matches_reference(self):
+        """Banned verdicts are identical to the per-pattern loop."""
+        for message in CORPUS:
+            assert contains_banned_content(message) == (
+                reference_contains_banned_content(message)
+            ), message
+
+    def test_crisis_detection_matches_reference(self):
+        """Severity, matched patterns (in order) and reason are identical."""
+        for message in CORPUS:
+            assert detect_crisis(message) == reference_detect_crisis(message), message
+
+    def test_guardrails_match_reference(self):
+        """Guardrail verdicts and the reported pattern are identical."""
+        for message in CORPUS:
+            expected = reference_guardrail_pattern(message)
+            assert BANNED_PHRASES_SCANNER.first_match(message.lower()) == expected
+            result = apply_guardrails(message)
+            if expected is None:
+                assert result == message
+            else:
+                assert result == GUARDRAIL_REPLACEMENT
+
+    def test_long_messages_match_reference(self):
+        """Equivalence holds at the 10,000 character message limit."""
+        rng = random.Random(7)
+        for _ in range(20):
+            message = " ".join(rng.sample(CORPUS, 200))[:10000]
+            assert detect_crisis(message) == reference_detect_crisis(message)
+            assert contains_banned_content(message) == (
+                reference_contains_banned_content(message)
+            )
+
+
+class TestPatternScanner:
+    """Tests for the scanner engine itself."""
+
+    def test_groups_word_boundary_patterns_by_leading_character(self):
+        """Patterns starting with \\b<char> share one boundary and branch."""
+        combined = build_combined_pattern([r"\bkill\b", r"\bkin\b", r"\bend\b"])
+        assert combined == r"\b(?:k(?:(?P<p0>ill\b)|(?P<p1>in\b))|e(?:(?P<p2>nd\b)))"
+
+    def test_ungroupable_patterns_kept_whole(self):
+        """Alternations, quantified or grouped prefixes are not factored."""
+        patterns = [r"\bfoo|bar", r"\bx?yz", r"(a|b)c", r"\bok"]
+        scanner = PatternScanner(patterns)
+        assert scanner.matches("bar") == [r"\bfoo|bar"]
+        assert scanner.matches("yz") == [r"\bx?yz"]
+        assert scanner.matches("bc ok") == [r"(a|b)c", r"\bok"]
+
+    def test_matches_returns_overlapping_patterns_in_order(self):
+        """Every matching pattern is reported, even when matches overlap."""
+        scanner = PatternScanner([r"\bmy\s+self\b", r"\bkill\s+my\b", r"\bself\b"])
+        assert scanner.matches("kill my self") == [
+            r"\bmy\s+self\b",
+            r"\bkill\s+my\b",
+            r"\bself\b",
+        ]
+
+    def test_first_match_respects_priority_order(self):
+        """The first pattern in priority order wins, not the leftmost hit."""
+        scanner = PatternScanner([r"\blater\b", r"\bearly\b"])
+        assert scanner.first_match("early then later") == r"\blater\b"
+
+    def test_empty_scanner(self):
+        """A scanner with no patterns never matches."""
+        scanner = PatternScanner([])
+        assert scanner.search("anything") is False
+        assert scanner.matches("anything") == []
+        assert scanner.first_match("anything") is None
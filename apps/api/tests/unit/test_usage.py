@@ -0,0 +1,116 @@
+"""Unit tests for LLM token usage accounting and the daily budget."""
+
+import pytest
+from pydantic_ai.usage import RequestUsage
+
+from core.metrics import LLM_MODEL_TOKENS, LLM_TOKENS
+from services.llm.usage import (
+    SECONDS_PER_DAY,
+    DailyTokenBudget,
+    TokenBudgetExhaustedError,
+    history_token_budget,
+    record_usage,
+    token_budget,
+    track_usage,
+)
+
+
+class FakeClock:
+    """Settable wall clock."""
+
+    def __init__(self, now: float = 10 * SECONDS_PER_DAY):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestDailyTokenBudget:
+    """Tests for the daily token budget."""
+
+    def test_unlimited_by_default(self):
+        """A zero limit is never low or exhausted."""
+        budget = DailyTokenBudget(0, 0.1)
+        budget.add(10**9)
+
+        assert not budget.low
+        assert not budget.exhausted
+        budget.check()
+
+    def test_low_then_exhausted(self):
+        """The budget runs low near the limit and is exhausted at it."""
+        budget = DailyTokenBudget(1000, 0.1, clock=FakeClock())
+
+        budget.add(899)
+        assert not budget.low
+        budget.add(1)
+        assert budget.low
+        assert not budget.exhausted
+
+        budget.add(100)
+        assert budget.exhausted
+        with pytest.raises(TokenBudgetExhaustedError):
+            budget.check()
+
+    def test_resets_at_midnight_utc(self):
+        """Usage from yesterday does not count against today."""
+        clock = FakeClock()
+        budget = DailyTokenBudget(1000, 0.1, clock=clock)
+        budget.add(1000)
+
+        clock.now += SECONDS_PER_DAY
+
+        assert budget.used == 0
+        budget.check()
+
+    def test_share_across_workers(self):
+        """Each worker gets an equal share of the deployment's budget."""
+        budget = DailyTokenBudget(1000, 0.1)
+        budget.share(4)
+
+        assert budget.limit == 250
+
+    def test_low_budget_halves_history(self, monkeypatch):
+        """While tokens run low, history gets half its usual budget."""
+        monkeypatch.setattr("core.config.settings.history_token_budget", 2000)
+        assert history_token_budget() == 2000
+
+        monkeypatch.setattr(token_budget, "limit", 1000)
+        monkeypatch.setattr(token_budget, "_used", 950)
+
+        assert history_token_budget() == 1000
+
+
+class TestRecordUsage:
+    """Tests for per-call usage accounting."""
+
+    def test_counts_tokens_by_direction_and_model(self):
+        """Input and output tokens reach the totals and the model's count."""
+        inputs = LLM_TOKENS.value("input")
+        outputs = LLM_TOKENS.value("output")
+        model_tokens = LLM_MODEL_TOKENS.value("test:model")
+
+        record_usage(
+            RequestUsage(input_tokens=300, output_tokens=50),  # type: ignore[arg-type]
+            "test:model",
+            0.5,
+        )
+
+        assert LLM_TOKENS.value("input") - inputs == 300
+        assert LLM_TOKENS.value("output") - outputs == 50
+        assert LLM_MODEL_TOKENS.value("test:model") - model_tokens == 350
+
+    def test_request_record_sums_calls(self):
+        """Every call inside a tracked request adds to its record."""
+        usage = RequestUsage(input_tokens=100, output_tokens=20, cache_read_tokens=60)
+
+        with track_usage() as record:
+            record_usage(usage, "test:model", 0.25)  # type: ignore[arg-type]
+            record_usage(usage, "test:model", 0.5)  # type: ignore[arg-type]
+        record_usage(usage, "test:model", 1.0)  # type: ignore[arg-type]
+
+        assert record.calls == 2
+        assert record.input_tokens == 200
+        assert record.output_tokens == 40
+        assert record.cache_read_tokens == 120
+        assert record.server_timing() == 'llm;dur=750.0;desc="2 calls"'